@@ -0,0 +1,120 @@
+"""Store refresh tokens as SHA-256 digests
+
+Revision ID: 0001_hash_refresh_tokens
+Revises: 0000_initial_schema
+Create Date: 2026-10-17 00:00:00
+
+Reemplaza `sessions.refresh_token` (String(100) en claro) por
+`refresh_token_hash` (32 bytes, índice único compacto) y hace lo mismo con
+`previous_refresh_token` si existe. Los tokens emitidos siguen funcionando:
+se guarda el digest del valor actual.
+
+Parte del esquema base de `0000_initial_schema`; una base existente se
+marca antes con `alembic stamp 0000_initial_schema`.
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_hash_refresh_tokens"
+down_revision: Union[str, Sequence[str], None] = "0000_initial_schema"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10_000
+
+
+def _columns(bind) -> set[str]:
+    return {c["name"] for c in sa.inspect(bind).get_columns("sessions")}
+
+
+def _backfill_in_python(bind, source: str, target: str) -> None:
+    """Fallback genérico (SQLite, etc.): calcula los digests por lotes."""
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                f"SELECT id, {source} FROM sessions "
+                f"WHERE id > :last_id AND {source} IS NOT NULL ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            return
+        bind.execute(
+            sa.text(f"UPDATE sessions SET {target} = :digest WHERE id = :id"),
+            [
+                {"id": row[0], "digest": hashlib.sha256(row[1].encode("utf-8")).digest()}
+                for row in rows
+            ],
+        )
+        last_id = rows[-1][0]
+
+
+def _backfill(bind, source: str, target: str) -> None:
+    if bind.dialect.name == "postgresql":
+        op.execute(
+            f"UPDATE sessions SET {target} = sha256(convert_to({source}, 'UTF8')) "
+            f"WHERE {source} IS NOT NULL"
+        )
+    else:
+        _backfill_in_python(bind, source, target)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    columns = _columns(bind)
+
+    op.add_column("sessions", sa.Column("refresh_token_hash", sa.LargeBinary(32), nullable=True))
+    op.add_column(
+        "sessions", sa.Column("previous_refresh_token_hash", sa.LargeBinary(32), nullable=True)
+    )
+
+    _backfill(bind, "refresh_token", "refresh_token_hash")
+    if "previous_refresh_token" in columns:
+        _backfill(bind, "previous_refresh_token", "previous_refresh_token_hash")
+
+    with op.batch_alter_table("sessions") as batch:
+        batch.alter_column("refresh_token_hash", existing_type=sa.LargeBinary(32), nullable=False)
+        batch.create_index("ix_sessions_refresh_token_hash", ["refresh_token_hash"], unique=True)
+        batch.create_index(
+            "ix_sessions_previous_refresh_token_hash", ["previous_refresh_token_hash"]
+        )
+        batch.drop_index("ix_sessions_refresh_token")
+        batch.drop_column("refresh_token")
+        if "previous_refresh_token" in columns:
+            batch.drop_index("ix_sessions_previous_refresh_token")
+            batch.drop_column("previous_refresh_token")
+
+
+def downgrade() -> None:
+    """
+    Downgrade schema.
+
+    Un digest no se puede revertir al token original: las sesiones quedan
+    revocadas y `refresh_token` recibe el digest en hex como valor único.
+    """
+    op.add_column("sessions", sa.Column("refresh_token", sa.String(100), nullable=True))
+    op.add_column("sessions", sa.Column("previous_refresh_token", sa.String(100), nullable=True))
+
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute(
+            "UPDATE sessions SET refresh_token = encode(refresh_token_hash, 'hex'), is_revoked = true"
+        )
+    else:
+        op.execute("UPDATE sessions SET refresh_token = hex(refresh_token_hash), is_revoked = 1")
+
+    with op.batch_alter_table("sessions") as batch:
+        batch.alter_column("refresh_token", existing_type=sa.String(100), nullable=False)
+        batch.create_index("ix_sessions_refresh_token", ["refresh_token"], unique=True)
+        batch.create_index("ix_sessions_previous_refresh_token", ["previous_refresh_token"])
+        batch.drop_index("ix_sessions_refresh_token_hash")
+        batch.drop_index("ix_sessions_previous_refresh_token_hash")
+        batch.drop_column("refresh_token_hash")
+        batch.drop_column("previous_refresh_token_hash")
@@ -0,0 +1,52 @@
+"""Session retention: revoked_at and purge indexes
+
+Revision ID: 0002_session_retention
+Revises: 0001_hash_refresh_tokens
+Create Date: 2026-10-17 00:00:00
+
+Agrega `sessions.revoked_at` y los índices que usa el reaper de retención
+(`app/services/session_retention.py`) para recorrer las sesiones purgables
+sin escanear la tabla. En PostgreSQL los índices se crean CONCURRENTLY para
+no bloquear escrituras en tablas grandes.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_session_retention"
+down_revision: Union[str, Sequence[str], None] = "0001_hash_refresh_tokens"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_indexes(**kw) -> None:
+    op.create_index("ix_sessions_expires_at", "sessions", ["expires_at"], **kw)
+    op.create_index(
+        "ix_sessions_revoked_at", "sessions", ["revoked_at"],
+        postgresql_where=sa.text("revoked_at IS NOT NULL"),
+        sqlite_where=sa.text("revoked_at IS NOT NULL"),
+        **kw,
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("sessions", sa.Column("revoked_at", sa.DateTime(timezone=True), nullable=True))
+
+    if op.get_bind().dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY no puede correr dentro de una transacción
+        with op.get_context().autocommit_block():
+            _create_indexes(postgresql_concurrently=True)
+    else:
+        _create_indexes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_sessions_revoked_at", table_name="sessions")
+    op.drop_index("ix_sessions_expires_at", table_name="sessions")
+    with op.batch_alter_table("sessions") as batch:
+        batch.drop_column("revoked_at")
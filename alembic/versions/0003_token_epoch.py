@@ -0,0 +1,48 @@
+"""Per-user token epoch
+
+Revision ID: 0003_token_epoch
+Revises: 0002_session_retention
+Create Date: 2026-10-17 00:00:00
+
+Agrega `users.token_epoch` y `sessions.token_epoch` (default 0). Una sesión
+vale mientras su epoch coincida con el del usuario; incrementar el del usuario
+revoca todas sus sesiones en una sola escritura. Las filas existentes quedan
+en 0 y los tokens emitidos sin claim `epoch` se interpretan como 0.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_token_epoch"
+down_revision: Union[str, Sequence[str], None] = "0002_session_retention"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users", sa.Column("token_epoch", sa.Integer(), nullable=False, server_default="0")
+    )
+    op.add_column(
+        "sessions", sa.Column("token_epoch", sa.Integer(), nullable=False, server_default="0")
+    )
+
+
+def downgrade() -> None:
+    """
+    Downgrade schema.
+
+    Las sesiones de epochs anteriores se marcan revocadas para no revivirlas.
+    """
+    op.execute(
+        "UPDATE sessions SET is_revoked = true WHERE token_epoch <> "
+        "(SELECT token_epoch FROM users WHERE users.id = sessions.user_id)"
+    )
+    with op.batch_alter_table("sessions") as batch:
+        batch.drop_column("token_epoch")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("token_epoch")
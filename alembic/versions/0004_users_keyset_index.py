@@ -0,0 +1,38 @@
+"""Users keyset pagination index
+
+Revision ID: 0004_users_keyset_index
+Revises: 0003_token_epoch
+Create Date: 2026-10-17 00:00:00
+
+Agrega `ix_users_created_at_id (created_at, id)`, la clave del listado de
+usuarios por cursor ordenado por fecha de alta. El orden por `id` usa la PK.
+En PostgreSQL el índice se crea CONCURRENTLY para no bloquear escrituras.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_users_keyset_index"
+down_revision: Union[str, Sequence[str], None] = "0003_token_epoch"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY no puede correr dentro de una transacción
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_users_created_at_id", "users", ["created_at", "id"],
+                postgresql_concurrently=True,
+            )
+    else:
+        op.create_index("ix_users_created_at_id", "users", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_created_at_id", table_name="users")
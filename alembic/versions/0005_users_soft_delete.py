@@ -0,0 +1,71 @@
+"""Users soft delete
+
+Revision ID: 0005_users_soft_delete
+Revises: 0004_users_keyset_index
+Create Date: 2026-10-17 00:00:00
+
+Agrega `users.deleted_at` (nullable, sin default: en PostgreSQL es solo un
+cambio de catálogo) y dos índices parciales:
+
+- `ix_users_active_created_at_id (created_at, id) WHERE deleted_at IS NULL`
+  reemplaza a `ix_users_created_at_id` para el listado por cursor.
+- `ix_users_pending_purge (deleted_at) WHERE deleted_at IS NOT NULL`: las
+  bajas pendientes de purga, un índice casi vacío.
+
+En PostgreSQL los índices se crean y borran CONCURRENTLY.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_users_soft_delete"
+down_revision: Union[str, Sequence[str], None] = "0004_users_keyset_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = sa.text("deleted_at IS NULL")
+DELETED = sa.text("deleted_at IS NOT NULL")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("users", sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True))
+
+    if op.get_bind().dialect.name == "postgresql":
+        # CREATE/DROP INDEX CONCURRENTLY no puede correr dentro de una transacción
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_users_active_created_at_id", "users", ["created_at", "id"],
+                postgresql_where=ACTIVE, postgresql_concurrently=True,
+            )
+            op.create_index(
+                "ix_users_pending_purge", "users", ["deleted_at"],
+                postgresql_where=DELETED, postgresql_concurrently=True,
+            )
+            op.drop_index(
+                "ix_users_created_at_id", table_name="users", postgresql_concurrently=True
+            )
+    else:
+        op.create_index(
+            "ix_users_active_created_at_id", "users", ["created_at", "id"], sqlite_where=ACTIVE
+        )
+        op.create_index("ix_users_pending_purge", "users", ["deleted_at"], sqlite_where=DELETED)
+        op.drop_index("ix_users_created_at_id", table_name="users")
+
+
+def downgrade() -> None:
+    """
+    Downgrade schema.
+
+    Las bajas aún sin purgar se borran para no reactivarlas (sus sesiones
+    caen por ON DELETE CASCADE).
+    """
+    op.execute("DELETE FROM users WHERE deleted_at IS NOT NULL")
+    op.create_index("ix_users_created_at_id", "users", ["created_at", "id"])
+    op.drop_index("ix_users_pending_purge", table_name="users")
+    op.drop_index("ix_users_active_created_at_id", table_name="users")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("deleted_at")
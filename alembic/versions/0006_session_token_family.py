@@ -0,0 +1,46 @@
+"""Session refresh token family
+
+Revision ID: 0006_session_token_family
+Revises: 0005_users_soft_delete
+Create Date: 2026-10-17 00:00:00
+
+Agrega `sessions.refresh_family` (nullable, con índice único). Los refresh
+tokens nuevos llevan la familia como prefijo; presentar cualquier token viejo
+de la familia revoca la sesión. Las sesiones existentes no tienen familia y
+la reciben en su próxima rotación.
+
+En PostgreSQL el índice se crea y borra CONCURRENTLY.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_session_token_family"
+down_revision: Union[str, Sequence[str], None] = "0005_users_soft_delete"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("sessions", sa.Column("refresh_family", sa.String(32), nullable=True))
+
+    if op.get_bind().dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY no puede correr dentro de una transacción
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_sessions_refresh_family", "sessions", ["refresh_family"],
+                unique=True, postgresql_concurrently=True,
+            )
+    else:
+        op.create_index("ix_sessions_refresh_family", "sessions", ["refresh_family"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_sessions_refresh_family", table_name="sessions")
+    with op.batch_alter_table("sessions") as batch:
+        batch.drop_column("refresh_family")
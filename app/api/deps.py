@@ -2,18 +2,24 @@
 Dependencias de la API.
 Funciones reutilizables para inyección de dependencias en endpoints.
 """
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import AsyncGenerator, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import select
+from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError
 
+from app.core import session_cache
 from app.core.database import AsyncSessionLocal
 from app.core.security import decode_token, validate_session
+from app.core.session_store import SqlSessionStore, get_session_store
 from app.core.exceptions import NotAuthenticatedException
 from app.models.user import User
+from app.models.role import Role, Permission, role_permissions
+from app.models.session import Session
 
 # Esquema OAuth2 para autenticación con token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
@@ -50,15 +56,142 @@ async def get_current_user(
         if not is_valid:
             raise NotAuthenticatedException(detail="Sesión revocada o expirada")
 
-    result = await db.execute(select(User).filter(User.id == user_id))
+    result = await db.execute(select(User).filter(User.id == user_id, User.deleted_at.is_(None)))
     user = result.scalar_one_or_none()
 
     if user is None:
         raise NotAuthenticatedException()
+    if payload.get("epoch", 0) != user.token_epoch:
+        raise NotAuthenticatedException(detail="Sesión revocada o expirada")
 
     return user
 
 
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """
+    Identidad autenticada liviana (sin grafo ORM).
+
+    Atributos:
+        id: ID del usuario
+        email, name, lastname: Datos básicos del usuario
+        role: Nombre del rol asignado (o None)
+        permissions: Nombres de los permisos del rol
+        session_id: Sesión asociada al token (o None)
+        created_at, updated_at: Timestamps del usuario
+    """
+    id: int
+    email: str
+    name: str
+    lastname: str
+    role: Optional[str]
+    permissions: frozenset[str]
+    session_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    def has_permission(self, permission_name: str) -> bool:
+        """Verifica si el usuario tiene un permiso específico."""
+        return permission_name in self.permissions
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """
+    Obtiene la identidad autenticada en una sola consulta (Asíncrono).
+
+    Resuelve la validez de la sesión, las columnas del usuario, el nombre del
+    rol y sus permisos con un único SELECT con joins. Es la dependencia
+    recomendada; usar `get_current_user` solo si se necesita el `User` ORM.
+
+    El claim `epoch` del token se compara con el epoch cacheado del usuario
+    (o el leído en la misma consulta): un logout global invalida todos los
+    tokens previos sin consultar `sessions`.
+    """
+    payload = decode_token(token)
+    if payload is None:
+        raise NotAuthenticatedException()
+
+    user_id: Optional[int] = payload.get("user_id")
+    if user_id is None:
+        raise NotAuthenticatedException()
+
+    token_epoch = payload.get("epoch", 0)
+    cached_epoch = await session_cache.get_epoch(user_id)
+    if cached_epoch is not None and cached_epoch != token_epoch:
+        raise NotAuthenticatedException(detail="Sesión revocada o expirada")
+
+    since = session_cache.snapshot()
+    session_id: Optional[int] = payload.get("session_id")
+    check_session = (
+        session_id is not None
+        and not await session_cache.get(session_id, user_id)
+    )
+    # Con el store SQL la sesión se valida en la misma consulta; con otros, aparte
+    store = get_session_store()
+    join_session = check_session and isinstance(store, SqlSessionStore)
+    now = datetime.now(timezone.utc)
+    if check_session and not join_session:
+        session = await store.get_valid(db, session_id, user_id, now)
+        if session is None or session.token_epoch != token_epoch:
+            raise NotAuthenticatedException(detail="Sesión revocada o expirada")
+        session_expires_at = session.expires_at
+
+    columns = [
+        User.id, User.email, User.name, User.lastname,
+        User.created_at, User.updated_at, User.token_epoch,
+        Role.name.label("role_name"), Permission.name.label("permission_name"),
+    ]
+    if join_session:
+        columns += [Session.id.label("session_id"), Session.expires_at]
+
+    query = (
+        select(*columns)
+        .select_from(User)
+        .outerjoin(Role, Role.id == User.role_id)
+        .outerjoin(role_permissions, role_permissions.c.role_id == Role.id)
+        .outerjoin(Permission, Permission.id == role_permissions.c.permission_id)
+        .where(User.id == user_id, User.deleted_at.is_(None))
+    )
+    if join_session:
+        query = query.outerjoin(Session, and_(
+            Session.id == session_id,
+            Session.user_id == User.id,
+            Session.is_revoked == False,
+            Session.expires_at > now,
+        ))
+
+    rows = (await db.execute(query)).all()
+    if not rows:
+        raise NotAuthenticatedException()
+
+    first = rows[0]
+    if first.token_epoch != token_epoch:
+        raise NotAuthenticatedException(detail="Sesión revocada o expirada")
+    if cached_epoch is None:
+        await session_cache.set_epoch(user_id, first.token_epoch, since)
+    if join_session:
+        if first.session_id is None:
+            raise NotAuthenticatedException(detail="Sesión revocada o expirada")
+        session_expires_at = first.expires_at
+    if check_session:
+        await session_cache.set_valid(session_id, user_id, session_expires_at, since)
+
+    return Principal(
+        id=first.id,
+        email=first.email,
+        name=first.name,
+        lastname=first.lastname,
+        role=first.role_name,
+        permissions=frozenset(r.permission_name for r in rows if r.permission_name),
+        session_id=session_id,
+        created_at=first.created_at,
+        updated_at=first.updated_at,
+    )
+
+
 async def get_current_user_optional(
     token: Optional[str] = Depends(oauth2_scheme_optional),
     db: AsyncSession = Depends(get_db)
@@ -82,16 +215,16 @@ def require_role(allowed_roles: list[str]):
     Uso:
         @router.get("/admin", dependencies=[Depends(require_role(["admin"]))])
     """
-    def role_checker(current_user: User = Depends(get_current_user)):
+    def role_checker(current_user: Principal = Depends(get_current_principal)):
         if current_user.role is None:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Usuario sin rol asignado"
             )
-        if current_user.role.name not in allowed_roles:
+        if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Rol '{current_user.role.name}' no tiene acceso a este recurso"
+                detail=f"Rol '{current_user.role}' no tiene acceso a este recurso"
             )
         return current_user
     return role_checker
@@ -104,7 +237,7 @@ def require_permission(permission_name: str):
     Uso:
         @router.delete("/recipe/{id}", dependencies=[Depends(require_permission("delete_recipe"))])
     """
-    def permission_checker(current_user: User = Depends(get_current_user)):
+    def permission_checker(current_user: Principal = Depends(get_current_principal)):
         if not current_user.has_permission(permission_name):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
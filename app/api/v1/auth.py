@@ -12,7 +12,6 @@ from app.schemas.session import RefreshTokenRequest
 from app.services import user_service
 from app.core.limiter import limiter
 from app.core.metrics import record_login_success, record_login_failed, record_token_refresh
-from app.models.user import User
 
 router = APIRouter()
 
@@ -74,7 +73,7 @@ async def refresh_token(
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
 async def logout(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: deps.Principal = Depends(deps.get_current_principal)
 ) -> None:
     """Cierra la sesión actual revocando todas las sesiones del usuario."""
     await security.revoke_all_sessions(db, current_user.id)
@@ -7,10 +7,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 
-from app.api.deps import get_db, require_role
+from app.api.deps import get_db, require_role, Principal
 from app.schemas.role import RoleResponse, RoleCreate, RoleAssign
 from app.models.role import Role, Permission
 from app.models.user import User
+from app.services import user_service
 
 router = APIRouter()
 
@@ -18,7 +19,7 @@ router = APIRouter()
 @router.get("/", response_model=list[RoleResponse])
 async def list_roles(
     db: AsyncSession = Depends(get_db),
-    _: User = Depends(require_role(["admin"]))
+    _: Principal = Depends(require_role(["admin"]))
 ) -> list[RoleResponse]:
     """
     Lista todos los roles disponibles (Async).
@@ -33,7 +34,7 @@ async def list_roles(
 async def create_role(
     role_data: RoleCreate,
     db: AsyncSession = Depends(get_db),
-    _: User = Depends(require_role(["admin"]))
+    _: Principal = Depends(require_role(["admin"]))
 ) -> RoleResponse:
     """
     Crea un nuevo rol (Async).
@@ -71,7 +72,7 @@ async def create_role(
 async def assign_role_to_user(
     assignment: RoleAssign,
     db: AsyncSession = Depends(get_db),
-    _: User = Depends(require_role(["admin"]))
+    _: Principal = Depends(require_role(["admin"]))
 ) -> dict:
     """
     Asigna un rol a un usuario (Async).
@@ -79,7 +80,7 @@ async def assign_role_to_user(
     Requiere rol: admin
     """
     # Verificar usuario
-    res_user = await db.execute(select(User).filter(User.id == assignment.user_id))
+    res_user = await db.execute(select(User).filter(User.id == assignment.user_id, User.deleted_at.is_(None)))
     user = res_user.scalar_one_or_none()
     if not user:
         raise HTTPException(
@@ -100,6 +101,7 @@ async def assign_role_to_user(
     try:
         user.role_id = role.id
         await db.commit()
+        user_service.invalidate_user_row(user.id)
     except IntegrityError:
         await db.rollback()
         raise HTTPException(
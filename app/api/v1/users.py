@@ -1,58 +1,170 @@
 """
 Router de Usuarios asíncrono.
 """
+from typing import Literal, Optional, Union
+
 from fastapi import APIRouter, Depends, status, Request, Query, Path
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db, get_current_user
-from app.schemas.user import UserCreate, UserResponse
-from app.schemas.pagination import PaginatedResponse
-from app.services import user_service
-from app.models.user import User
+from app.api.deps import get_db, get_current_principal, require_role, Principal
+from app.schemas.user import UserCreate, UserImportReport, UserResponse
+from app.schemas.pagination import CursorPage, PaginatedResponse
+from app.services import user_export, user_import, user_queries, user_service
 from app.core.limiter import limiter
+from app.core.responses import model_response
 
 router = APIRouter()
 
 
-@router.get("", response_model=PaginatedResponse[UserResponse])
+@router.get("", response_model=Union[PaginatedResponse[UserResponse], CursorPage[UserResponse]])
 @limiter.limit("100/minute")
 async def get_users(
     request: Request,
     page: int = Query(1, ge=1, description="Número de página"),
     per_page: int = Query(100, ge=1, le=1000, description="Elementos por página"),
+    cursor: Optional[str] = Query(
+        None, max_length=512,
+        description="Cursor opaco de next_cursor/prev_cursor; vacío para la primera página. Activa la paginación por cursor"
+    ),
+    sort: Literal["id", "created_at"] = Query("id", description="Campo de orden"),
+    order: Literal["asc", "desc"] = Query("asc", description="Dirección del orden"),
+    count: Optional[Literal["exact", "cached", "estimate", "none"]] = Query(
+        None, description="Cálculo del total en paginación por página (default: COUNT_STRATEGY)"
+    ),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-) -> PaginatedResponse[UserResponse]:
-    """Obtiene todos los usuarios con paginación (Async)."""
+    current_user: Principal = Depends(get_current_principal)
+) -> Union[PaginatedResponse[UserResponse], CursorPage[UserResponse]]:
+    """
+    Obtiene todos los usuarios con paginación (Async).
+
+    Sin `cursor` pagina por número de página (OFFSET, con el total según
+    `count`: exacto, cacheado, estimado o ninguno). Con
+    `cursor` pagina por keyset: el costo no crece con la profundidad y no
+    se cuenta la tabla. Para recorrer tablas grandes usar siempre el cursor.
+    """
+    # Proyección sin ORM: los items ya son dicts con la forma de UserResponse
+    descending = order == "desc"
+    if cursor is not None:
+        result = await user_queries.list_user_rows_keyset(
+            db, limit=per_page, cursor=cursor or None, sort=sort, descending=descending
+        )
+        return model_response({
+            "items": result.items,
+            "per_page": per_page,
+            "has_more": result.has_more,
+            "next_cursor": result.next_cursor,
+            "prev_cursor": result.prev_cursor,
+        }, CursorPage[UserResponse], trusted=True)
+
     skip = (page - 1) * per_page
-    users = await user_service.get_users(db, skip=skip, limit=per_page)
-    total = await user_service.count_users(db)
+    users = await user_queries.list_user_rows(
+        db, skip=skip, limit=per_page, sort=sort, descending=descending
+    )
+    total = await user_service.count_users(db, count)
+
+    total_pages = None
+    if total.value is not None:
+        total_pages = (total.value + per_page - 1) // per_page
+
+    return model_response({
+        "items": users,
+        "total": total.value,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": total_pages,
+        "total_approximate": total.approximate,
+    }, PaginatedResponse[UserResponse], trusted=True)
 
-    total_pages = (total + per_page - 1) // per_page
 
-    return PaginatedResponse(
-        items=users,
-        total=total,
-        page=page,
-        per_page=per_page,
-        total_pages=total_pages
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media: {} for media in user_export.EXPORT_FORMATS.values()}}},
+)
+@limiter.limit("5/minute")
+async def export_users(
+    request: Request,
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Formato de exportación"),
+    db: AsyncSession = Depends(get_db),
+    _: Principal = Depends(require_role(["admin"]))
+) -> StreamingResponse:
+    """
+    Exporta todos los usuarios en streaming, ordenados por id (Async).
+
+    Usa un cursor del lado del servidor y una sola conexión: la memoria no
+    crece con la tabla. Requiere rol: admin
+    """
+    return StreamingResponse(
+        user_export.export_users(db, format, is_disconnected=request.is_disconnected),
+        media_type=user_export.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
     )
 
 
+@router.post(
+    "/import",
+    response_model=UserImportReport,
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {media: {"schema": {"type": "string"}} for media in user_import.IMPORT_FORMATS.values()},
+    }},
+)
+@limiter.limit("10/hour")
+async def import_users(
+    request: Request,
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Formato del cuerpo"),
+    db: AsyncSession = Depends(get_db),
+    _: Principal = Depends(require_role(["admin"]))
+) -> UserImportReport:
+    """
+    Importa usuarios en masa desde el cuerpo NDJSON/CSV (Async).
+
+    Cada fila lleva email, name, lastname y `password` o `password_hash`
+    (bcrypt). El cuerpo se lee en streaming y se inserta por lotes; los
+    emails ya registrados se omiten. Devuelve el detalle de cada fila
+    rechazada. Requiere rol: admin
+    """
+    report = await user_import.import_users(db, request.stream(), format)
+    return UserImportReport.model_validate(report)
+
+
+@router.get("/batch", response_model=list[Optional[UserResponse]])
+@limiter.limit("100/minute")
+async def get_users_batch(
+    request: Request,
+    ids: str = Query(
+        ..., pattern=r"^[1-9]\d{0,8}(,[1-9]\d{0,8}){0,99}$",
+        description="Hasta 100 IDs separados por coma", examples=["3,1,2"],
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+) -> list[Optional[UserResponse]]:
+    """
+    Obtiene varios usuarios por ID en una sola request (Async).
+
+    Devuelve un elemento por ID pedido, en el mismo orden, con null para los
+    que no existen. Reemplaza N llamadas a GET /users/{id} por una consulta
+    `WHERE id IN (...)` (o ninguna, si están en caché). Requiere autenticación.
+    """
+    users = await user_service.get_users_by_ids(db, [int(i) for i in ids.split(",")])
+    return model_response(users, list[Optional[UserResponse]], trusted=True)
+
+
 @router.get("/{user_id}", response_model=UserResponse)
 @limiter.limit("100/minute")
 async def get_user(
     request: Request,
     user_id: int = Path(..., gt=0),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ) -> UserResponse:
     """Obtiene un usuario por su ID (Async). Requiere autenticación."""
-    user = await user_service.get_user_by_id(db, user_id)
+    user = await user_queries.get_user_row(db, user_id)
     if not user:
         from app.core.exceptions import UserNotFoundException
         raise UserNotFoundException()
-    return UserResponse.from_user(user)
+    return model_response(user, UserResponse, trusted=True)
 
 
 @router.post("", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -63,4 +175,5 @@ async def create_user(
     db: AsyncSession = Depends(get_db)
 ) -> UserResponse:
     """Crea un nuevo usuario (Async)."""
-    return await user_service.create_user(db, user_data)
+    user = await user_service.create_user(db, user_data)
+    return model_response(user, UserResponse, trusted=True, status_code=status.HTTP_201_CREATED)
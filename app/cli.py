@@ -0,0 +1,134 @@
+"""
+Comandos de mantenimiento.
+
+Uso:
+    python -m app.cli purge-sessions [--grace-days N] [--batch-size N] [--dry-run]
+    python -m app.cli purge-users [--batch-size N] [--max-users N]
+    python -m app.cli import-users ARCHIVO [--format ndjson|csv] [--batch-size N]
+    python -m app.cli calibrate-hasher --budget-ms N [--samples N]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from app.core.logging import configure_logging
+
+
+async def _purge_sessions(args: argparse.Namespace) -> None:
+    from app.core.database import engine
+    from app.services.session_retention import run_retention
+
+    try:
+        report = await run_retention(
+            grace_days=args.grace_days,
+            batch_size=args.batch_size,
+            pause_seconds=args.pause,
+            max_batches=args.max_batches,
+            dry_run=args.dry_run,
+        )
+    finally:
+        await engine.dispose()
+
+    verb = "purgables" if report.dry_run else "eliminadas"
+    for reason, rows in report.purged.items():
+        print(f"{reason}: {rows} sesiones {verb}")
+    print(f"lotes: {report.batches}  lag: {report.lag_seconds:.0f}s")
+
+
+async def _purge_users(args: argparse.Namespace) -> None:
+    from app.core.database import engine
+    from app.services.user_purge import run_purge
+
+    try:
+        report = await run_purge(
+            batch_size=args.batch_size,
+            pause_seconds=args.pause,
+            max_users=args.max_users,
+        )
+    finally:
+        await engine.dispose()
+
+    print(f"usuarios purgados: {report.users}  sesiones: {report.sessions}")
+
+
+async def _read_chunks(path: Path, size: int = 1024 * 1024):
+    with path.open("rb") as file:
+        while chunk := await asyncio.to_thread(file.read, size):
+            yield chunk
+
+
+async def _import_users(args: argparse.Namespace) -> None:
+    from app.core.database import AsyncSessionLocal, engine
+    from app.core.hashing import import_hashing_executor
+    from app.services.user_import import import_users
+
+    path = Path(args.file)
+    fmt = args.format or ("csv" if path.suffix.lower() == ".csv" else "ndjson")
+    try:
+        async with AsyncSessionLocal() as db:
+            report = await import_users(db, _read_chunks(path), fmt, batch_size=args.batch_size)
+    finally:
+        import_hashing_executor.shutdown()
+        await engine.dispose()
+
+    for error in report.errors:
+        print(f"línea {error.line}: {error.email or '-'}: {error.error}", file=sys.stderr)
+    if report.errors_truncated:
+        print("(más errores omitidos; ver IMPORT_MAX_ERRORS)", file=sys.stderr)
+    print(
+        f"leídas: {report.received}  creadas: {report.created}  "
+        f"duplicadas: {report.duplicates}  inválidas: {report.invalid}  "
+        f"última línea confirmada: {report.last_committed_line}"
+    )
+
+
+async def _calibrate_hasher(args: argparse.Namespace) -> None:
+    from app.core.hashing import calibrate_hasher
+
+    hasher = await asyncio.to_thread(calibrate_hasher, args.budget_ms, args.samples)
+    print(f"# {hasher!r} para ~{args.budget_ms:g} ms; fijar en el entorno de todos los workers")
+    for name, value in hasher.as_settings().items():
+        print(f"{name.upper()}={value}")
+    print("HASH_TIME_BUDGET_MS=0")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Comandos de mantenimiento")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    purge = commands.add_parser("purge-sessions", help="Borrar sesiones expiradas o revocadas")
+    purge.add_argument("--grace-days", type=int, default=None, help="Días de gracia (default: SESSION_RETENTION_GRACE_DAYS)")
+    purge.add_argument("--batch-size", type=int, default=None, help="Filas por lote")
+    purge.add_argument("--pause", type=float, default=None, help="Segundos de pausa entre lotes")
+    purge.add_argument("--max-batches", type=int, default=None, help="Máximo de lotes por motivo")
+    purge.add_argument("--dry-run", action="store_true", help="Solo contar, no borrar")
+    purge.set_defaults(handler=_purge_sessions)
+
+    purge_users = commands.add_parser("purge-users", help="Borrar usuarios dados de baja y sus sesiones")
+    purge_users.add_argument("--batch-size", type=int, default=None, help="Sesiones por lote")
+    purge_users.add_argument("--pause", type=float, default=None, help="Segundos de pausa entre lotes")
+    purge_users.add_argument("--max-users", type=int, default=None, help="Máximo de usuarios en esta pasada")
+    purge_users.set_defaults(handler=_purge_users)
+
+    load = commands.add_parser("import-users", help="Importar usuarios desde un archivo NDJSON o CSV")
+    load.add_argument("file", help="Archivo a importar")
+    load.add_argument("--format", choices=["ndjson", "csv"], default=None, help="Formato (default: según la extensión)")
+    load.add_argument("--batch-size", type=int, default=None, help="Filas por lote (default: IMPORT_BATCH_SIZE)")
+    load.set_defaults(handler=_import_users)
+
+    calibrate = commands.add_parser("calibrate-hasher", help="Calibrar el coste del hasher una vez por despliegue")
+    calibrate.add_argument("--budget-ms", type=float, required=True, help="Latencia objetivo por hash en esta máquina")
+    calibrate.add_argument("--samples", type=int, default=5, help="Mediciones (se usa el coste más frecuente)")
+    calibrate.set_defaults(handler=_calibrate_hasher)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
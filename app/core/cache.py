@@ -0,0 +1,97 @@
+"""
+Caché en proceso con expiración por entrada y límite LRU.
+Usado para evitar trabajo repetido (crypto, consultas) en el hot path de autenticación.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+from app.core.metrics import record_cache_hit, record_cache_miss
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Caché LRU acotada con expiración absoluta por entrada.
+
+    Cada entrada guarda su instante de expiración (epoch en segundos);
+    una lectura posterior a ese instante la descarta y cuenta como miss.
+    Cuando se supera `maxsize` se expulsa la entrada usada hace más tiempo.
+
+    Atributos:
+        name: Nombre usado como label en las métricas de hit/miss
+        maxsize: Número máximo de entradas
+        default_ttl: TTL en segundos cuando no se indica expiración explícita
+    """
+
+    def __init__(self, name: str, maxsize: int = 10_000, default_ttl: float = 60.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[Hashable, tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Obtiene un valor vigente o None (registra hit/miss)."""
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    record_cache_hit(self.name)
+                    return value
+                del self._data[key]
+        record_cache_miss(self.name)
+        return None
+
+    def set(
+        self,
+        key: Hashable,
+        value: V,
+        ttl: Optional[float] = None,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        """
+        Guarda un valor.
+
+        Args:
+            key: Clave
+            value: Valor a guardar
+            ttl: Segundos de vida (default: `default_ttl`)
+            expires_at: Expiración absoluta (epoch); se usa el menor entre ambos
+        """
+        deadline = time.time() + (self.default_ttl if ttl is None else ttl)
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        if deadline <= time.time():
+            return
+        with self._lock:
+            self._data[key] = (deadline, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Elimina una entrada si existe."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Elimina las entradas cuya clave cumpla el predicado (O(n))."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """Vacía la caché."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -18,9 +18,10 @@ class Settings(BaseSettings):
         debug: Modo debug activado/desactivado
         database_url: URL de conexión a PostgreSQL
         secret_key: Clave secreta para JWT
-        algorithm: Algoritmo de encriptación JWT
+        algorithm: Algoritmo de firma JWT (HS256, o RS256/ES256 con par de claves)
         access_token_expire_minutes: Minutos de validez del access token
         refresh_token_expire_days: Días de validez del refresh token
+        token_cache_size: Tamaño de la caché de JWT verificados
     """
     
     # Configuración general
@@ -41,8 +42,36 @@ class Settings(BaseSettings):
         return v
     
     algorithm: str = "HS256"
+
+    @field_validator("algorithm")
+    @classmethod
+    def validate_algorithm(cls, v: str) -> str:
+        # python-jose solo firma HMAC, RSA PKCS#1 v1.5 y ECDSA: PS* o EdDSA fallarían al emitir el primer token
+        if v not in ("HS256", "HS384", "HS512", "RS256", "RS384", "RS512", "ES256", "ES384", "ES512"):
+            raise ValueError(f"Algoritmo JWT no soportado: {v} (usar HS*, RS* o ES*)")
+        return v
+
+    jwt_private_key_path: Optional[str] = Field(default=None, description="PEM de la clave privada activa (RS256/ES256)")
+    jwt_public_key_paths: str = Field(default="", description="PEMs públicos anteriores aún aceptados, separados por coma")
     access_token_expire_minutes: int = 15  # Reducido para mayor seguridad
     refresh_token_expire_days: int = 7     # Refresh token dura más
+    refresh_token_rotation: bool = Field(default=True, description="Rotar el refresh token en cada uso (False = refresh de solo lectura)")
+    refresh_token_reuse_grace_seconds: float = Field(default=10.0, ge=0, description="Ventana en la que repetir un refresh con el token recién rotado devuelve el mismo token nuevo en lugar de revocar (0 = sin gracia)")
+    token_codec: str = Field(default="jose", description="Codec de access tokens: 'jose' o 'fast' (solo HS*)")
+    token_cache_size: int = Field(default=10_000, description="Máximo de JWT verificados en caché (0 = desactivada)")
+
+    # Hashing de contraseñas
+    password_hasher: str = Field(default="bcrypt", description="Algoritmo para hashes nuevos: 'bcrypt' o 'argon2id'")
+    bcrypt_rounds: int = Field(default=12, ge=4, le=31, description="Factor de coste de bcrypt")
+    argon2_time_cost: int = Field(default=3, ge=1, description="Iteraciones de argon2id")
+    argon2_memory_cost: int = Field(default=65536, ge=8, description="Memoria de argon2id en KiB")
+    argon2_parallelism: int = Field(default=1, ge=1, description="Paralelismo de argon2id")
+    hash_time_budget_ms: float = Field(default=0, description="Latencia objetivo por hash; >0 calibra los parámetros al arrancar")
+    hash_rehash_tolerance: int = Field(default=1, ge=0, description="Pasos de coste (rounds de bcrypt, time_cost de argon2id) de diferencia que no provocan re-hash en el login")
+    hash_executor: str = Field(default="thread", description="Pool de hashing: 'thread' o 'process'")
+    hash_workers: int = Field(default=0, description="Workers del pool de hashing (0 = número de cores)")
+    hash_queue_size: int = Field(default=64, description="Operaciones de hashing en espera antes de responder 503")
+    hash_retry_after_seconds: int = Field(default=1, description="Valor de Retry-After cuando la cola de hashing está llena")
     
     # CORS
     cors_origins: str = Field(
@@ -53,6 +82,46 @@ class Settings(BaseSettings):
     # Cache / Redis
     redis_url: str = Field(default="redis://localhost", description="URL de conexión a Redis")
 
+    session_store: str = Field(default="sql", description="Almacenamiento de sesiones: 'sql', 'redis' o 'memory'")
+    session_store_redis_url: Optional[str] = Field(default=None, description="Redis para SESSION_STORE=redis (default: REDIS_URL)")
+    max_sessions_per_user: int = Field(default=10, ge=0, description="Sesiones activas por usuario; al crear una más se revocan las de uso más antiguo (0 = sin límite)")
+    session_cache_ttl_seconds: float = Field(default=30.0, description="TTL de la caché de validez de sesiones (0 = desactivada)")
+    session_cache_size: int = Field(default=50_000, description="Máximo de sesiones en la caché en proceso")
+    session_cache_redis: bool = Field(default=False, description="Activar la caché de sesiones con invalidaciones compartidas vía Redis")
+    session_cache_local_only: bool = Field(default=False, description="Activar la caché de sesiones sin Redis (solo con un único worker)")
+    session_activity_flush_seconds: float = Field(default=5.0, gt=0, description="Máximo retraso con que se persiste sessions.last_used_at")
+    session_activity_max_pending: int = Field(default=10_000, ge=1, description="Sesiones pendientes que fuerzan un flush anticipado")
+
+    # Retención de sesiones
+    session_retention_interval_seconds: float = Field(default=3600, ge=0, description="Cada cuánto corre el reaper de sesiones (0 = desactivado en la app)")
+    session_retention_grace_days: int = Field(default=30, ge=0, description="Días que se conservan las sesiones expiradas o revocadas (auditoría)")
+    session_retention_batch_size: int = Field(default=1000, ge=1, description="Sesiones borradas por lote")
+    session_retention_batch_pause_seconds: float = Field(default=0.1, ge=0, description="Pausa entre lotes del reaper")
+
+    # Caché de usuarios por id (GET /users/batch)
+    user_cache_ttl_seconds: float = Field(default=30.0, ge=0, description="Vida de una fila de usuario cacheada (0 = sin caché)")
+    user_cache_size: int = Field(default=10_000, ge=1, description="Máximo de usuarios en la caché en proceso")
+
+    # Baja de cuentas
+    user_soft_delete: bool = Field(default=True, description="DELETE /me marca deleted_at y sube el epoch; el purgador borra usuario y sesiones después (False = borrado inmediato)")
+    user_purge_interval_seconds: float = Field(default=60, ge=0, description="Cada cuánto corre el purgador de usuarios dados de baja (0 = desactivado en la app)")
+    user_purge_batch_size: int = Field(default=1000, ge=1, description="Sesiones borradas por lote al purgar un usuario")
+    user_purge_batch_pause_seconds: float = Field(default=0.05, ge=0, description="Pausa entre lotes del purgador de usuarios")
+
+    # Totales de listados paginados
+    count_strategy: str = Field(default="cached", description="Total de GET /users: 'exact', 'cached', 'estimate' (pg_class.reltuples) o 'none'")
+    count_cache_ttl_seconds: float = Field(default=60.0, ge=0, description="Vida del total cacheado con count_strategy='cached'")
+
+    # Exportación e importación masiva
+    export_batch_size: int = Field(default=1000, ge=1, description="Filas por lote del cursor de servidor en GET /users/export")
+    import_batch_size: int = Field(default=1000, ge=1, description="Filas validadas, hasheadas e insertadas por lote en la importación masiva")
+    import_hash_executor: str = Field(default="process", description="Pool de hashing de la importación: 'process' o 'thread'")
+    import_hash_workers: int = Field(default=0, ge=0, description="Workers del pool de hashing de la importación (0 = número de cores)")
+    import_max_errors: int = Field(default=1000, ge=0, description="Errores por fila detallados en el reporte de importación")
+
+    # Respuestas
+    fast_json_responses: bool = Field(default=False, description="Serializar listados y detalles con orjson sin revalidar contra response_model")
+
     # Observabilidad
     sentry_dsn: str | None = Field(default=None, description="Sentry DSN para error tracking")
     environment: str = Field(default="development", description="Entorno de ejecución")
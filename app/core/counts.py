@@ -0,0 +1,104 @@
+"""
+Totales de filas para listados paginados.
+
+`SELECT count(*)` recorre la tabla entera en PostgreSQL. Estrategias
+(`COUNT_STRATEGY`, o por request):
+
+- `exact`: `count(*)` en cada llamada.
+- `cached`: `count(*)` cacheado `COUNT_CACHE_TTL_SECONDS`; las escrituras
+  del proceso lo invalidan con `invalidate()`. Otros workers ven el cambio
+  al vencer el TTL.
+- `estimate`: `pg_class.reltuples`, la estimación del planner (actualizada
+  por ANALYZE/autovacuum). Fuera de PostgreSQL, o si la tabla nunca se
+  analizó, se usa `cached`.
+- `none`: no se calcula el total.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import ColumnElement, Table, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+COUNT_STRATEGIES = ("exact", "cached", "estimate", "none")
+
+_counts: TTLCache[int] = TTLCache("row_count", maxsize=64)
+
+
+@dataclass(frozen=True)
+class RowCount:
+    """Total de filas (None si no se calculó) y si es una estimación."""
+    value: Optional[int]
+    approximate: bool = False
+
+
+async def _exact(db: AsyncSession, table: Table, where: Optional[ColumnElement]) -> int:
+    query = select(func.count()).select_from(table)
+    if where is not None:
+        query = query.where(where)
+    result = await db.execute(query)
+    return result.scalar() or 0
+
+
+async def _cached(db: AsyncSession, table: Table, where: Optional[ColumnElement]) -> int:
+    value = _counts.get(table.name)
+    if value is None:
+        value = await _exact(db, table, where)
+        _counts.set(table.name, value, ttl=settings.count_cache_ttl_seconds)
+    return value
+
+
+async def _estimate(db: AsyncSession, table: Table) -> Optional[int]:
+    if db.bind.dialect.name != "postgresql":
+        return None
+    result = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": table.fullname},
+    )
+    value = result.scalar()
+    # -1 (PostgreSQL 14+): la tabla nunca se analizó
+    return value if value is not None and value >= 0 else None
+
+
+async def count_rows(
+    db: AsyncSession,
+    table: Table,
+    strategy: Optional[str] = None,
+    where: Optional[ColumnElement] = None,
+) -> RowCount:
+    """
+    Total de filas de `table` según `strategy` (default: `COUNT_STRATEGY`).
+
+    `where` filtra el conteo exacto o cacheado (un solo filtro por tabla: la
+    caché es por nombre de tabla). La estimación es de la tabla entera.
+
+    Raises:
+        ValueError: Si la estrategia no existe
+    """
+    strategy = strategy or settings.count_strategy
+    if strategy == "none":
+        return RowCount(None)
+    if strategy == "exact":
+        return RowCount(await _exact(db, table, where))
+    if strategy == "estimate":
+        estimate = await _estimate(db, table)
+        if estimate is not None:
+            return RowCount(estimate, approximate=True)
+        return RowCount(await _cached(db, table, where))
+    if strategy == "cached":
+        return RowCount(await _cached(db, table, where))
+    raise ValueError(
+        f"Estrategia de conteo desconocida: {strategy!r} (opciones: {', '.join(COUNT_STRATEGIES)})"
+    )
+
+
+def invalidate(table: Table) -> None:
+    """Descarta el total cacheado de `table` (llamar tras insertar o borrar filas)."""
+    _counts.pop(table.name)
+
+
+def clear() -> None:
+    """Vacía los totales cacheados."""
+    _counts.clear()
@@ -64,3 +64,39 @@ class NotAuthenticatedException(HTTPException):
             detail=detail,
             headers={"WWW-Authenticate": "Bearer"}
         )
+
+
+class ServiceOverloadedException(HTTPException):
+    """
+    Excepción lanzada cuando un recurso acotado está saturado
+    (por ejemplo, la cola de hashing de contraseñas).
+    
+    Código HTTP: 503 Service Unavailable
+    Incluye header Retry-After para que el cliente reintente más tarde.
+    """
+    
+    def __init__(
+        self,
+        detail: str = "Servicio saturado, intente nuevamente más tarde",
+        retry_after: int = 1
+    ):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class InvalidCursorException(HTTPException):
+    """
+    Excepción lanzada cuando un cursor de paginación está mal formado
+    o fue emitido para otro orden.
+    
+    Código HTTP: 400 Bad Request
+    """
+    
+    def __init__(self, detail: str = "Cursor de paginación inválido"):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        )
@@ -0,0 +1,475 @@
+"""
+Hashing de contraseñas: algoritmos intercambiables y executor dedicado.
+
+- Registro de hashers (bcrypt, argon2id) con calibración de parámetros al
+  arranque según un presupuesto de latencia en la máquina actual.
+- bcrypt/argon2 son CPU bound (~200ms por operación). En lugar de usar el
+  thread pool por defecto de asyncio (compartido, sin límite ni visibilidad),
+  las operaciones se ejecutan en un pool propio dimensionado a los cores, con
+  una cola acotada que rechaza trabajo cuando está saturada (backpressure).
+"""
+import asyncio
+import math
+import os
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import bcrypt
+
+from app.core.config import settings
+from app.core.exceptions import ServiceOverloadedException
+from app.core.logging import get_logger
+from app.core.metrics import HASH_QUEUE_DEPTH, record_hash_duration, record_hash_rejected
+
+logger = get_logger(__name__)
+
+
+class PasswordHasher(ABC):
+    """
+    Algoritmo de hashing de contraseñas con parámetros fijos.
+
+    Las instancias son inmutables y serializables (pickle) para poder
+    ejecutarse en un ProcessPoolExecutor.
+    """
+
+    name: str
+
+    @abstractmethod
+    def hash(self, password: str) -> str:
+        """Genera un hash (Síncrono - CPU bound)."""
+
+    @abstractmethod
+    def verify(self, password: str, hashed: str) -> bool:
+        """Verifica una contraseña contra un hash de este algoritmo."""
+
+    @abstractmethod
+    def identify(self, hashed: str) -> bool:
+        """Indica si el hash fue generado por este algoritmo."""
+
+    @abstractmethod
+    def needs_rehash(self, hashed: str, tolerance: int = 0) -> bool:
+        """
+        Indica si el hash usa parámetros distintos a los actuales.
+
+        Un factor de coste a `tolerance` pasos o menos del actual no cuenta
+        como distinto (workers calibrados en un paso diferente).
+        """
+
+    @abstractmethod
+    def calibrate(self, budget_ms: float) -> "PasswordHasher":
+        """Devuelve un hasher con el mayor coste que cabe en `budget_ms`."""
+
+    @abstractmethod
+    def as_settings(self) -> dict[str, Any]:
+        """Parámetros del hasher como campos de `Settings` (para fijarlos en el entorno)."""
+
+    def _time_hash(self) -> float:
+        start = time.perf_counter()
+        self.hash(secrets.token_urlsafe(16))
+        return (time.perf_counter() - start) * 1000
+
+
+class BcryptHasher(PasswordHasher):
+    """bcrypt con factor de coste `rounds` (solo usa los primeros 72 bytes)."""
+
+    name = "bcrypt"
+    MIN_ROUNDS = 10
+    MAX_ROUNDS = 16
+
+    def __init__(self, rounds: int = 12):
+        self.rounds = rounds
+
+    @staticmethod
+    def _encode(password: str) -> bytes:
+        # bcrypt>=5 rechaza contraseñas de más de 72 bytes
+        return password.encode("utf-8")[:72]
+
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(self._encode(password), salt).decode("utf-8")
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return bcrypt.checkpw(self._encode(password), hashed.encode("utf-8"))
+
+    def identify(self, hashed: str) -> bool:
+        return hashed.startswith(("$2a$", "$2b$", "$2y$"))
+
+    def needs_rehash(self, hashed: str, tolerance: int = 0) -> bool:
+        try:
+            return abs(int(hashed.split("$")[2]) - self.rounds) > tolerance
+        except (IndexError, ValueError):
+            return True
+
+    def calibrate(self, budget_ms: float) -> "BcryptHasher":
+        # Cada round duplica el coste: medir una vez y extrapolar
+        base = self.MIN_ROUNDS
+        elapsed = BcryptHasher(base)._time_hash()
+        extra = int(math.floor(math.log2(budget_ms / elapsed))) if budget_ms > elapsed else 0
+        return BcryptHasher(min(base + extra, self.MAX_ROUNDS))
+
+    def as_settings(self) -> dict[str, Any]:
+        return {"password_hasher": self.name, "bcrypt_rounds": self.rounds}
+
+    def __repr__(self) -> str:
+        return f"BcryptHasher(rounds={self.rounds})"
+
+
+class Argon2Hasher(PasswordHasher):
+    """argon2id (requiere `argon2-cffi`)."""
+
+    name = "argon2id"
+    MAX_TIME_COST = 10
+
+    def __init__(self, time_cost: int = 3, memory_cost: int = 65536, parallelism: int = 1):
+        self.time_cost = time_cost
+        self.memory_cost = memory_cost
+        self.parallelism = parallelism
+
+    def _hasher(self):
+        try:
+            from argon2 import PasswordHasher as _Argon2
+        except ImportError as e:
+            raise RuntimeError("argon2id requiere el paquete 'argon2-cffi'") from e
+        return _Argon2(
+            time_cost=self.time_cost,
+            memory_cost=self.memory_cost,
+            parallelism=self.parallelism,
+        )
+
+    def hash(self, password: str) -> str:
+        return self._hasher().hash(password)
+
+    def verify(self, password: str, hashed: str) -> bool:
+        from argon2.exceptions import VerificationError, InvalidHashError
+        try:
+            return self._hasher().verify(hashed, password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+    def identify(self, hashed: str) -> bool:
+        return hashed.startswith("$argon2id$")
+
+    def needs_rehash(self, hashed: str, tolerance: int = 0) -> bool:
+        from argon2 import Type, extract_parameters
+        from argon2.exceptions import InvalidHashError
+
+        if tolerance == 0:
+            return self._hasher().check_needs_rehash(hashed)
+        try:
+            params = extract_parameters(hashed)
+        except InvalidHashError:
+            return True
+        return (
+            params.type is not Type.ID
+            or params.memory_cost != self.memory_cost
+            or params.parallelism != self.parallelism
+            or abs(params.time_cost - self.time_cost) > tolerance
+        )
+
+    def calibrate(self, budget_ms: float) -> "Argon2Hasher":
+        # Memoria fija; el coste crece linealmente con time_cost
+        elapsed = Argon2Hasher(1, self.memory_cost, self.parallelism)._time_hash()
+        time_cost = max(1, min(int(budget_ms // elapsed), self.MAX_TIME_COST))
+        return Argon2Hasher(time_cost, self.memory_cost, self.parallelism)
+
+    def as_settings(self) -> dict[str, Any]:
+        return {
+            "password_hasher": self.name,
+            "argon2_time_cost": self.time_cost,
+            "argon2_memory_cost": self.memory_cost,
+            "argon2_parallelism": self.parallelism,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"Argon2Hasher(time_cost={self.time_cost}, "
+            f"memory_cost={self.memory_cost}, parallelism={self.parallelism})"
+        )
+
+
+# Registro de algoritmos disponibles
+HASHERS: dict[str, type[PasswordHasher]] = {
+    BcryptHasher.name: BcryptHasher,
+    Argon2Hasher.name: Argon2Hasher,
+}
+
+
+def _build_hasher(name: str) -> PasswordHasher:
+    if name == BcryptHasher.name:
+        return BcryptHasher(settings.bcrypt_rounds)
+    if name == Argon2Hasher.name:
+        return Argon2Hasher(
+            settings.argon2_time_cost, settings.argon2_memory_cost, settings.argon2_parallelism
+        )
+    raise ValueError(f"Algoritmo de hashing desconocido: {name}")
+
+
+def _configured_hashers() -> list[PasswordHasher]:
+    """Un hasher por algoritmo registrado, con los parámetros de la configuración."""
+    return [_build_hasher(name) for name in HASHERS]
+
+
+def _dummy_hashes(
+    hashers: list[PasswordHasher], previous: dict[str, str]
+) -> dict[str, str]:
+    """Señuelos por hasher (clave: repr, que incluye algoritmo y parámetros)."""
+    dummies: dict[str, str] = {}
+    for hasher in hashers:
+        key = repr(hasher)
+        if key in dummies:
+            continue
+        if key in previous:
+            dummies[key] = previous[key]
+            continue
+        try:
+            dummies[key] = hasher.hash(secrets.token_urlsafe(32))
+        except RuntimeError as e:
+            # Algoritmo registrado sin su dependencia opcional (argon2-cffi)
+            logger.info("dummy_hash_skipped", hasher=key, reason=str(e))
+    return dummies
+
+
+_current_hasher: PasswordHasher = _build_hasher(settings.password_hasher)
+
+# Hashes señuelo precalculados, uno por algoritmo y coste configurados, para
+# que un login con email inexistente cueste exactamente una verificación con
+# los parámetros vigentes. Solo se calculan al importar y en configure_hasher,
+# nunca en el camino de una request
+_dummies: dict[str, str] = _dummy_hashes([_current_hasher], {})
+
+
+def get_hasher() -> PasswordHasher:
+    """Hasher usado para generar hashes nuevos."""
+    return _current_hasher
+
+
+def get_dummy_hash(hasher: Optional[PasswordHasher] = None) -> Optional[str]:
+    """Hash señuelo precalculado de `hasher` (default: el actual, que siempre tiene uno)."""
+    return _dummies.get(repr(hasher or _current_hasher))
+
+
+def identify_hasher(hashed: str) -> PasswordHasher:
+    """Hasher capaz de verificar un hash existente (según su prefijo)."""
+    if _current_hasher.identify(hashed):
+        return _current_hasher
+    for name in HASHERS:
+        hasher = _build_hasher(name)
+        if hasher.identify(hashed):
+            return hasher
+    raise ValueError("Formato de hash de contraseña desconocido")
+
+
+def needs_rehash(hashed: str) -> bool:
+    """
+    Indica si el hash no corresponde al algoritmo/parámetros actuales.
+
+    Tolera `HASH_REHASH_TOLERANCE` pasos de coste: si dos workers calibran
+    costes vecinos, cada login no reescribe el hash de un coste al otro.
+    """
+    return not _current_hasher.identify(hashed) or _current_hasher.needs_rehash(
+        hashed, settings.hash_rehash_tolerance
+    )
+
+
+def calibrate_hasher(budget_ms: float, samples: int = 5) -> PasswordHasher:
+    """
+    Calibra el hasher configurado para `budget_ms` (Síncrono - CPU bound).
+
+    Mide `samples` veces y se queda con el coste más frecuente, para no
+    depender de una sola medición ruidosa. Pensado
+    para correr una vez por despliegue y fijar el resultado en el entorno
+    (`python -m app.cli calibrate-hasher`).
+    """
+    base = _build_hasher(settings.password_hasher)
+    results = [base.calibrate(budget_ms) for _ in range(max(samples, 1))]
+    counts = Counter(repr(hasher) for hasher in results)
+    return max(results, key=lambda hasher: counts[repr(hasher)])
+
+
+def configure_hasher() -> PasswordHasher:
+    """
+    Selecciona el hasher configurado y, si hay presupuesto de latencia,
+    calibra sus parámetros en la máquina actual (llamar en el arranque).
+
+    Con varios workers conviene calibrar una vez (`calibrate_hasher`) y fijar
+    los parámetros con `HASH_TIME_BUDGET_MS=0`: cada proceso mide por su
+    cuenta y puede quedar un paso de coste por encima o por debajo.
+
+    Precalcula también los hashes señuelo del hasher elegido y de cada
+    algoritmo configurado, antes de publicar el hasher: el camino de email
+    inexistente siempre encuentra el señuelo del coste vigente.
+    """
+    global _current_hasher, _dummies
+    hasher = _build_hasher(settings.password_hasher)
+    if settings.hash_time_budget_ms > 0:
+        hasher = hasher.calibrate(settings.hash_time_budget_ms)
+    _dummies = _dummy_hashes([hasher, *_configured_hashers()], _dummies)
+    _current_hasher = hasher
+    logger.info("password_hasher_configured", hasher=repr(hasher))
+    return hasher
+
+
+class HashingExecutor:
+    """
+    Pool acotado para operaciones de hashing.
+
+    Atributos:
+        kind: "thread" o "process"
+        workers: Número de workers (0 = número de cores)
+        max_queue: Trabajos que pueden esperar además de los que se ejecutan
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 0, max_queue: int = 64):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Tipo de executor de hashing inválido: {kind}")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        # (loop, future) de los llamadores de run_queued que esperan un cupo
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    @property
+    def capacity(self) -> int:
+        """Trabajos admitidos simultáneamente (en ejecución + en cola)."""
+        return self.workers + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        """Trabajos en ejecución o en cola."""
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="hashing"
+                )
+            logger.info("hashing_executor_started", kind=self.kind, workers=self.workers)
+        return self._executor
+
+    @staticmethod
+    def _wake(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def _release(self, _: Optional[Future]) -> None:
+        # Callback del pool: el trabajo terminó o se canceló antes de empezar
+        with self._lock:
+            self._pending -= 1
+            HASH_QUEUE_DEPTH.set(self._pending)
+            waiters, self._waiters = self._waiters, []
+        # Todos reintentan; los que no consigan cupo se vuelven a registrar
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(self._wake, waiter)
+            except RuntimeError:
+                pass  # loop ya cerrado
+
+    def _reserve(self, waiter: Optional[tuple] = None) -> bool:
+        """Ocupa un cupo; si no hay y se indica `waiter`, lo registra para avisarle."""
+        with self._lock:
+            if self._pending >= self.capacity:
+                if waiter is not None:
+                    self._waiters.append(waiter)
+                return False
+            self._pending += 1
+            HASH_QUEUE_DEPTH.set(self._pending)
+            return True
+
+    def _start(self, fn: Callable[..., Any], *args: Any) -> Future:
+        # Llamar con un cupo ya reservado
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _submit(self, operation: str, fn: Callable[..., Any], *args: Any) -> Future:
+        if not self._reserve():
+            record_hash_rejected(operation)
+            logger.warning("hashing_queue_full", operation=operation, pending=self._pending)
+            raise ServiceOverloadedException(retry_after=settings.hash_retry_after_seconds)
+        return self._start(fn, *args)
+
+    async def run(self, operation: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Ejecuta `fn(*args)` en el pool.
+
+        El cupo se ocupa al encolar y se libera cuando el pool termina el
+        trabajo, no cuando lo deja de esperar el llamador: una request
+        cancelada no libera lugar mientras su hash siga en ejecución.
+
+        Raises:
+            ServiceOverloadedException: Si la cola está llena (503 + Retry-After)
+        """
+        return await self._wait(operation, self._submit(operation, fn, *args))
+
+    async def run_queued(self, operation: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Como `run`, pero si la cola está llena espera un cupo en lugar de rechazar.
+
+        Para trabajos por lotes (importación masiva): un lote no puede fallar
+        a mitad de camino por la carga de otros, con los anteriores ya confirmados.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            waiter = loop.create_future()
+            if self._reserve((loop, waiter)):
+                break
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+                raise
+        return await self._wait(operation, self._start(fn, *args))
+
+    async def _wait(self, operation: str, future: Future) -> Any:
+        start = time.perf_counter()
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Si aún no empezó, se retira de la cola y libera su cupo
+            future.cancel()
+            raise
+        finally:
+            record_hash_duration(operation, time.perf_counter() - start)
+
+    def shutdown(self) -> None:
+        """Detiene el pool (se recrea bajo demanda si se vuelve a usar)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def hash_many(passwords: list[str], hasher: PasswordHasher) -> list[str]:
+    """Hashea una tanda de contraseñas en un solo trabajo del pool (importación masiva)."""
+    return [hasher.hash(password) for password in passwords]
+
+
+hashing_executor = HashingExecutor(
+    kind=settings.hash_executor,
+    workers=settings.hash_workers,
+    max_queue=settings.hash_queue_size,
+)
+
+# Pool separado para la importación masiva: sus miles de hashes no ocupan la
+# cola acotada de login/registro ni provocan 503 en esos endpoints
+import_hashing_executor = HashingExecutor(
+    kind=settings.import_hash_executor,
+    workers=settings.import_hash_workers,
+    max_queue=settings.import_hash_workers or os.cpu_count() or 1,
+)
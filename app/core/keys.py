@@ -0,0 +1,131 @@
+"""
+Claves asimétricas para firmar y verificar JWT.
+
+Con un algoritmo asimétrico (RS256, ES256, ...) los tokens se firman con la
+clave privada activa y llevan en el header un `kid` (thumbprint RFC 7638).
+Las claves públicas se publican como JWKS para que otros servicios verifiquen
+los tokens localmente. Las claves públicas anteriores siguen aceptándose
+durante la rotación.
+"""
+import base64
+import hashlib
+import json
+from pathlib import Path
+from typing import Optional
+
+from jose import jwk
+from jose.backends.base import Key
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+ASYMMETRIC_PREFIXES = ("RS", "ES")
+
+# Miembros requeridos del JWK para el thumbprint (RFC 7638)
+_THUMBPRINT_MEMBERS = {"RSA": ("e", "kty", "n"), "EC": ("crv", "kty", "x", "y")}
+
+
+def is_asymmetric(algorithm: str) -> bool:
+    """Indica si el algoritmo JWT usa par de claves."""
+    return algorithm.startswith(ASYMMETRIC_PREFIXES)
+
+
+def _thumbprint(public_jwk: dict) -> str:
+    members = _THUMBPRINT_MEMBERS[public_jwk["kty"]]
+    canonical = json.dumps(
+        {name: public_jwk[name] for name in members}, separators=(",", ":"), sort_keys=True
+    )
+    digest = hashlib.sha256(canonical.encode("utf-8")).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+class KeyRing:
+    """
+    Claves parseadas una sola vez y cacheadas en proceso.
+
+    Atributos:
+        algorithm: Algoritmo JWT (RS256, ES256, ...)
+        signing_key: Clave privada activa (objeto de python-jose)
+        signing_kid: kid de la clave activa
+        verification_keys: kid -> clave pública (activa + anteriores)
+    """
+
+    def __init__(self, algorithm: str, private_pem: str, previous_public_pems: list[str]):
+        self.algorithm = algorithm
+        self.signing_key: Key = jwk.construct(private_pem, algorithm)
+        active_public = self.signing_key.public_key()
+        self.signing_kid = _thumbprint(active_public.to_dict())
+
+        self.verification_keys: dict[str, Key] = {self.signing_kid: active_public}
+        for pem in previous_public_pems:
+            public = jwk.construct(pem, algorithm)
+            self.verification_keys[_thumbprint(public.to_dict())] = public
+
+        self._jwks_json = json.dumps(self.jwks()).encode("utf-8")
+
+    def get_verification_key(self, kid: Optional[str]) -> Optional[Key]:
+        """Clave pública para un kid (None si es desconocido)."""
+        if kid is None:
+            return None
+        return self.verification_keys.get(kid)
+
+    def jwks(self) -> dict:
+        """JWK Set con las claves públicas aceptadas."""
+        keys = []
+        for kid, key in self.verification_keys.items():
+            public_jwk = key.to_dict()
+            public_jwk.update({"kid": kid, "use": "sig", "alg": self.algorithm})
+            keys.append(public_jwk)
+        return {"keys": keys}
+
+    @property
+    def jwks_json(self) -> bytes:
+        """JWKS serializado (precalculado)."""
+        return self._jwks_json
+
+
+_key_ring: Optional[KeyRing] = None
+
+
+def get_key_ring() -> KeyRing:
+    """Carga (una vez) las claves configuradas."""
+    global _key_ring
+    if _key_ring is None:
+        if not settings.jwt_private_key_path:
+            raise RuntimeError(
+                f"El algoritmo {settings.algorithm} requiere JWT_PRIVATE_KEY_PATH"
+            )
+        private_pem = Path(settings.jwt_private_key_path).read_text()
+        previous = [
+            Path(path.strip()).read_text()
+            for path in settings.jwt_public_key_paths.split(",")
+            if path.strip()
+        ]
+        _key_ring = KeyRing(settings.algorithm, private_pem, previous)
+        logger.info(
+            "jwt_keys_loaded", kid=_key_ring.signing_kid, keys=len(_key_ring.verification_keys)
+        )
+    return _key_ring
+
+
+def reset_key_ring() -> None:
+    """
+    Descarta las claves cargadas (se recargan en el próximo uso, p. ej. tras rotar).
+
+    Vacía la caché de JWT verificados para que un token de una clave retirada
+    no siga aceptándose hasta su `exp`.
+    """
+    from app.core.security import clear_token_cache
+
+    global _key_ring
+    _key_ring = None
+    clear_token_cache()
+
+
+def get_jwks_json() -> bytes:
+    """JWKS para el endpoint público (vacío con algoritmos simétricos)."""
+    if not is_asymmetric(settings.algorithm):
+        return b'{"keys":[]}'
+    return get_key_ring().jwks_json
@@ -49,6 +49,86 @@ ACTIVE_SESSIONS = Gauge(
     'Total de sesiones activas'
 )
 
+# Métricas de hashing de contraseñas
+HASH_QUEUE_DEPTH = Gauge(
+    'password_hash_queue_depth',
+    'Operaciones de hashing en ejecución o en cola'
+)
+
+HASH_DURATION = Histogram(
+    'password_hash_duration_seconds',
+    'Duración de operaciones de hashing (espera + ejecución)',
+    ['operation'],
+    buckets=[0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2.5, 5, 10]
+)
+
+HASH_REJECTED = Counter(
+    'password_hash_rejected_total',
+    'Operaciones de hashing rechazadas por cola saturada',
+    ['operation']
+)
+
+# Métricas del buffer de actividad de sesiones
+SESSION_ACTIVITY_PENDING = Gauge(
+    'session_activity_pending',
+    'Sesiones con last_used_at pendiente de persistir'
+)
+
+SESSION_ACTIVITY_FLUSHED = Counter(
+    'session_activity_flushed_total',
+    'Actualizaciones de last_used_at persistidas en lote'
+)
+
+SESSIONS_EVICTED = Counter(
+    'sessions_evicted_total',
+    'Sesiones revocadas por superar MAX_SESSIONS_PER_USER',
+    ['store']
+)
+
+USERS_IMPORTED = Counter(
+    'users_imported_total',
+    'Filas procesadas por la importación masiva de usuarios',
+    ['outcome']
+)
+
+USERS_PURGED = Counter(
+    'users_purged_total',
+    'Filas borradas por el purgador de usuarios dados de baja',
+    ['table']
+)
+
+# Métricas de retención de sesiones
+SESSION_RETENTION_PURGED = Counter(
+    'session_retention_purged_total',
+    'Sesiones eliminadas por el reaper de retención',
+    ['reason']
+)
+
+SESSION_RETENTION_BATCH_DURATION = Histogram(
+    'session_retention_batch_duration_seconds',
+    'Duración de cada lote de borrado del reaper',
+    ['reason'],
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+)
+
+SESSION_RETENTION_LAG = Gauge(
+    'session_retention_lag_seconds',
+    'Antigüedad de la sesión purgable más vieja aún sin borrar'
+)
+
+# Métricas de cachés en proceso
+CACHE_HITS = Counter(
+    'cache_hits_total',
+    'Total de aciertos en cachés en proceso',
+    ['cache']
+)
+
+CACHE_MISSES = Counter(
+    'cache_misses_total',
+    'Total de fallos en cachés en proceso',
+    ['cache']
+)
+
 
 def get_metrics() -> Response:
     """Genera respuesta con métricas en formato Prometheus."""
@@ -78,3 +158,52 @@ def record_http_request(method: str, endpoint: str, status: int, duration: float
     """Registra una request HTTP."""
     HTTP_REQUESTS.labels(method=method, endpoint=endpoint, status=str(status)).inc()
     HTTP_REQUEST_DURATION.labels(method=method, endpoint=endpoint).observe(duration)
+
+
+def record_cache_hit(cache: str):
+    """Registra un acierto de caché."""
+    CACHE_HITS.labels(cache=cache).inc()
+
+
+def record_cache_miss(cache: str):
+    """Registra un fallo de caché."""
+    CACHE_MISSES.labels(cache=cache).inc()
+
+
+def record_hash_duration(operation: str, duration: float):
+    """Registra la duración de una operación de hashing."""
+    HASH_DURATION.labels(operation=operation).observe(duration)
+
+
+def record_hash_rejected(operation: str):
+    """Registra una operación de hashing rechazada."""
+    HASH_REJECTED.labels(operation=operation).inc()
+
+
+def record_session_activity_flush(rows: int):
+    """Registra un flush del buffer de actividad de sesiones."""
+    SESSION_ACTIVITY_FLUSHED.inc(rows)
+
+
+def record_session_eviction(store: str, count: int):
+    """Registra sesiones revocadas por el límite por usuario."""
+    SESSIONS_EVICTED.labels(store=store).inc(count)
+
+
+def record_session_retention_batch(reason: str, rows: int, duration: float):
+    """Registra un lote de borrado del reaper de sesiones."""
+    SESSION_RETENTION_PURGED.labels(reason=reason).inc(rows)
+    SESSION_RETENTION_BATCH_DURATION.labels(reason=reason).observe(duration)
+
+
+def record_user_import(created: int, duplicates: int, invalid: int):
+    """Registra el resultado de una importación masiva."""
+    USERS_IMPORTED.labels(outcome="created").inc(created)
+    USERS_IMPORTED.labels(outcome="duplicate").inc(duplicates)
+    USERS_IMPORTED.labels(outcome="invalid").inc(invalid)
+
+
+def record_user_purge(users: int, sessions: int):
+    """Registra usuarios dados de baja purgados y sus sesiones."""
+    USERS_PURGED.labels(table="users").inc(users)
+    USERS_PURGED.labels(table="sessions").inc(sessions)
@@ -0,0 +1,158 @@
+"""
+Paginación por cursor (keyset).
+
+En lugar de `OFFSET n`, que recorre y descarta n filas, cada página arranca
+con un predicado de búsqueda sobre la clave de orden de la última fila vista:
+`WHERE (created_at, id) > (:c, :i) ORDER BY created_at, id LIMIT :n`. Con un
+índice sobre esas columnas el costo no depende de la profundidad.
+
+El cursor es opaco para el cliente: JSON en base64url con los valores de la
+clave, la dirección y el orden para el que se emitió (un cursor de otro
+orden se rechaza).
+
+Los valores de la clave viajan tal como los guarda la base. SQLite almacena
+DATETIME como texto en formatos distintos (`CURRENT_TIMESTAMP` sin fracción,
+el ORM con microsegundos) y ordena comparando ese texto; si el predicado
+comparara contra un datetime de Python, renderizado en otro formato, las
+filas con la misma fecha se saltearían o repetirían.
+"""
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+import orjson
+from sqlalchemy import DateTime, Select, String, tuple_, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import InvalidCursorException
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """Posición decodificada: valores de la clave y si se avanza hacia atrás."""
+    values: tuple
+    backwards: bool = False
+
+
+@dataclass
+class KeysetPage:
+    """
+    Página obtenida por cursor.
+
+    Atributos:
+        items: Filas de la página, siempre en el orden pedido
+        has_more: Si quedan filas en la dirección de avance
+        next_cursor: Cursor de la página siguiente (o None)
+        prev_cursor: Cursor de la página anterior (o None)
+    """
+    items: list
+    has_more: bool
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def encode_cursor(values: Sequence[Any], scope: str, backwards: bool = False) -> str:
+    """Serializa una posición en un cursor opaco."""
+    payload = orjson.dumps({"s": scope, "b": backwards, "k": list(values)})
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str, scope: str, keys: Sequence) -> Cursor:
+    """
+    Decodifica un cursor emitido para `scope` y la clave `keys`.
+
+    Raises:
+        InvalidCursorException: Si el cursor está mal formado o es de otro orden
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = orjson.loads(raw)
+        if data["s"] != scope or len(data["k"]) != len(keys):
+            raise InvalidCursorException()
+        # Las fechas se validan pero se conservan como texto: el formato
+        # almacenado lo resuelve paginate_keyset según el dialecto
+        for key, value in zip(keys, data["k"]):
+            if isinstance(key.type, DateTime):
+                datetime.fromisoformat(value)
+        return Cursor(values=tuple(data["k"]), backwards=bool(data["b"]))
+    except (binascii.Error, orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+        raise InvalidCursorException()
+
+
+async def paginate_keyset(
+    db: AsyncSession,
+    query: Select,
+    keys: Sequence,
+    limit: int,
+    scope: str,
+    cursor: Optional[Cursor] = None,
+    descending: bool = False,
+    rows: bool = False,
+) -> KeysetPage:
+    """
+    Ejecuta `query` paginado por `keys`.
+
+    `keys` debe identificar cada fila de forma única (terminar en la PK) y
+    tener un índice con esas columnas. Se piden `limit + 1` filas para
+    saber si hay más sin contar.
+
+    Args:
+        db: Sesión de BD
+        query: SELECT base (con sus filtros, sin ORDER BY)
+        keys: Columnas de la clave de orden
+        limit: Filas por página
+        scope: Identificador del orden, embebido en los cursores
+        cursor: Posición de partida (None = primera página)
+        descending: Orden descendente
+        rows: `query` es una proyección de columnas; los items son dicts
+            (si no, un SELECT de entidades ORM y los items son instancias)
+    """
+    backwards = cursor is not None and cursor.backwards
+    # Hacia atrás se recorre en el orden inverso y luego se da vuelta la página
+    reverse = descending != backwards
+
+    # En SQLite las fechas se comparan y se leen como el texto almacenado
+    as_text = db.get_bind().dialect.name == "sqlite"
+    seek = [
+        type_coerce(k, String) if as_text and isinstance(k.type, DateTime) else k
+        for k in keys
+    ]
+
+    if cursor is not None:
+        values = [
+            datetime.fromisoformat(v) if not as_text and isinstance(k.type, DateTime) else v
+            for k, v in zip(keys, cursor.values)
+        ]
+        key = tuple_(*seek) if len(keys) > 1 else seek[0]
+        value = tuple_(*values) if len(keys) > 1 else values[0]
+        query = query.where(key < value if reverse else key > value)
+    labels = [f"_cursor_{i}" for i in range(len(keys))]
+    query = (
+        query.add_columns(*(k.label(label) for k, label in zip(seek, labels)))
+        .order_by(*(k.desc() if reverse else k.asc() for k in keys))
+        .limit(limit + 1)
+    )
+
+    result = await db.execute(query)
+    fetched = []
+    for row in result:
+        item = row._asdict() if rows else row[0]
+        if rows:
+            for label in labels:
+                del item[label]
+        fetched.append((item, [row._mapping[label] for label in labels]))
+    has_more = len(fetched) > limit
+    fetched = fetched[:limit]
+    if backwards:
+        fetched.reverse()
+    items = [item for item, _ in fetched]
+
+    page = KeysetPage(items=items, has_more=has_more)
+    if items:
+        if has_more or backwards:
+            page.next_cursor = encode_cursor(fetched[-1][1], scope)
+        if cursor is not None and (has_more or not backwards):
+            page.prev_cursor = encode_cursor(fetched[0][1], scope, backwards=True)
+    return page
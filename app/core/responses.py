@@ -0,0 +1,79 @@
+"""
+Respuestas JSON rápidas para payloads grandes.
+
+Por defecto FastAPI valida el valor devuelto contra `response_model`
+(construyendo un `TypeAdapter` por request) y lo serializa con `json` de la
+stdlib. Con `FAST_JSON_RESPONSES=true` los endpoints que usan
+`model_response` se saltean ese camino:
+
+- `trusted=True`: el handler garantiza que el contenido ya tiene la forma del
+  modelo (proyecciones de `user_queries`, modelos ya construidos). No se
+  valida de nuevo y se codifica con orjson.
+- `trusted=False`: se valida con un `TypeAdapter` cacheado por tipo y se
+  serializa con el serializador de pydantic-core.
+
+El `response_model` del endpoint se mantiene para OpenAPI; el JSON producido
+es idéntico al del camino estándar.
+"""
+import json
+from functools import lru_cache
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+
+from app.core.config import settings
+
+try:
+    import orjson
+
+    def _dumps(content: Any) -> bytes:
+        # OPT_UTC_Z: datetimes UTC como "...Z", igual que pydantic
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+except ImportError:  # pragma: no cover - orjson es opcional
+    def _dumps(content: Any) -> bytes:
+        return json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """Respuesta JSON codificada con orjson (sin validar el contenido)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return _dumps(content)
+
+
+@lru_cache(maxsize=128)
+def get_adapter(model: Any) -> TypeAdapter:
+    """`TypeAdapter` cacheado por tipo (construirlo cuesta más que usarlo)."""
+    return TypeAdapter(model)
+
+
+def model_response(content: Any, model: Any, trusted: bool = False, status_code: int = 200) -> Any:
+    """
+    Devuelve `content` por el camino rápido si `FAST_JSON_RESPONSES` está activo.
+
+    Args:
+        content: Dicts, listas o modelos pydantic con la forma de `model`
+        model: Tipo de la respuesta (el mismo que el `response_model` del endpoint)
+        trusted: El contenido ya cumple `model` y no hace falta validarlo
+        status_code: Código HTTP
+
+    Returns:
+        Un `Response` ya serializado, o `content` sin tocar si el modo rápido
+        está desactivado (FastAPI lo valida y serializa como siempre)
+    """
+    if not settings.fast_json_responses:
+        return content
+    if isinstance(content, BaseModel):
+        body = content.__pydantic_serializer__.to_json(content)
+        return Response(body, status_code, media_type="application/json")
+    if trusted:
+        return FastJSONResponse(content, status_code)
+    adapter = get_adapter(model)
+    body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+    return Response(body, status_code, media_type="application/json")
@@ -1,44 +1,216 @@
 """
 Utilidades de seguridad para autenticación asíncrona.
 """
-import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+from abc import ABC, abstractmethod
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from jose import JWTError, jwt
-import bcrypt
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import session_cache
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.keys import get_key_ring, is_asymmetric
+from app.core.session_store import get_session_store
+from app.core.hashing import (
+    PasswordHasher, get_dummy_hash, get_hasher, hashing_executor, identify_hasher,
+)
 from app.core.logging import get_logger
+from app.core.metrics import record_session_eviction
 
 logger = get_logger(__name__)
 
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson es opcional
+    def _dumps(value) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    _loads = json.loads
+
+# Caché de JWT ya verificados: sha256(token) -> payload, expira en el `exp` del token
+_token_cache: TTLCache[dict] = TTLCache(
+    "jwt", maxsize=max(settings.token_cache_size, 1), default_ttl=float("inf")
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifica una contraseña contra su hash (Síncrono - CPU bound)."""
-    return bcrypt.checkpw(
-        plain_password.encode('utf-8'),
-        hashed_password.encode('utf-8')
-    )
+    """Verifica una contraseña contra su hash, detectando el algoritmo (Síncrono - CPU bound)."""
+    return identify_hasher(hashed_password).verify(plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> str:
-    """Genera un hash bcrypt (Síncrono - CPU bound)."""
-    password_bytes = password.encode('utf-8')[:72]
-    salt = bcrypt.gensalt(rounds=12)
-    return bcrypt.hashpw(password_bytes, salt).decode('utf-8')
+def get_password_hash(password: str, hasher: Optional[PasswordHasher] = None) -> str:
+    """Genera un hash con el hasher actual o el indicado (Síncrono - CPU bound)."""
+    return (hasher or get_hasher()).hash(password)
 
 
 async def async_verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifica contraseña en thread pool para no bloquear el event loop."""
-    return await asyncio.to_thread(verify_password, plain_password, hashed_password)
+    """Verifica contraseña en el executor de hashing para no bloquear el event loop."""
+    return await hashing_executor.run("verify", verify_password, plain_password, hashed_password)
 
 
 async def async_get_password_hash(password: str) -> str:
-    """Genera hash bcrypt en thread pool para no bloquear el event loop."""
-    return await asyncio.to_thread(get_password_hash, password)
+    """Genera hash en el executor de hashing para no bloquear el event loop."""
+    # El hasher viaja como argumento: un worker de proceso no conoce la calibración
+    return await hashing_executor.run("hash", get_password_hash, password, get_hasher())
+
+
+async def async_verify_dummy_password(plain_password: str) -> bool:
+    """
+    Verifica contra el hash señuelo del hasher actual (siempre False).
+
+    El señuelo está precalculado (`configure_hasher`): este camino cuesta una
+    sola verificación, igual que el de un usuario existente, y nunca hashea.
+    """
+    await async_verify_password(plain_password, get_dummy_hash())
+    return False
+
+
+class TokenCodec(ABC):
+    """
+    Serializa y verifica access tokens.
+
+    `decode` devuelve siempre los claims con sus nombres completos
+    (`user_id`, `session_id`, `epoch`, `exp`) y lanza JWTError si el token no es válido.
+    """
+
+    name: str
+
+    @abstractmethod
+    def encode(self, claims: dict) -> str:
+        """Firma los claims (con `exp` como timestamp entero)."""
+
+    @abstractmethod
+    def decode(self, token: str) -> dict:
+        """Verifica firma y expiración y devuelve los claims."""
+
+
+class JoseTokenCodec(TokenCodec):
+    """JWT estándar vía python-jose (HS*, o RS*/ES* con kid)."""
+
+    name = "jose"
+
+    def encode(self, claims: dict) -> str:
+        if is_asymmetric(settings.algorithm):
+            ring = get_key_ring()
+            return jwt.encode(
+                claims, ring.signing_key, algorithm=ring.algorithm,
+                headers={"kid": ring.signing_kid}
+            )
+        return jwt.encode(claims, settings.secret_key, algorithm=settings.algorithm)
+
+    def decode(self, token: str) -> dict:
+        if is_asymmetric(settings.algorithm):
+            kid = jwt.get_unverified_header(token).get("kid")
+            key = get_key_ring().get_verification_key(kid)
+            if key is None:
+                raise JWTError("kid desconocido")
+            return jwt.decode(token, key, algorithms=[settings.algorithm])
+        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class FastHMACCodec(TokenCodec):
+    """
+    JWT HMAC (HS256/384/512) optimizado.
+
+    Prepara el estado HMAC de la clave una sola vez (cada firma copia ese
+    estado), precalcula el header, serializa con orjson si está disponible y
+    usa nombres de claims compactos (`uid`, `sid`, `ep`), produciendo tokens más
+    cortos. Acepta también tokens con nombres completos (p. ej. emitidos por
+    `JoseTokenCodec` con la misma clave).
+    """
+
+    name = "fast"
+    COMPACT_CLAIMS = {"user_id": "uid", "session_id": "sid", "epoch": "ep"}
+    _DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+    def __init__(self, secret_key: str, algorithm: str = "HS256"):
+        if algorithm not in self._DIGESTS:
+            raise ValueError(f"FastHMACCodec no soporta {algorithm}")
+        self.algorithm = algorithm
+        self._mac = hmac.new(secret_key.encode("utf-8"), digestmod=self._DIGESTS[algorithm])
+        self._header = _b64encode(_dumps({"alg": algorithm, "typ": "JWT"}))
+        self._expand = {short: full for full, short in self.COMPACT_CLAIMS.items()}
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode(self, claims: dict) -> str:
+        compact = {self.COMPACT_CLAIMS.get(k, k): v for k, v in claims.items()}
+        signing_input = self._header + b"." + _b64encode(_dumps(compact))
+        return (signing_input + b"." + _b64encode(self._sign(signing_input))).decode("ascii")
+
+    def decode(self, token: str) -> dict:
+        try:
+            header_b64, claims_b64, signature_b64 = token.split(".")
+            signing_input = f"{header_b64}.{claims_b64}".encode("ascii")
+            signature = _b64decode(signature_b64)
+            header = _loads(_b64decode(header_b64))
+        except (ValueError, UnicodeError) as e:
+            raise JWTError("Token mal formado") from e
+
+        if not isinstance(header, dict) or header.get("alg") != self.algorithm:
+            raise JWTError("Algoritmo no permitido")
+        if not hmac.compare_digest(signature, self._sign(signing_input)):
+            raise JWTError("Firma inválida")
+
+        try:
+            claims = _loads(_b64decode(claims_b64))
+        except ValueError as e:
+            raise JWTError("Claims mal formados") from e
+        if not isinstance(claims, dict):
+            raise JWTError("Claims mal formados")
+
+        exp = claims.get("exp")
+        if exp is not None and (not isinstance(exp, (int, float)) or exp <= time.time()):
+            raise JWTError("Token expirado")
+        return {self._expand.get(k, k): v for k, v in claims.items()}
+
+
+_token_codec: Optional[TokenCodec] = None
+
+
+def get_token_codec() -> TokenCodec:
+    """Codec configurado (`settings.token_codec`), construido una sola vez."""
+    global _token_codec
+    if _token_codec is None:
+        if settings.token_codec == FastHMACCodec.name and not is_asymmetric(settings.algorithm):
+            _token_codec = FastHMACCodec(settings.secret_key, settings.algorithm)
+        else:
+            _token_codec = JoseTokenCodec()
+    return _token_codec
+
+
+def reset_token_codec() -> None:
+    """
+    Descarta el codec construido (se recrea con la configuración actual).
+
+    También vacía la caché de JWT verificados: sus payloads se validaron con
+    la clave o el algoritmo anteriores.
+    """
+    global _token_codec
+    _token_codec = None
+    clear_token_cache()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -50,17 +222,54 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.now(timezone.utc) + timedelta(
             minutes=settings.access_token_expire_minutes
         )
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    to_encode.update({"exp": int(expire.timestamp())})
+    return get_token_codec().encode(to_encode)
 
 
 def decode_token(token: str) -> Optional[dict]:
-    """Decodifica y valida un token JWT."""
+    """
+    Decodifica y valida un token JWT.
+
+    Los payloads verificados se cachean por digest del token hasta su `exp`,
+    evitando repetir la verificación de firma y el parseo en tokens repetidos.
+    """
+    use_cache = settings.token_cache_size > 0
+    if use_cache:
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        cached = _token_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
     try:
-        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = get_token_codec().decode(token)
     except JWTError:
         return None
 
+    exp = payload.get("exp")
+    if use_cache and isinstance(exp, (int, float)):
+        _token_cache.set(key, payload, expires_at=float(exp))
+    return dict(payload)
+
+
+def clear_token_cache() -> None:
+    """Vacía la caché de JWT verificados."""
+    _token_cache.clear()
+
+
+async def current_token_epoch(db: AsyncSession, user_id: int) -> Optional[int]:
+    """Epoch vigente del usuario (caché, luego base de datos). None si no existe."""
+    from app.models.user import User
+
+    epoch = await session_cache.get_epoch(user_id)
+    if epoch is not None:
+        return epoch
+    since = session_cache.snapshot()
+    result = await db.execute(select(User.token_epoch).where(User.id == user_id))
+    epoch = result.scalar_one_or_none()
+    if epoch is not None:
+        await session_cache.set_epoch(user_id, epoch, since)
+    return epoch
+
 
 async def create_session_with_tokens(
     db: AsyncSession,
@@ -68,98 +277,205 @@ async def create_session_with_tokens(
     device_info: Optional[str] = None,
     ip_address: Optional[str] = None
 ) -> tuple[str, str]:
-    """Crea una sesión y genera tokens (Async)."""
-    from app.models.session import Session, generate_refresh_token
+    """
+    Crea una sesión (con el epoch vigente del usuario) y genera tokens (Async).
+
+    Con `MAX_SESSIONS_PER_USER` > 0 revoca antes las sesiones activas de uso
+    más antiguo que excedan el límite, en la misma transacción que el alta.
+    """
+    from app.models.session import generate_refresh_token, hash_refresh_token, refresh_token_family
 
     refresh_token = generate_refresh_token()
     expires_at = datetime.now(timezone.utc) + timedelta(
         days=settings.refresh_token_expire_days
     )
+    epoch = await current_token_epoch(db, user_id) or 0
+    store = get_session_store()
 
-    session = Session(
+    evicted: list[int] = []
+    if settings.max_sessions_per_user > 0:
+        evicted = await store.evict_lru(
+            db, user_id, settings.max_sessions_per_user - 1, datetime.now(timezone.utc)
+        )
+
+    session = await store.create(
+        db,
         user_id=user_id,
-        refresh_token=refresh_token,
+        refresh_token_hash=hash_refresh_token(refresh_token),
+        expires_at=expires_at,
+        token_epoch=epoch,
         device_info=device_info,
         ip_address=ip_address,
-        expires_at=expires_at
+        family=refresh_token_family(refresh_token),
     )
-    db.add(session)
-    await db.commit()
-    await db.refresh(session)
 
     access_token = create_access_token(
-        data={"user_id": user_id, "session_id": session.id}
+        data={"user_id": user_id, "session_id": session.id, "epoch": session.token_epoch}
     )
     logger.info("session_created", user_id=user_id, session_id=session.id)
+    if evicted:
+        record_session_eviction(store.name, len(evicted))
+        for session_id in evicted:
+            await session_cache.invalidate_session(session_id, user_id)
+        logger.info("sessions_evicted", user_id=user_id, session_ids=evicted)
     return access_token, refresh_token
 
 
-async def refresh_access_token(db: AsyncSession, refresh_token: str) -> Optional[tuple[str, str]]:
-    """Renueva un access token (Async)."""
-    from app.models.session import Session
+def next_refresh_token(refresh_token: str) -> str:
+    """
+    Sucesor de un refresh token en su familia.
+
+    Es determinista (HMAC con SECRET_KEY del token actual): un refresh
+    concurrente o reintentado con el mismo token calcula el mismo sucesor, y
+    dentro de la ventana de gracia recibe exactamente el resultado del ganador.
+    Los tokens sin familia (o sin firma válida) reciben una derivada del propio token.
+    """
+    from app.models.session import refresh_token_family, seal_refresh_token
+
+    def derive(label: bytes) -> bytes:
+        message = label + b":" + refresh_token.encode("utf-8")
+        return hmac.new(settings.secret_key.encode("utf-8"), message, hashlib.sha256).digest()
+
+    family = refresh_token_family(refresh_token) or _b64encode(derive(b"refresh-family")[:12]).decode()
+    return seal_refresh_token(family, _b64encode(derive(b"refresh-rotation")).decode())
+
 
-    result = await db.execute(select(Session).filter(Session.refresh_token == refresh_token))
-    session = result.scalar_one_or_none()
+async def refresh_access_token(db: AsyncSession, refresh_token: str) -> Optional[tuple[str, str]]:
+    """
+    Rota un refresh token y emite un nuevo access token (Async).
+
+    La validación y la rotación son una sola operación atómica del store
+    (`UPDATE ... RETURNING` en SQL, un script Lua en Redis), así que con
+    refreshes concurrentes del mismo token solo uno rota. Los demás, si llegan
+    dentro de `REFRESH_TOKEN_REUSE_GRACE_SECONDS`, reciben el mismo token nuevo
+    (pestañas simultáneas, reintentos tras un timeout). Fuera de esa ventana,
+    presentar cualquier token ya rotado de la familia se considera robo y se
+    revoca la sesión completa. Las sesiones de un epoch anterior del usuario
+    no se renuevan.
+    """
+    from app.models.session import hash_refresh_token, refresh_token_family
+
+    store = get_session_store()
+    token_hash = hash_refresh_token(refresh_token)
+    now = datetime.now(timezone.utc)
+
+    if settings.refresh_token_rotation:
+        new_refresh_token = next_refresh_token(refresh_token)
+        new_token_hash = hash_refresh_token(new_refresh_token)
+        session = await store.rotate(
+            db, token_hash, new_token_hash, now, refresh_token_family(new_refresh_token)
+        )
+        if session is None and settings.refresh_token_reuse_grace_seconds > 0:
+            since = now - timedelta(seconds=settings.refresh_token_reuse_grace_seconds)
+            session = await store.find_recent_rotation(db, token_hash, new_token_hash, since, now)
+            if session is not None:
+                logger.info("refresh_token_retry", user_id=session.user_id, session_id=session.id)
+    else:
+        # Refresh de solo lectura: last_used_at se registra con store.touch
+        new_refresh_token = refresh_token
+        session = await store.find_by_token(db, token_hash, now)
 
-    if not session or not session.is_valid():
+    if session is None:
+        await _revoke_reused_refresh_token(db, token_hash, refresh_token_family(refresh_token), now)
         logger.warning("refresh_token_invalid", reason="not_found_or_expired")
         return None
+    if session.token_epoch != await current_token_epoch(db, session.user_id):
+        logger.warning("refresh_token_invalid", reason="stale_epoch", session_id=session.id)
+        return None
 
-    session.last_used_at = datetime.now(timezone.utc)
-    await db.commit()
-
+    if not settings.refresh_token_rotation:
+        await store.touch(db, session.id, now)
     access_token = create_access_token(
-        data={"user_id": session.user_id, "session_id": session.id}
+        data={"user_id": session.user_id, "session_id": session.id, "epoch": session.token_epoch}
+    )
+    logger.info(
+        "token_refreshed", user_id=session.user_id, session_id=session.id,
+        rotated=settings.refresh_token_rotation,
     )
-    logger.info("token_refreshed", user_id=session.user_id, session_id=session.id)
-    return access_token, session.refresh_token
+    return access_token, new_refresh_token
+
+
+async def _revoke_reused_refresh_token(
+    db: AsyncSession, token_hash: bytes, family: Optional[str], now: datetime
+) -> None:
+    """
+    Si el token ya fue rotado, revoca la sesión a la que perteneció.
+
+    `family` solo llega si la firma del token es válida (`refresh_token_family`),
+    así que un token inventado con el prefijo de otro no revoca nada.
+    """
+    session = await get_session_store().revoke_reused(db, token_hash, family, now)
+    if session is not None:
+        await session_cache.invalidate_session(session.id, session.user_id)
+        logger.warning(
+            "refresh_token_reuse_detected", user_id=session.user_id, session_id=session.id
+        )
 
 
 async def validate_session(db: AsyncSession, session_id: int, user_id: int) -> bool:
-    """Verifica que una sesión esté activa y pertenezca al usuario."""
-    from app.models.session import Session
+    """
+    Verifica que una sesión esté activa, pertenezca al usuario y a su epoch vigente.
 
-    result = await db.execute(
-        select(Session).filter(
-            Session.id == session_id,
-            Session.user_id == user_id
-        )
+    Consulta primero la caché de validez; solo en un miss va al store.
+    """
+    if await session_cache.get(session_id, user_id):
+        return True
+
+    since = session_cache.snapshot()
+    session = await get_session_store().get_valid(
+        db, session_id, user_id, datetime.now(timezone.utc)
     )
-    session = result.scalar_one_or_none()
-    return session is not None and session.is_valid()
+    if session is None or session.token_epoch != await current_token_epoch(db, user_id):
+        return False
+
+    await session_cache.set_valid(session_id, user_id, session.expires_at, since)
+    return True
 
 
 async def revoke_session(db: AsyncSession, session_id: int, user_id: int) -> bool:
     """Revoca una sesión específica (Async)."""
-    from app.models.session import Session
-
-    result = await db.execute(
-        select(Session).filter(
-            Session.id == session_id,
-            Session.user_id == user_id
-        )
+    found = await get_session_store().revoke(
+        db, session_id, user_id, datetime.now(timezone.utc)
     )
-    session = result.scalar_one_or_none()
-
-    if not session:
+    if not found:
         return False
 
-    session.is_revoked = True
-    await db.commit()
+    await session_cache.invalidate_session(session_id, user_id)
     logger.info("session_revoked", user_id=user_id, session_id=session_id)
     return True
 
 
-async def revoke_all_sessions(db: AsyncSession, user_id: int) -> int:
-    """Revoca todas las sesiones de un usuario (Async)."""
-    from app.models.session import Session
+async def revoke_all_sessions(db: AsyncSession, user_id: int) -> Optional[int]:
+    """
+    Revoca todas las sesiones de un usuario (Async).
+
+    Incrementa `users.token_epoch` en una sola escritura, sin tocar `sessions`:
+    las sesiones y los access tokens del epoch anterior dejan de validar.
+
+    Returns:
+        El nuevo epoch, o None si el usuario no existe
+    """
+    new_epoch = await bump_token_epoch(db, user_id)
+    await db.commit()
+    if new_epoch is not None:
+        await session_cache.bump_epoch(user_id, new_epoch)
+        logger.info("all_sessions_revoked", user_id=user_id, epoch=new_epoch)
+    return new_epoch
+
+
+async def bump_token_epoch(db: AsyncSession, user_id: int) -> Optional[int]:
+    """
+    Incrementa el epoch de tokens del usuario dentro de la transacción actual.
+
+    El llamador hace commit y luego propaga con `session_cache.bump_epoch`.
+    """
+    from app.models.user import User
 
     result = await db.execute(
-        update(Session)
-        .filter(Session.user_id == user_id, Session.is_revoked == False)
-        .values(is_revoked=True)
+        update(User)
+        .where(User.id == user_id)
+        .values(token_epoch=User.token_epoch + 1)
+        .returning(User.token_epoch)
+        .execution_options(synchronize_session=False)
     )
-    await db.commit()
-    count = result.rowcount
-    logger.info("all_sessions_revoked", user_id=user_id, count=count)
-    return count
+    return result.scalar_one_or_none()
@@ -0,0 +1,160 @@
+"""
+Buffer write-behind de actividad de sesiones.
+
+Acumula en memoria los `last_used_at` de las sesiones (uno por sesión, el más
+reciente) y los persiste en lote cada `SESSION_ACTIVITY_FLUSH_SECONDS`, en un
+único `UPDATE ... FROM (VALUES ...)` en PostgreSQL. Es el retraso máximo con
+que `last_used_at` refleja el último uso; al cerrar la app se hace un flush
+final desde el `lifespan`.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import DateTime, Integer, bindparam, column, or_, update, values
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import SESSION_ACTIVITY_PENDING, record_session_activity_flush
+
+logger = get_logger(__name__)
+
+# Filas por sentencia al persistir
+FLUSH_CHUNK_SIZE = 1000
+
+# session_id -> último uso conocido
+_pending: dict[int, datetime] = {}
+_flush_lock = asyncio.Lock()
+_flusher_task: Optional[asyncio.Task] = None
+_early_flush: Optional[asyncio.Event] = None
+
+
+def touch(session_id: int, at: Optional[datetime] = None) -> None:
+    """Registra un uso de la sesión (se conserva el más reciente)."""
+    at = at or datetime.now(timezone.utc)
+    current = _pending.get(session_id)
+    if current is None or at > current:
+        _pending[session_id] = at
+        SESSION_ACTIVITY_PENDING.set(len(_pending))
+    if _early_flush is not None and len(_pending) >= settings.session_activity_max_pending:
+        _early_flush.set()
+
+
+def pending() -> dict[int, datetime]:
+    """Copia de las actualizaciones pendientes."""
+    return dict(_pending)
+
+
+def _update_statement(dialect: str, rows: list[dict]):
+    from app.models.session import Session
+
+    sessions = Session.__table__
+    if dialect == "postgresql":
+        batch = values(
+            column("id", Integer), column("ts", DateTime(timezone=True)), name="activity"
+        ).data([(row["sid"], row["ts"]) for row in rows])
+        statement = (
+            update(sessions)
+            .where(sessions.c.id == batch.c.id)
+            .where(or_(sessions.c.last_used_at.is_(None), sessions.c.last_used_at < batch.c.ts))
+            .values(last_used_at=batch.c.ts)
+        )
+        return statement, None
+
+    # Otros dialectos: executemany con la misma semántica
+    statement = (
+        update(sessions)
+        .where(sessions.c.id == bindparam("sid"))
+        .where(or_(sessions.c.last_used_at.is_(None), sessions.c.last_used_at < bindparam("ts")))
+        .values(last_used_at=bindparam("ts"))
+    )
+    return statement, rows
+
+
+async def flush(session_factory=None) -> int:
+    """
+    Persiste las actualizaciones pendientes.
+
+    Nunca retrocede `last_used_at`. Si la escritura falla, las entradas vuelven
+    al buffer para el próximo intento.
+
+    Returns:
+        Cantidad de sesiones enviadas a la base de datos
+    """
+    if session_factory is None:
+        from app.core.database import AsyncSessionLocal
+        session_factory = AsyncSessionLocal
+
+    async with _flush_lock:
+        if not _pending:
+            return 0
+        batch = list(_pending.items())
+        _pending.clear()
+        SESSION_ACTIVITY_PENDING.set(0)
+
+        rows = [{"sid": sid, "ts": ts} for sid, ts in batch]
+        try:
+            async with session_factory() as db:
+                dialect = db.bind.dialect.name
+                for start in range(0, len(rows), FLUSH_CHUNK_SIZE):
+                    statement, params = _update_statement(
+                        dialect, rows[start:start + FLUSH_CHUNK_SIZE]
+                    )
+                    if params is None:
+                        await db.execute(statement)
+                    else:
+                        await db.execute(statement, params)
+                await db.commit()
+        except Exception as e:
+            # Reencolar sin disparar otro flush anticipado
+            for sid, ts in batch:
+                if sid not in _pending or ts > _pending[sid]:
+                    _pending[sid] = ts
+            SESSION_ACTIVITY_PENDING.set(len(_pending))
+            logger.warning("session_activity_flush_failed", error=str(e), pending=len(_pending))
+            return 0
+
+    record_session_activity_flush(len(rows))
+    logger.debug("session_activity_flushed", rows=len(rows))
+    return len(rows)
+
+
+async def _flush_loop(session_factory) -> None:
+    while True:
+        try:
+            await asyncio.wait_for(
+                _early_flush.wait(), timeout=settings.session_activity_flush_seconds
+            )
+        except asyncio.TimeoutError:
+            pass
+        _early_flush.clear()
+        await flush(session_factory)
+
+
+def start(session_factory=None) -> None:
+    """Arranca el flush periódico (llamar desde el lifespan)."""
+    global _flusher_task, _early_flush
+    if _flusher_task is not None:
+        return
+    _early_flush = asyncio.Event()
+    _flusher_task = asyncio.create_task(_flush_loop(session_factory))
+
+
+async def stop(session_factory=None) -> None:
+    """Detiene el flush periódico y persiste lo pendiente."""
+    global _flusher_task, _early_flush
+    if _flusher_task is not None:
+        _flusher_task.cancel()
+        try:
+            await _flusher_task
+        except asyncio.CancelledError:
+            pass
+        _flusher_task = None
+        _early_flush = None
+    await flush(session_factory)
+
+
+def clear() -> None:
+    """Descarta las actualizaciones pendientes (tests)."""
+    _pending.clear()
+    SESSION_ACTIVITY_PENDING.set(0)
@@ -0,0 +1,324 @@
+"""
+Caché de validez de sesiones.
+
+Evita consultar la tabla `sessions` en cada request autenticada. Tiene un nivel
+en proceso (TTLCache) y un nivel en Redis compartido por los workers. Las
+revocaciones se publican por Redis Pub/Sub para que todos los workers descarten
+la entrada al instante.
+
+Solo se activa con Redis (`SESSION_CACHE_REDIS`): sin invalidación compartida,
+un logout en un worker no se vería en los demás hasta que venza el TTL. Un
+despliegue de un único proceso puede activarla sin Redis con
+`SESSION_CACHE_LOCAL_ONLY`.
+
+Cada invalidación deja una marca por usuario (en proceso y en Redis) durante
+un TTL: una validación que leyó la base de datos antes de la revocación no
+vuelve a cachear la sesión como válida al terminar.
+
+También cachea el `token_epoch` de cada usuario: los access tokens llevan el
+epoch vigente al emitirse y dejan de valer cuando el epoch del usuario avanza
+(logout global, cambio de contraseña).
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+INVALIDATION_CHANNEL = "session-invalidation"
+_REDIS_PREFIX = "session-valid"
+_EPOCH_PREFIX = "token-epoch"
+_TOMBSTONE_PREFIX = "session-revoked"
+
+# Escrituras condicionadas a que no haya una invalidación reciente del usuario.
+# KEYS: clave a escribir, marca de invalidación. ARGV: campo (o ''), valor, TTL (s)
+_SET_UNLESS_INVALIDATED = """
+if redis.call('EXISTS', KEYS[2]) == 1 then return 0 end
+if ARGV[1] == '' then
+  redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+else
+  redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+  redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return 1
+"""
+
+# (session_id, user_id) -> True mientras la sesión sea válida
+_local: TTLCache[bool] = TTLCache(
+    "session_validity",
+    maxsize=settings.session_cache_size,
+    default_ttl=settings.session_cache_ttl_seconds,
+)
+# user_id -> token_epoch vigente
+_epochs: TTLCache[int] = TTLCache(
+    "token_epoch",
+    maxsize=settings.session_cache_size,
+    default_ttl=settings.session_cache_ttl_seconds,
+)
+# user_id -> instante (time.monotonic) de la última invalidación
+_tombstones: TTLCache[float] = TTLCache(
+    "session_tombstone",
+    maxsize=settings.session_cache_size,
+    default_ttl=settings.session_cache_ttl_seconds,
+)
+_redis = None
+_set_unless_invalidated = None
+_listener_task: Optional[asyncio.Task] = None
+
+
+# Las claves de un usuario comparten hash tag: mismo slot en Redis Cluster
+def _redis_key(user_id: int) -> str:
+    return f"{_REDIS_PREFIX}:{{{user_id}}}"
+
+
+def _epoch_key(user_id: int) -> str:
+    return f"{_EPOCH_PREFIX}:{{{user_id}}}"
+
+
+def _tombstone_key(user_id: int) -> str:
+    return f"{_TOMBSTONE_PREFIX}:{{{user_id}}}"
+
+
+def enabled() -> bool:
+    """La caché solo se usa con invalidación compartida (o si se pidió solo local)."""
+    return settings.session_cache_ttl_seconds > 0 and (
+        _redis is not None or settings.session_cache_local_only
+    )
+
+
+def snapshot() -> float:
+    """
+    Instante a tomar antes de leer la base de datos.
+
+    Se pasa luego a `set_valid`/`set_epoch`: si entretanto hubo una
+    invalidación del usuario, el resultado leído ya no se cachea.
+    """
+    return time.monotonic()
+
+
+def _invalidated_since(user_id: int, since: Optional[float]) -> bool:
+    if since is None:
+        return False
+    if time.monotonic() - since >= settings.session_cache_ttl_seconds:
+        # La marca pudo haber vencido mientras tanto
+        return True
+    invalidated_at = _tombstones.get(user_id)
+    return invalidated_at is not None and invalidated_at >= since
+
+
+def _mark_invalidated(user_id: int) -> None:
+    _tombstones.set(user_id, time.monotonic())
+
+
+async def _set_in_redis(key: str, user_id: int, field: str, value: str) -> None:
+    try:
+        await _set_unless_invalidated(
+            keys=[key, _tombstone_key(user_id)],
+            args=[field, value, int(settings.session_cache_ttl_seconds)],
+        )
+    except Exception as e:
+        logger.warning("session_cache_redis_error", error=str(e))
+
+
+def _deadline(expires_at: datetime) -> float:
+    """Convierte expires_at (naive = UTC) a epoch."""
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at.timestamp()
+
+
+async def get(session_id: int, user_id: int) -> bool:
+    """Indica si la sesión consta como válida en caché (local y luego Redis)."""
+    if not enabled():
+        return False
+    if _local.get((session_id, user_id)):
+        return True
+    if _redis is None:
+        return False
+    try:
+        expires_at = await _redis.hget(_redis_key(user_id), str(session_id))
+    except Exception as e:
+        logger.warning("session_cache_redis_error", error=str(e))
+        return False
+    if expires_at is None or float(expires_at) <= time.time():
+        return False
+    _local.set((session_id, user_id), True, expires_at=float(expires_at))
+    return True
+
+
+async def set_valid(
+    session_id: int, user_id: int, expires_at: datetime, since: Optional[float] = None
+) -> None:
+    """
+    Marca una sesión como válida hasta min(TTL, expires_at).
+
+    Args:
+        since: `snapshot()` tomado antes de leer la sesión; si el usuario tuvo
+            una invalidación posterior no se cachea
+    """
+    if not enabled() or _invalidated_since(user_id, since):
+        return
+    deadline = min(_deadline(expires_at), time.time() + settings.session_cache_ttl_seconds)
+    _local.set((session_id, user_id), True, expires_at=deadline)
+    if _redis is not None:
+        await _set_in_redis(_redis_key(user_id), user_id, str(session_id), str(deadline))
+
+
+async def get_epoch(user_id: int) -> Optional[int]:
+    """Epoch de tokens del usuario según la caché (None si no se conoce)."""
+    if not enabled():
+        return None
+    epoch = _epochs.get(user_id)
+    if epoch is not None or _redis is None:
+        return epoch
+    try:
+        value = await _redis.get(_epoch_key(user_id))
+    except Exception as e:
+        logger.warning("session_cache_redis_error", error=str(e))
+        return None
+    if value is None:
+        return None
+    _epochs.set(user_id, int(value))
+    return int(value)
+
+
+async def set_epoch(user_id: int, epoch: int, since: Optional[float] = None) -> None:
+    """
+    Cachea el epoch leído de la base de datos.
+
+    Args:
+        since: `snapshot()` tomado antes de la lectura (ver `set_valid`)
+    """
+    if not enabled() or _invalidated_since(user_id, since):
+        return
+    _epochs.set(user_id, epoch)
+    if _redis is not None:
+        await _set_in_redis(_epoch_key(user_id), user_id, "", str(epoch))
+
+
+async def bump_epoch(user_id: int, epoch: int) -> None:
+    """
+    Propaga un nuevo epoch (ya persistido) a este worker y a todo el cluster.
+
+    Descarta además las sesiones cacheadas del usuario: todas quedaron inválidas.
+    """
+    _drop_local(user_id)
+    if enabled():
+        _epochs.set(user_id, epoch)
+    await _publish(f"e:{user_id}:{epoch}", user_id, None, epoch)
+
+
+def _drop_local(user_id: int, session_id: Optional[int] = None) -> None:
+    _mark_invalidated(user_id)
+    if session_id is not None:
+        _local.pop((session_id, user_id))
+    else:
+        _local.discard(lambda key: key[1] == user_id)
+
+
+async def _publish(
+    message: str, user_id: int, session_id: Optional[int], epoch: Optional[int] = None
+) -> None:
+    if _redis is None:
+        return
+    ttl = int(settings.session_cache_ttl_seconds)
+    try:
+        key = _redis_key(user_id)
+        async with _redis.pipeline(transaction=True) as pipe:
+            # La marca primero: bloquea las escrituras de validaciones en curso
+            pipe.set(_tombstone_key(user_id), 1, ex=ttl)
+            if session_id is not None:
+                pipe.hdel(key, str(session_id))
+            else:
+                pipe.delete(key)
+            if epoch is not None:
+                pipe.set(_epoch_key(user_id), epoch, ex=ttl)
+            elif session_id is None:
+                pipe.delete(_epoch_key(user_id))
+            await pipe.execute()
+        await _redis.publish(INVALIDATION_CHANNEL, message)
+    except Exception as e:
+        logger.warning("session_cache_redis_error", error=str(e))
+
+
+async def invalidate_session(session_id: int, user_id: int) -> None:
+    """Descarta una sesión en este worker y en todo el cluster."""
+    _drop_local(user_id, session_id)
+    await _publish(f"s:{user_id}:{session_id}", user_id, session_id)
+
+
+async def invalidate_user(user_id: int) -> None:
+    """Descarta todas las sesiones de un usuario en todo el cluster."""
+    _drop_local(user_id)
+    _epochs.pop(user_id)
+    await _publish(f"u:{user_id}", user_id, None)
+
+
+def handle_invalidation_message(message: str) -> None:
+    """Aplica localmente una invalidación recibida por Pub/Sub."""
+    try:
+        kind, *ids = message.split(":")
+        if kind == "s":
+            _drop_local(int(ids[0]), int(ids[1]))
+        elif kind == "u":
+            _drop_local(int(ids[0]))
+            _epochs.pop(int(ids[0]))
+        elif kind == "e":
+            _drop_local(int(ids[0]))
+            if enabled():
+                _epochs.set(int(ids[0]), int(ids[1]))
+    except (ValueError, IndexError):
+        logger.warning("session_cache_bad_message", message=message)
+
+
+async def _listen(redis) -> None:
+    pubsub = redis.pubsub()
+    await pubsub.subscribe(INVALIDATION_CHANNEL)
+    try:
+        async for message in pubsub.listen():
+            if message.get("type") == "message":
+                handle_invalidation_message(message["data"])
+    finally:
+        await pubsub.unsubscribe(INVALIDATION_CHANNEL)
+        await pubsub.close()
+
+
+async def init(redis=None) -> None:
+    """
+    Activa el nivel Redis y el listener de invalidaciones.
+
+    Args:
+        redis: Cliente `redis.asyncio` (decode_responses=True) o None para solo memoria
+    """
+    global _redis, _set_unless_invalidated, _listener_task
+    _redis = redis
+    if redis is not None:
+        _set_unless_invalidated = redis.register_script(_SET_UNLESS_INVALIDATED)
+        _listener_task = asyncio.create_task(_listen(redis))
+        logger.info("session_cache_initialized", backend="redis")
+
+
+async def close() -> None:
+    """Detiene el listener de invalidaciones."""
+    global _redis, _set_unless_invalidated, _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except (asyncio.CancelledError, Exception):
+            pass
+        _listener_task = None
+    _redis = None
+    _set_unless_invalidated = None
+
+
+def clear() -> None:
+    """Vacía el nivel en proceso."""
+    _local.clear()
+    _epochs.clear()
+    _tombstones.clear()
@@ -0,0 +1,836 @@
+"""
+Almacenamiento de sesiones intercambiable.
+
+`SessionStore` define las operaciones que necesita `app.core.security` sobre
+las sesiones (crear, rotar el refresh token, validar, revocar, listar). Hay
+tres implementaciones, elegidas con `SESSION_STORE`:
+
+- `sql`: tabla `sessions` en la base de datos principal (default).
+- `redis`: hashes en Redis con expiración nativa, para tráfico de refresh alto.
+- `memory`: en proceso, para tests y desarrollo local.
+
+Los usuarios y su `token_epoch` siempre viven en la base de datos; el store
+solo guarda el epoch con el que se creó cada sesión y el llamador lo compara.
+Las operaciones reciben la sesión de BD aunque los stores sin SQL la ignoran.
+"""
+import itertools
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite devuelve datetimes naive (en UTC)
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+@dataclass(slots=True)
+class SessionRecord:
+    """
+    Sesión tal como la devuelve cualquier store.
+
+    Atributos:
+        id: Identificador de la sesión
+        user_id: Usuario propietario
+        token_epoch: Epoch del usuario al crearse la sesión
+        expires_at: Expiración del refresh token
+        created_at, last_used_at, revoked_at: Timestamps de auditoría
+        device_info, ip_address: Origen de la sesión
+        is_revoked: Si fue revocada
+    """
+    id: int
+    user_id: int
+    token_epoch: int
+    expires_at: datetime
+    created_at: Optional[datetime] = None
+    last_used_at: Optional[datetime] = None
+    device_info: Optional[str] = None
+    ip_address: Optional[str] = None
+    is_revoked: bool = False
+    revoked_at: Optional[datetime] = None
+
+    def is_valid(self, now: Optional[datetime] = None) -> bool:
+        """No revocada ni expirada."""
+        now = now or datetime.now(timezone.utc)
+        return not self.is_revoked and _as_utc(self.expires_at) > now
+
+    def recency(self) -> tuple:
+        """Clave de orden para el límite por usuario: epoch y último uso, más reciente mayor."""
+        return (self.token_epoch, _as_utc(self.last_used_at or self.created_at), self.id)
+
+
+def _least_recently_used(records: list[SessionRecord], keep: int) -> list[SessionRecord]:
+    """Sesiones a desalojar para que queden `keep` (las de epoch viejo primero)."""
+    return sorted(records, key=SessionRecord.recency, reverse=True)[keep:]
+
+
+class SessionStore(ABC):
+    """Operaciones de sesión que usa `app.core.security`."""
+
+    name: str
+
+    @abstractmethod
+    async def create(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        refresh_token_hash: bytes,
+        expires_at: datetime,
+        token_epoch: int,
+        device_info: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        family: Optional[str] = None,
+    ) -> SessionRecord:
+        """Crea una sesión con el digest de su refresh token y su familia."""
+
+    @abstractmethod
+    async def rotate(
+        self, db: AsyncSession, token_hash: bytes, new_token_hash: bytes, now: datetime,
+        family: Optional[str] = None,
+    ) -> Optional[SessionRecord]:
+        """
+        Reemplaza atómicamente el refresh token de una sesión válida.
+
+        Con rotaciones concurrentes del mismo token solo una devuelve la sesión.
+        El digest anterior queda como `previous` (gracia de reintento) y, si se
+        indica, la sesión pasa a la familia `family` (tokens emitidos antes de
+        las familias).
+        """
+
+    @abstractmethod
+    async def find_recent_rotation(
+        self, db: AsyncSession, token_hash: bytes, new_token_hash: bytes,
+        since: datetime, now: datetime,
+    ) -> Optional[SessionRecord]:
+        """
+        Sesión válida que rotó `token_hash` a `new_token_hash` desde `since`.
+
+        Permite que un refresh concurrente o reintentado con el token recién
+        rotado obtenga el mismo resultado que el ganador.
+        """
+
+    @abstractmethod
+    async def find_by_token(
+        self, db: AsyncSession, token_hash: bytes, now: datetime
+    ) -> Optional[SessionRecord]:
+        """Sesión válida con ese refresh token (sin modificarla)."""
+
+    @abstractmethod
+    async def revoke_reused(
+        self, db: AsyncSession, token_hash: bytes, family: Optional[str], now: datetime
+    ) -> Optional[SessionRecord]:
+        """
+        Revoca la sesión activa a la que perteneció un token ya rotado.
+
+        Reconoce cualquier token viejo de la familia `family` (no solo el
+        anterior) y, para los tokens sin familia, el último rotado. El
+        llamador solo pasa `family` tras verificar la firma del token.
+        """
+
+    @abstractmethod
+    async def get_valid(
+        self, db: AsyncSession, session_id: int, user_id: int, now: datetime
+    ) -> Optional[SessionRecord]:
+        """Sesión del usuario si no está revocada ni expirada."""
+
+    @abstractmethod
+    async def revoke(self, db: AsyncSession, session_id: int, user_id: int, now: datetime) -> bool:
+        """Revoca una sesión del usuario. False si no existe."""
+
+    @abstractmethod
+    async def list_for_user(
+        self, db: AsyncSession, user_id: int, now: datetime, active_only: bool = True
+    ) -> list[SessionRecord]:
+        """Sesiones del usuario (solo válidas si `active_only`)."""
+
+    @abstractmethod
+    async def evict_lru(
+        self, db: AsyncSession, user_id: int, keep: int, now: datetime
+    ) -> list[int]:
+        """
+        Revoca las sesiones activas del usuario de uso más antiguo hasta dejar `keep`.
+
+        Se llama justo antes de `create`; en SQL no confirma, así que el
+        desalojo y el alta de la sesión nueva son una sola transacción.
+        Devuelve los ids revocados.
+        """
+
+    @abstractmethod
+    async def touch(self, db: AsyncSession, session_id: int, now: datetime) -> None:
+        """Registra un uso de la sesión (`last_used_at`)."""
+
+    @abstractmethod
+    async def delete_for_user(self, db: AsyncSession, user_id: int) -> None:
+        """Elimina las sesiones de un usuario borrado."""
+
+    async def close(self) -> None:
+        """Libera conexiones propias del store."""
+
+
+class SqlSessionStore(SessionStore):
+    """Sesiones en la tabla `sessions` (cada operación es su propia transacción)."""
+
+    name = "sql"
+
+    @staticmethod
+    def _record(row) -> SessionRecord:
+        return SessionRecord(
+            id=row.id,
+            user_id=row.user_id,
+            token_epoch=row.token_epoch,
+            expires_at=_as_utc(row.expires_at),
+            created_at=_as_utc(row.created_at),
+            last_used_at=_as_utc(row.last_used_at),
+            device_info=row.device_info,
+            ip_address=row.ip_address,
+            is_revoked=row.is_revoked,
+            revoked_at=_as_utc(row.revoked_at),
+        )
+
+    @staticmethod
+    def _columns():
+        from app.models.session import Session
+
+        return (
+            Session.id, Session.user_id, Session.token_epoch, Session.expires_at,
+            Session.created_at, Session.last_used_at, Session.device_info,
+            Session.ip_address, Session.is_revoked, Session.revoked_at,
+        )
+
+    async def create(self, db, user_id, refresh_token_hash, expires_at, token_epoch,
+                     device_info=None, ip_address=None, family=None) -> SessionRecord:
+        from app.models.session import Session
+
+        session = Session(
+            user_id=user_id,
+            refresh_token_hash=refresh_token_hash,
+            refresh_family=family,
+            device_info=device_info,
+            ip_address=ip_address,
+            expires_at=expires_at,
+            token_epoch=token_epoch,
+        )
+        db.add(session)
+        await db.commit()
+        await db.refresh(session)
+        return self._record(session)
+
+    async def rotate(self, db, token_hash, new_token_hash, now, family=None) -> Optional[SessionRecord]:
+        from app.models.session import Session
+
+        values = dict(
+            refresh_token_hash=new_token_hash,
+            previous_refresh_token_hash=token_hash,
+            last_used_at=now,
+        )
+        if family is not None:
+            values["refresh_family"] = family
+        result = await db.execute(
+            update(Session)
+            .where(
+                Session.refresh_token_hash == token_hash,
+                Session.is_revoked == False,
+                Session.expires_at > now,
+            )
+            .values(**values)
+            .returning(*self._columns())
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
+        await db.commit()
+        return self._record(row)
+
+    async def find_recent_rotation(self, db, token_hash, new_token_hash, since, now) -> Optional[SessionRecord]:
+        from app.models.session import Session
+
+        result = await db.execute(
+            select(*self._columns()).where(
+                Session.refresh_token_hash == new_token_hash,
+                Session.previous_refresh_token_hash == token_hash,
+                Session.last_used_at >= since,
+                Session.is_revoked == False,
+                Session.expires_at > now,
+            )
+        )
+        row = result.one_or_none()
+        return self._record(row) if row is not None else None
+
+    async def find_by_token(self, db, token_hash, now) -> Optional[SessionRecord]:
+        from app.models.session import Session
+
+        result = await db.execute(
+            select(*self._columns()).where(
+                Session.refresh_token_hash == token_hash,
+                Session.is_revoked == False,
+                Session.expires_at > now,
+            )
+        )
+        row = result.one_or_none()
+        return self._record(row) if row is not None else None
+
+    async def revoke_reused(self, db, token_hash, family, now) -> Optional[SessionRecord]:
+        from app.models.session import Session
+
+        reused = Session.previous_refresh_token_hash == token_hash
+        if family is not None:
+            reused = or_(reused, and_(
+                Session.refresh_family == family, Session.refresh_token_hash != token_hash
+            ))
+        result = await db.execute(
+            update(Session)
+            .where(reused, Session.is_revoked == False)
+            .values(is_revoked=True, revoked_at=now)
+            .returning(*self._columns())
+        )
+        row = result.first()
+        await db.commit()
+        return self._record(row) if row is not None else None
+
+    async def get_valid(self, db, session_id, user_id, now) -> Optional[SessionRecord]:
+        from app.models.session import Session
+
+        result = await db.execute(
+            select(*self._columns()).where(
+                Session.id == session_id,
+                Session.user_id == user_id,
+                Session.is_revoked == False,
+                Session.expires_at > now,
+            )
+        )
+        row = result.one_or_none()
+        return self._record(row) if row is not None else None
+
+    async def revoke(self, db, session_id, user_id, now) -> bool:
+        from app.models.session import Session
+
+        result = await db.execute(
+            update(Session)
+            .where(Session.id == session_id, Session.user_id == user_id)
+            .values(is_revoked=True, revoked_at=now)
+            .returning(Session.id)
+        )
+        found = result.one_or_none() is not None
+        await db.commit()
+        return found
+
+    async def list_for_user(self, db, user_id, now, active_only=True) -> list[SessionRecord]:
+        from app.models.session import Session
+
+        query = select(*self._columns()).where(Session.user_id == user_id)
+        if active_only:
+            query = query.where(Session.is_revoked == False, Session.expires_at > now)
+        result = await db.execute(query.order_by(Session.id))
+        return [self._record(row) for row in result.all()]
+
+    async def evict_lru(self, db, user_id, keep, now) -> list[int]:
+        from app.models.session import Session
+
+        # Filtra por ix_session_validation; ordena solo las sesiones del usuario
+        victims = (
+            select(Session.id)
+            .where(
+                Session.user_id == user_id,
+                Session.is_revoked == False,
+                Session.expires_at > now,
+            )
+            .order_by(
+                Session.token_epoch.desc(),
+                func.coalesce(Session.last_used_at, Session.created_at).desc(),
+                Session.id.desc(),
+            )
+            .offset(keep)
+        )
+        result = await db.execute(
+            update(Session)
+            .where(Session.id.in_(victims.scalar_subquery()))
+            .values(is_revoked=True, revoked_at=now)
+            .returning(Session.id)
+            .execution_options(synchronize_session=False)
+        )
+        return sorted(result.scalars().all())
+
+    async def touch(self, db, session_id, now) -> None:
+        # Write-behind: se persiste en lote (ver session_activity)
+        from app.core import session_activity
+
+        session_activity.touch(session_id, now)
+
+    async def delete_for_user(self, db, user_id) -> None:
+        # ON DELETE CASCADE en sessions.user_id
+        return None
+
+
+class MemorySessionStore(SessionStore):
+    """Sesiones en memoria del proceso (tests y desarrollo; no compartidas entre workers)."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._sessions: dict[int, SessionRecord] = {}
+        self._token_of: dict[int, bytes] = {}
+        self._previous_of: dict[int, bytes] = {}
+        self._by_token: dict[bytes, int] = {}
+        self._by_previous: dict[bytes, int] = {}
+        self._by_family: dict[str, int] = {}
+        self._family_of: dict[int, str] = {}
+        self._ids = itertools.count(1)
+
+    # Sin awaits entre lectura y escritura: cada operación es atómica en el event loop
+
+    async def create(self, db, user_id, refresh_token_hash, expires_at, token_epoch,
+                     device_info=None, ip_address=None, family=None) -> SessionRecord:
+        session_id = next(self._ids)
+        record = SessionRecord(
+            id=session_id,
+            user_id=user_id,
+            token_epoch=token_epoch,
+            expires_at=_as_utc(expires_at),
+            created_at=datetime.now(timezone.utc),
+            device_info=device_info,
+            ip_address=ip_address,
+        )
+        self._sessions[session_id] = record
+        self._token_of[session_id] = refresh_token_hash
+        self._by_token[refresh_token_hash] = session_id
+        if family is not None:
+            self._set_family(session_id, family)
+        return replace(record)
+
+    def _set_family(self, session_id: int, family: str) -> None:
+        self._family_of[session_id] = family
+        self._by_family[family] = session_id
+
+    def _valid_by_token(self, token_hash: bytes, now: datetime) -> Optional[SessionRecord]:
+        session_id = self._by_token.get(token_hash)
+        record = self._sessions.get(session_id) if session_id is not None else None
+        return record if record is not None and record.is_valid(now) else None
+
+    async def rotate(self, db, token_hash, new_token_hash, now, family=None) -> Optional[SessionRecord]:
+        record = self._valid_by_token(token_hash, now)
+        if record is None:
+            return None
+        if family is not None:
+            self._set_family(record.id, family)
+        del self._by_token[token_hash]
+        old_previous = self._previous_of.get(record.id)
+        if old_previous is not None:
+            self._by_previous.pop(old_previous, None)
+        self._token_of[record.id] = new_token_hash
+        self._previous_of[record.id] = token_hash
+        self._by_token[new_token_hash] = record.id
+        self._by_previous[token_hash] = record.id
+        record.last_used_at = now
+        return replace(record)
+
+    async def find_recent_rotation(self, db, token_hash, new_token_hash, since, now) -> Optional[SessionRecord]:
+        record = self._valid_by_token(new_token_hash, now)
+        if (
+            record is None
+            or self._previous_of.get(record.id) != token_hash
+            or record.last_used_at is None
+            or record.last_used_at < since
+        ):
+            return None
+        return replace(record)
+
+    async def find_by_token(self, db, token_hash, now) -> Optional[SessionRecord]:
+        record = self._valid_by_token(token_hash, now)
+        return replace(record) if record is not None else None
+
+    async def revoke_reused(self, db, token_hash, family, now) -> Optional[SessionRecord]:
+        session_id = self._by_previous.get(token_hash)
+        if session_id is None and family is not None:
+            session_id = self._by_family.get(family)
+            if session_id is not None and self._token_of.get(session_id) == token_hash:
+                session_id = None
+        record = self._sessions.get(session_id) if session_id is not None else None
+        if record is None or record.is_revoked:
+            return None
+        record.is_revoked = True
+        record.revoked_at = now
+        return replace(record)
+
+    async def get_valid(self, db, session_id, user_id, now) -> Optional[SessionRecord]:
+        record = self._sessions.get(session_id)
+        if record is None or record.user_id != user_id or not record.is_valid(now):
+            return None
+        return replace(record)
+
+    async def revoke(self, db, session_id, user_id, now) -> bool:
+        record = self._sessions.get(session_id)
+        if record is None or record.user_id != user_id:
+            return False
+        record.is_revoked = True
+        record.revoked_at = now
+        return True
+
+    async def list_for_user(self, db, user_id, now, active_only=True) -> list[SessionRecord]:
+        return [
+            replace(record) for record in self._sessions.values()
+            if record.user_id == user_id and (not active_only or record.is_valid(now))
+        ]
+
+    async def evict_lru(self, db, user_id, keep, now) -> list[int]:
+        active = [
+            record for record in self._sessions.values()
+            if record.user_id == user_id and record.is_valid(now)
+        ]
+        victims = _least_recently_used(active, keep)
+        for record in victims:
+            record.is_revoked = True
+            record.revoked_at = now
+        return sorted(record.id for record in victims)
+
+    async def touch(self, db, session_id, now) -> None:
+        record = self._sessions.get(session_id)
+        if record is not None and (record.last_used_at is None or record.last_used_at < now):
+            record.last_used_at = now
+
+    async def delete_for_user(self, db, user_id) -> None:
+        for session_id in [s.id for s in self._sessions.values() if s.user_id == user_id]:
+            del self._sessions[session_id]
+            self._by_token.pop(self._token_of.pop(session_id), None)
+            previous = self._previous_of.pop(session_id, None)
+            if previous is not None:
+                self._by_previous.pop(previous, None)
+            family = self._family_of.pop(session_id, None)
+            if family is not None:
+                self._by_family.pop(family, None)
+
+
+# Todas las claves que toca un script llegan en KEYS. Los campos `token` y
+# `previous` del hash son la fuente de verdad; los índices solo orientan la
+# búsqueda y toda lectura los confirma contra el hash.
+
+# Rotación atómica: compara y reemplaza el token de la sesión y, en el mismo
+# script, actualiza sus índices. Un refresh concurrente que pierde la carrera
+# encuentra ya `token:{nuevo}` y `prev:{actual}` (ventana de gracia).
+# KEYS: hash de la sesión, token:{actual}, token:{nuevo}, prev:{actual},
+#       [prev:{previous leído antes}], [family:{familia}]
+# ARGV: token actual (hex), token nuevo (hex), ahora (ms), id de la sesión,
+#       previous leído antes ('' = ninguno), familia ('' = conservar). Devuelve 1 o 0
+_ROTATE_SCRIPT = """
+local f = redis.call('HMGET', KEYS[1], 'is_revoked', 'expires_at', 'token', 'previous')
+if f[1] ~= '0' or f[3] ~= ARGV[1] or tonumber(f[2]) <= tonumber(ARGV[3]) then return 0 end
+redis.call('HSET', KEYS[1], 'token', ARGV[2], 'previous', ARGV[1], 'last_used_at', ARGV[3])
+redis.call('DEL', KEYS[2])
+redis.call('SET', KEYS[3], ARGV[4])
+redis.call('PEXPIREAT', KEYS[3], f[2])
+redis.call('SET', KEYS[4], ARGV[4])
+redis.call('PEXPIREAT', KEYS[4], f[2])
+local i = 5
+if ARGV[5] ~= '' then
+  if f[4] == ARGV[5] then redis.call('DEL', KEYS[i]) end
+  i = i + 1
+end
+if ARGV[6] ~= '' then
+  redis.call('HSET', KEYS[1], 'family', ARGV[6])
+  redis.call('SET', KEYS[i], ARGV[4])
+  redis.call('PEXPIREAT', KEYS[i], f[2])
+end
+return 1
+"""
+
+# Revoca si el token es el último rotado o uno viejo de la familia de la sesión.
+# KEYS: hash de la sesión. ARGV: token presentado (hex), familia ('' = sin familia), ahora (ms)
+_REVOKE_REUSED_SCRIPT = """
+local f = redis.call('HMGET', KEYS[1], 'is_revoked', 'previous', 'family', 'token')
+if f[1] ~= '0' then return 0 end
+local reused = f[2] == ARGV[1] or (ARGV[2] ~= '' and f[3] == ARGV[2] and f[4] ~= ARGV[1])
+if not reused then return 0 end
+redis.call('HSET', KEYS[1], 'is_revoked', '1', 'revoked_at', ARGV[3])
+return 1
+"""
+
+
+def _ms(value: datetime) -> int:
+    return int(_as_utc(value).timestamp() * 1000)
+
+
+def _from_ms(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc)
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Sesiones en Redis.
+
+    Claves (`{prefix}` = `session`):
+        {prefix}:{id}          hash con los campos de la sesión
+        {prefix}:token:{hex}   id de la sesión con ese refresh token (índice)
+        {prefix}:prev:{hex}    id de la sesión cuyo token rotado es {hex} (índice)
+        {prefix}:family:{f}    id de la sesión de la familia de tokens {f} (índice)
+        {prefix}:user:{uid}    set de ids del usuario
+        {prefix}:next_id       contador de ids
+
+    Todas las claves expiran solas: los tokens al vencer la sesión, el hash
+    `SESSION_RETENTION_GRACE_DAYS` después (auditoría), sin reaper.
+
+    Los índices solo orientan la búsqueda: toda lectura por token confirma
+    contra los campos `token`/`previous` del hash. La rotación actualiza el
+    hash y sus índices en un solo script; con Redis Cluster, usar un `prefix`
+    con hash tag (p. ej. `{session}`) para que todas las claves compartan slot.
+    """
+
+    name = "redis"
+
+    def __init__(self, redis, prefix: str = "session"):
+        self._redis = redis
+        self._prefix = prefix
+        self._rotate = redis.register_script(_ROTATE_SCRIPT)
+        self._revoke_reused = redis.register_script(_REVOKE_REUSED_SCRIPT)
+
+    def _key(self, session_id) -> str:
+        return f"{self._prefix}:{session_id}"
+
+    def _token_key(self, token_hash: bytes) -> str:
+        return f"{self._prefix}:token:{token_hash.hex()}"
+
+    def _previous_key(self, token_hash: bytes) -> str:
+        return f"{self._prefix}:prev:{token_hash.hex()}"
+
+    def _family_key(self, family: str) -> str:
+        return f"{self._prefix}:family:{family}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self._prefix}:user:{user_id}"
+
+    def _retention_deadline(self, expires_at: datetime) -> int:
+        return _ms(expires_at + timedelta(days=settings.session_retention_grace_days))
+
+    @staticmethod
+    def _record(session_id, fields: dict) -> Optional[SessionRecord]:
+        if not fields:
+            return None
+        return SessionRecord(
+            id=int(session_id),
+            user_id=int(fields["user_id"]),
+            token_epoch=int(fields["token_epoch"]),
+            expires_at=_from_ms(fields["expires_at"]),
+            created_at=_from_ms(fields.get("created_at")),
+            last_used_at=_from_ms(fields.get("last_used_at")),
+            device_info=fields.get("device_info") or None,
+            ip_address=fields.get("ip_address") or None,
+            is_revoked=fields.get("is_revoked") == "1",
+            revoked_at=_from_ms(fields.get("revoked_at")),
+        )
+
+    async def _load(self, session_id) -> Optional[SessionRecord]:
+        return self._record(session_id, await self._redis.hgetall(self._key(session_id)))
+
+    async def create(self, db, user_id, refresh_token_hash, expires_at, token_epoch,
+                     device_info=None, ip_address=None, family=None) -> SessionRecord:
+        session_id = await self._redis.incr(f"{self._prefix}:next_id")
+        now = datetime.now(timezone.utc)
+        fields = {
+            "user_id": user_id,
+            "token_epoch": token_epoch,
+            "expires_at": _ms(expires_at),
+            "created_at": _ms(now),
+            "is_revoked": "0",
+            "token": refresh_token_hash.hex(),
+            "device_info": device_info or "",
+            "ip_address": ip_address or "",
+            "family": family or "",
+        }
+        retention = self._retention_deadline(expires_at)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(session_id), mapping=fields)
+            pipe.pexpireat(self._key(session_id), retention)
+            pipe.set(self._token_key(refresh_token_hash), session_id)
+            pipe.pexpireat(self._token_key(refresh_token_hash), _ms(expires_at))
+            pipe.sadd(self._user_key(user_id), session_id)
+            pipe.pexpireat(self._user_key(user_id), retention)
+            if family:
+                pipe.set(self._family_key(family), session_id)
+                pipe.pexpireat(self._family_key(family), _ms(expires_at))
+            await pipe.execute()
+        return SessionRecord(
+            id=session_id, user_id=user_id, token_epoch=token_epoch,
+            expires_at=_from_ms(fields["expires_at"]), created_at=_from_ms(fields["created_at"]),
+            device_info=device_info, ip_address=ip_address,
+        )
+
+    async def rotate(self, db, token_hash, new_token_hash, now, family=None) -> Optional[SessionRecord]:
+        session_id = await self._redis.get(self._token_key(token_hash))
+        if session_id is None:
+            return None
+        # El índice del token rotado antes se borra en el script si sigue vigente
+        previous = await self._redis.hget(self._key(session_id), "previous")
+        keys = [
+            self._key(session_id), self._token_key(token_hash),
+            self._token_key(new_token_hash), self._previous_key(token_hash),
+        ]
+        if previous:
+            keys.append(f"{self._prefix}:prev:{previous}")
+        if family:
+            keys.append(self._family_key(family))
+        rotated = await self._rotate(
+            keys=keys,
+            args=[
+                token_hash.hex(), new_token_hash.hex(), _ms(now), session_id,
+                previous or "", family or "",
+            ],
+        )
+        if not rotated:
+            return None
+        return await self._load(session_id)
+
+    async def find_recent_rotation(self, db, token_hash, new_token_hash, since, now) -> Optional[SessionRecord]:
+        session_id = await self._redis.get(self._token_key(new_token_hash))
+        if session_id is None:
+            return None
+        fields = await self._redis.hgetall(self._key(session_id))
+        if (
+            fields.get("token") != new_token_hash.hex()
+            or fields.get("previous") != token_hash.hex()
+            or int(fields.get("last_used_at") or 0) < _ms(since)
+        ):
+            return None
+        record = self._record(session_id, fields)
+        return record if record.is_valid(now) else None
+
+    async def find_by_token(self, db, token_hash, now) -> Optional[SessionRecord]:
+        session_id = await self._redis.get(self._token_key(token_hash))
+        if session_id is None:
+            return None
+        fields = await self._redis.hgetall(self._key(session_id))
+        if fields.get("token") != token_hash.hex():
+            return None
+        record = self._record(session_id, fields)
+        return record if record.is_valid(now) else None
+
+    async def revoke_reused(self, db, token_hash, family, now) -> Optional[SessionRecord]:
+        candidates = [await self._redis.get(self._previous_key(token_hash))]
+        if family is not None:
+            candidates.append(await self._redis.get(self._family_key(family)))
+        for session_id in dict.fromkeys(c for c in candidates if c is not None):
+            revoked = await self._revoke_reused(
+                keys=[self._key(session_id)], args=[token_hash.hex(), family or "", _ms(now)]
+            )
+            if revoked:
+                return await self._load(session_id)
+        return None
+
+    async def get_valid(self, db, session_id, user_id, now) -> Optional[SessionRecord]:
+        record = await self._load(session_id)
+        if record is None or record.user_id != user_id or not record.is_valid(now):
+            return None
+        return record
+
+    async def revoke(self, db, session_id, user_id, now) -> bool:
+        owner = await self._redis.hget(self._key(session_id), "user_id")
+        if owner is None or int(owner) != user_id:
+            return False
+        await self._redis.hset(
+            self._key(session_id), mapping={"is_revoked": "1", "revoked_at": _ms(now)}
+        )
+        return True
+
+    async def list_for_user(self, db, user_id, now, active_only=True) -> list[SessionRecord]:
+        ids = sorted(int(i) for i in await self._redis.smembers(self._user_key(user_id)))
+        if not ids:
+            return []
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for session_id in ids:
+                pipe.hgetall(self._key(session_id))
+            rows = await pipe.execute()
+
+        records, gone = [], []
+        for session_id, fields in zip(ids, rows):
+            record = self._record(session_id, fields)
+            if record is None:
+                gone.append(session_id)
+            elif not active_only or record.is_valid(now):
+                records.append(record)
+        if gone:
+            await self._redis.srem(self._user_key(user_id), *gone)
+        return records
+
+    async def evict_lru(self, db, user_id, keep, now) -> list[int]:
+        victims = _least_recently_used(await self.list_for_user(db, user_id, now), keep)
+        if not victims:
+            return []
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for record in victims:
+                pipe.hset(self._key(record.id), mapping={"is_revoked": "1", "revoked_at": _ms(now)})
+            await pipe.execute()
+        return sorted(record.id for record in victims)
+
+    async def touch(self, db, session_id, now) -> None:
+        await self._redis.hset(self._key(session_id), "last_used_at", _ms(now))
+
+    async def delete_for_user(self, db, user_id) -> None:
+        ids = list(await self._redis.smembers(self._user_key(user_id)))
+        keys = [self._user_key(user_id)]
+        for session_id in ids:
+            token, previous, family = await self._redis.hmget(
+                self._key(session_id), "token", "previous", "family"
+            )
+            keys.append(self._key(session_id))
+            if token:
+                keys.append(f"{self._prefix}:token:{token}")
+            if previous:
+                keys.append(f"{self._prefix}:prev:{previous}")
+            if family:
+                keys.append(self._family_key(family))
+        await self._redis.delete(*keys)
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+
+SESSION_STORES = ("sql", "redis", "memory")
+_session_store: Optional[SessionStore] = None
+
+
+def _build_session_store() -> SessionStore:
+    if settings.session_store == "sql":
+        return SqlSessionStore()
+    if settings.session_store == "memory":
+        return MemorySessionStore()
+    if settings.session_store == "redis":
+        from redis import asyncio as aioredis
+
+        url = settings.session_store_redis_url or settings.redis_url
+        return RedisSessionStore(aioredis.from_url(url, decode_responses=True))
+    raise ValueError(
+        f"SESSION_STORE desconocido: {settings.session_store!r} (opciones: {', '.join(SESSION_STORES)})"
+    )
+
+
+def get_session_store() -> SessionStore:
+    """Store configurado (`settings.session_store`), construido una sola vez."""
+    global _session_store
+    if _session_store is None:
+        _session_store = _build_session_store()
+        logger.info("session_store_configured", backend=_session_store.name)
+    return _session_store
+
+
+def set_session_store(store: Optional[SessionStore]) -> None:
+    """Reemplaza el store activo (None = reconstruir desde la configuración)."""
+    global _session_store
+    _session_store = store
+
+
+async def close_session_store() -> None:
+    """Cierra el store activo (llamar desde el lifespan)."""
+    global _session_store
+    if _session_store is not None:
+        await _session_store.close()
+        _session_store = None
@@ -16,6 +16,7 @@ from app.core.database import engine, Base
 from app.api.v1.router import router as api_v1_router
 from app.api.deps import get_db
 from app.core.limiter import limiter
+from app.core import session_activity, session_cache
 
 from app.core.middleware import SecurityHeadersMiddleware
 from slowapi import _rate_limit_exceeded_handler
@@ -41,6 +42,12 @@ async def lifespan(app: FastAPI):
     from app.core.sentry import init_sentry
     init_sentry()
 
+    # Seleccionar/calibrar el hasher y precalcular los hashes señuelo para logins
+    # con email inexistente
+    import asyncio
+    from app.core.hashing import configure_hasher
+    await asyncio.to_thread(configure_hasher)
+
     # Inicializar Cache (Redis con fallback a Memoria)
     from fastapi_cache import FastAPICache
     from fastapi_cache.backends.redis import RedisBackend
@@ -57,12 +64,37 @@ async def lifespan(app: FastAPI):
         await redis.ping()
         FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
         logger.info("cache_initialized", backend="redis")
+        if settings.session_cache_redis:
+            await session_cache.init(redis)
     except Exception as e:
         logger.warning("cache_fallback_inmemory", error=str(e))
         FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")
+        if settings.session_cache_redis:
+            # Sin invalidación compartida la caché de sesiones queda desactivada
+            logger.warning("session_cache_disabled", reason="redis_unavailable", error=str(e))
+    if not session_cache.enabled():
+        logger.info("session_cache_inactive", redis=settings.session_cache_redis)
     
+    # Persistencia en lote de sessions.last_used_at, purga periódica de sesiones
+    # y de usuarios dados de baja
+    from app.services import session_retention, user_purge
+    session_activity.start()
+    session_retention.start()
+    user_purge.start()
+
     yield
 
+    await user_purge.stop()
+    await session_retention.stop()
+    await session_activity.stop()
+    from app.core.session_store import close_session_store
+    await close_session_store()
+    await session_cache.close()
+
+    from app.core.hashing import hashing_executor, import_hashing_executor
+    hashing_executor.shutdown()
+    import_hashing_executor.shutdown()
+
     # Cierre: limpiar conexión Redis
     try:
         if 'redis' in dir():
@@ -131,6 +163,18 @@ async def health_check(db: AsyncSession = Depends(get_db)):
     return {"status": status_val, "database": db_status}
 
 
+@app.get("/.well-known/jwks.json", tags=["auth"])
+async def jwks():
+    """Claves públicas para verificar access tokens localmente (JWKS)."""
+    from fastapi import Response
+    from app.core.keys import get_jwks_json
+    return Response(
+        content=get_jwks_json(),
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=300"}
+    )
+
+
 @app.get("/metrics", tags=["monitoring"], include_in_schema=False)
 async def metrics():
     """Endpoint de métricas para Prometheus."""
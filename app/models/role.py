@@ -57,7 +57,7 @@ class Role(Base):
     description = Column(String(200), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    # Relación many-to-many con permisos
+    # Relación many-to-many con permisos (acotada; la usa has_permission)
     permissions = relationship(
         "Permission",
         secondary=role_permissions,
@@ -65,8 +65,8 @@ class Role(Base):
         lazy="selectin"
     )
     
-    # Relación con usuarios
-    users = relationship("User", back_populates="role")
+    # Relación con usuarios (nunca cargar la colección completa)
+    users = relationship("User", back_populates="role", lazy="raise")
     
     def has_permission(self, permission_name: str) -> bool:
         """Verifica si el rol tiene un permiso específico."""
@@ -2,17 +2,63 @@
 Modelo SQLAlchemy de Sesión.
 Almacena refresh tokens y sesiones activas de usuarios.
 """
+import base64
+import hashlib
+import hmac
 import secrets
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index
+from typing import Optional
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index, LargeBinary, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
+from app.core.config import settings
 from app.core.database import Base
 
 
+def _refresh_token_tag(family: str, secret: str) -> str:
+    message = f"refresh-family:{family}.{secret}".encode("utf-8")
+    digest = hmac.new(settings.secret_key.encode("utf-8"), message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).rstrip(b"=").decode("ascii")
+
+
+def seal_refresh_token(family: str, secret: str) -> str:
+    """Compone `{familia}.{secreto}.{firma}`; la firma (HMAC con SECRET_KEY) liga el secreto a la familia."""
+    return f"{family}.{secret}.{_refresh_token_tag(family, secret)}"
+
+
 def generate_refresh_token() -> str:
-    """Genera un token de refresh seguro de 64 caracteres."""
-    return secrets.token_urlsafe(48)
+    """
+    Genera un refresh token seguro: `{familia}.{secreto}.{firma}`.
+
+    La familia (16 caracteres) identifica la sesión durante todas sus
+    rotaciones; el secreto (64 caracteres) cambia en cada una.
+    """
+    return seal_refresh_token(secrets.token_urlsafe(12), secrets.token_urlsafe(48))
+
+
+def refresh_token_family(token: str) -> Optional[str]:
+    """
+    Familia de un refresh token emitido por este servidor.
+
+    None si el token no tiene familia (emitido antes de las familias) o si la
+    firma no corresponde: conocer el prefijo de un token no basta para que
+    se considere de la familia.
+    """
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    family, secret, tag = parts
+    if not 0 < len(family) <= 32:
+        return None
+    expected = _refresh_token_tag(family, secret)
+    if not hmac.compare_digest(tag.encode("utf-8"), expected.encode("ascii")):
+        return None
+    return family
+
+
+def hash_refresh_token(token: str) -> bytes:
+    """Digest SHA-256 (32 bytes) con el que se almacena y busca un refresh token."""
+    return hashlib.sha256(token.encode("utf-8")).digest()
 
 
 class Session(Base):
@@ -22,10 +68,15 @@ class Session(Base):
     Atributos:
         id: Identificador único
         user_id: FK al usuario propietario
-        refresh_token: Token único para renovar access token
+        refresh_token_hash: SHA-256 del refresh token (nunca se guarda en claro; rota en cada uso)
+        previous_refresh_token_hash: SHA-256 del token rotado más reciente (gracia de reintento)
+        refresh_family: Familia de tokens de la sesión; presentar un token viejo de
+            la familia revoca la sesión (detección de reutilización)
         device_info: Información del dispositivo/navegador
         ip_address: IP desde donde se creó la sesión
         is_revoked: Si la sesión fue revocada manualmente
+        revoked_at: Cuándo se revocó (base del período de gracia de la retención)
+        token_epoch: Epoch del usuario al crearse; la sesión vale mientras coincida
         expires_at: Fecha de expiración del refresh token
         created_at: Fecha de creación de la sesión
         last_used_at: Última vez que se usó para refrescar
@@ -33,17 +84,29 @@ class Session(Base):
     
     __tablename__ = "sessions"
     
-    # Índice compuesto para optimizar validación de sesiones
+    # Índice compuesto para optimizar validación de sesiones; los otros dos
+    # recorren las sesiones purgables en orden (ver services/session_retention.py)
     __table_args__ = (
         Index('ix_session_validation', 'user_id', 'is_revoked', 'expires_at'),
+        Index('ix_sessions_expires_at', 'expires_at'),
+        Index('ix_sessions_refresh_family', 'refresh_family', unique=True),
+        Index(
+            'ix_sessions_revoked_at', 'revoked_at',
+            postgresql_where=text('revoked_at IS NOT NULL'),
+            sqlite_where=text('revoked_at IS NOT NULL'),
+        ),
     )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
-    refresh_token = Column(String(100), unique=True, nullable=False, index=True)
+    refresh_token_hash = Column(LargeBinary(32), unique=True, nullable=False, index=True)
+    previous_refresh_token_hash = Column(LargeBinary(32), nullable=True, index=True)
+    refresh_family = Column(String(32), nullable=True)
     device_info = Column(String(255), nullable=True)
     ip_address = Column(String(45), nullable=True)  # IPv6 max length
     is_revoked = Column(Boolean, default=False, nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    token_epoch = Column(Integer, nullable=False, default=0, server_default="0")
     expires_at = Column(DateTime(timezone=True), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     last_used_at = Column(DateTime(timezone=True), nullable=True)
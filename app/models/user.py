@@ -2,7 +2,7 @@
 Modelo SQLAlchemy de Usuario.
 Define la estructura de la tabla users en la base de datos.
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -20,11 +20,29 @@ class User(Base):
         name: Nombre del usuario
         lastname: Apellido del usuario
         role_id: FK al rol asignado (default: rol 'user')
+        token_epoch: Generación de tokens vigente; incrementarlo invalida todas las sesiones
         created_at: Fecha de creación (automática)
         updated_at: Fecha de última actualización (automática)
+        deleted_at: Baja lógica (soft delete); la fila se purga en segundo plano
     """
     
     __tablename__ = "users"
+
+    # Índices parciales: el listado por cursor ordenado por fecha de alta solo
+    # recorre usuarios activos (ver user_service.get_users_keyset), y el purgador
+    # encuentra las bajas pendientes sin recorrer la tabla (ver user_purge)
+    __table_args__ = (
+        Index(
+            'ix_users_active_created_at_id', 'created_at', 'id',
+            postgresql_where=text('deleted_at IS NULL'),
+            sqlite_where=text('deleted_at IS NULL'),
+        ),
+        Index(
+            'ix_users_pending_purge', 'deleted_at',
+            postgresql_where=text('deleted_at IS NOT NULL'),
+            sqlite_where=text('deleted_at IS NOT NULL'),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, nullable=False, index=True)
@@ -32,15 +50,20 @@ class User(Base):
     name = Column(String(100), nullable=False)
     lastname = Column(String(100), nullable=False)
     role_id = Column(Integer, ForeignKey('roles.id'), nullable=True)
+    token_epoch = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
     
-    # Relación con Role
-    role = relationship("Role", back_populates="users", lazy="selectin")
+    # Relación con Role - many-to-one que siempre se serializa: un LEFT JOIN en la misma query
+    role = relationship("Role", back_populates="users", lazy="joined")
 
-    # Relación con Session - cascade delete para que al eliminar usuario se borren sus sesiones
+    # Relación con Session - nunca se carga implícitamente (lazy="raise"); pedirla
+    # por query con selectinload. Al borrar el usuario, ON DELETE CASCADE borra
+    # las sesiones en la BD sin cargarlas (passive_deletes)
     sessions = relationship(
-        "Session", back_populates="user", cascade="all, delete-orphan", lazy="selectin"
+        "Session", back_populates="user", cascade="all, delete-orphan",
+        lazy="raise", passive_deletes=True,
     )
     
     def has_permission(self, permission_name: str) -> bool:
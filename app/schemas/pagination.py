@@ -1,7 +1,7 @@
 """
 Esquema de Paginación Genérica.
 """
-from typing import Generic, TypeVar, List
+from typing import Generic, TypeVar, List, Optional
 from pydantic import BaseModel, ConfigDict
 
 T = TypeVar("T")
@@ -12,15 +12,37 @@ class PaginatedResponse(BaseModel, Generic[T]):
     
     Attributes:
         items: Lista de elementos de la página actual
-        total: Total de elementos en la base de datos
+        total: Total de elementos en la base de datos (None si no se calculó)
         page: Número de página actual (1-based)
         per_page: Elementos por página
-        total_pages: Total de páginas disponibles
+        total_pages: Total de páginas disponibles (None si no se calculó)
+        total_approximate: Si el total es una estimación del planner
     """
     items: List[T]
-    total: int
+    total: Optional[int]
     page: int
     per_page: int
-    total_pages: int
+    total_pages: Optional[int]
+    total_approximate: bool = False
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """
+    Respuesta paginada por cursor.
+    
+    Attributes:
+        items: Lista de elementos de la página actual
+        per_page: Elementos por página
+        has_more: Si quedan elementos en la dirección de avance
+        next_cursor: Cursor opaco de la página siguiente (None si es la última)
+        prev_cursor: Cursor opaco de la página anterior (None si es la primera)
+    """
+    items: List[T]
+    per_page: int
+    has_more: bool
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
     
     model_config = ConfigDict(from_attributes=True)
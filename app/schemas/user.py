@@ -3,10 +3,10 @@ Esquemas Pydantic de Usuario.
 Define los modelos para validación de requests y responses.
 """
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 import re
 
-from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator, model_validator
 
 
 # Blacklist centralizada de contraseñas comunes
@@ -59,6 +59,42 @@ class UserCreate(UserBase):
         return _validate_password_strength(v)
 
 
+# Hash bcrypt completo ($2a$/$2b$/$2y$, coste de dos dígitos, salt + digest)
+_BCRYPT_HASH_RE = re.compile(r'^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$')
+
+
+class UserImport(UserBase):
+    """
+    Esquema de una fila de importación masiva.
+
+    Lleva `password` (mismas reglas que UserCreate) o `password_hash` (un
+    hash bcrypt ya calculado, que se guarda tal cual), nunca ambos. Los
+    campos extra (id, role, created_at de una exportación) se ignoran.
+    """
+    password: Optional[str] = Field(None, min_length=12)
+    password_hash: Optional[str] = Field(None, max_length=255)
+
+    @field_validator('password')
+    @classmethod
+    def validate_password_strength(cls, v: Optional[str]) -> Optional[str]:
+        if v is None:
+            return v
+        return _validate_password_strength(v)
+
+    @field_validator('password_hash')
+    @classmethod
+    def validate_password_hash(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None and not _BCRYPT_HASH_RE.match(v):
+            raise ValueError('Debe ser un hash bcrypt válido')
+        return v
+
+    @model_validator(mode='after')
+    def check_one_password(self) -> "UserImport":
+        if (self.password is None) == (self.password_hash is None):
+            raise ValueError('Indicar password o password_hash (solo uno)')
+        return self
+
+
 class UserUpdate(BaseModel):
     """
     Esquema para actualizar datos de usuario.
@@ -105,6 +141,19 @@ class UserResponse(UserBase):
             updated_at=user.updated_at
         )
 
+    @classmethod
+    def from_principal(cls, principal) -> "UserResponse":
+        """Crea respuesta desde el Principal autenticado (rol ya resuelto)."""
+        return cls(
+            id=principal.id,
+            email=principal.email,
+            name=principal.name,
+            lastname=principal.lastname,
+            role=principal.role,
+            created_at=principal.created_at,
+            updated_at=principal.updated_at
+        )
+
 
 class UserInDB(UserResponse):
     """
@@ -113,3 +162,36 @@ class UserInDB(UserResponse):
     Solo para uso interno - nunca retornar en responses.
     """
     password: str
+
+
+class ImportRowError(BaseModel):
+    """Fila rechazada de una importación (número de línea del archivo, 1-based)."""
+    line: int
+    email: Optional[str] = None
+    error: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserImportReport(BaseModel):
+    """
+    Resultado de una importación masiva.
+
+    Attributes:
+        received: Filas leídas (sin contar encabezado ni líneas vacías)
+        created: Usuarios creados
+        duplicates: Filas con un email ya registrado o repetido en el archivo
+        invalid: Filas que no pasaron la validación
+        errors: Detalle por fila de duplicados e inválidos
+        errors_truncated: Si hubo más errores que IMPORT_MAX_ERRORS
+        last_committed_line: Última línea del archivo cuyo lote quedó confirmado
+    """
+    received: int
+    created: int
+    duplicates: int
+    invalid: int
+    errors: List[ImportRowError]
+    errors_truncated: bool = False
+    last_committed_line: int = 0
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,188 @@
+"""
+Servicio de Retención de Sesiones - Purga de sesiones expiradas y revocadas.
+
+Las sesiones expiradas o revocadas se conservan `SESSION_RETENTION_GRACE_DAYS`
+para auditoría y después se borran en lotes acotados. Cada lote recorre el
+índice de `expires_at` o `revoked_at` en orden, bloquea sus filas con
+`FOR UPDATE SKIP LOCKED` (varios workers pueden correr el reaper a la vez) y
+se confirma en su propia transacción. Entre lotes hay una pausa para no
+competir con el tráfico.
+
+Se ejecuta periódicamente desde el `lifespan` o a mano con
+`python -m app.cli purge-sessions`.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import SESSION_RETENTION_LAG, record_session_retention_batch
+from app.models.session import Session as SessionModel
+
+logger = get_logger(__name__)
+
+# Motivo de purga -> columna indexada que fija desde cuándo la sesión está muerta
+PURGE_COLUMNS = {
+    "expired": SessionModel.expires_at,
+    "revoked": SessionModel.revoked_at,
+}
+
+_reaper_task: Optional[asyncio.Task] = None
+
+
+@dataclass
+class RetentionReport:
+    """Resultado de una pasada del reaper."""
+    purged: dict[str, int] = field(default_factory=dict)
+    batches: int = 0
+    lag_seconds: float = 0.0
+    dry_run: bool = False
+
+    @property
+    def total(self) -> int:
+        return sum(self.purged.values())
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite devuelve datetimes naive (en UTC)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def purge_batch(db: AsyncSession, reason: str, cutoff: datetime, batch_size: int) -> int:
+    """Borra hasta `batch_size` sesiones purgables por `reason`. Devuelve filas borradas."""
+    column = PURGE_COLUMNS[reason]
+    ids = (
+        select(SessionModel.id)
+        .where(column < cutoff)
+        .order_by(column)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(SessionModel)
+        .where(SessionModel.id.in_(ids.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def count_purgeable(db: AsyncSession, reason: str, cutoff: datetime) -> int:
+    """Cantidad de sesiones purgables por `reason`."""
+    column = PURGE_COLUMNS[reason]
+    result = await db.execute(select(func.count()).where(column < cutoff))
+    return result.scalar() or 0
+
+
+async def retention_lag(db: AsyncSession, cutoff: datetime) -> float:
+    """Segundos desde que la sesión purgable más vieja cumplió el período de gracia."""
+    lag = 0.0
+    for column in PURGE_COLUMNS.values():
+        oldest = (await db.execute(select(func.min(column)).where(column < cutoff))).scalar()
+        if oldest is not None:
+            lag = max(lag, (cutoff - _as_utc(oldest)).total_seconds())
+    return lag
+
+
+async def run_retention(
+    session_factory=None,
+    grace_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    pause_seconds: Optional[float] = None,
+    max_batches: Optional[int] = None,
+    dry_run: bool = False,
+) -> RetentionReport:
+    """
+    Ejecuta una pasada completa del reaper.
+
+    Args:
+        session_factory: Fábrica de sesiones de BD (por defecto la de la app)
+        grace_days: Días de gracia (por defecto SESSION_RETENTION_GRACE_DAYS)
+        batch_size: Filas por lote (por defecto SESSION_RETENTION_BATCH_SIZE)
+        pause_seconds: Pausa entre lotes (por defecto SESSION_RETENTION_BATCH_PAUSE_SECONDS)
+        max_batches: Límite de lotes por motivo (None = hasta vaciar)
+        dry_run: Solo contar las sesiones purgables
+
+    Returns:
+        RetentionReport con filas borradas por motivo y lag final
+    """
+    if session_factory is None:
+        from app.core.database import AsyncSessionLocal
+        session_factory = AsyncSessionLocal
+    grace_days = settings.session_retention_grace_days if grace_days is None else grace_days
+    batch_size = batch_size or settings.session_retention_batch_size
+    if pause_seconds is None:
+        pause_seconds = settings.session_retention_batch_pause_seconds
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=grace_days)
+    report = RetentionReport(dry_run=dry_run)
+
+    async with session_factory() as db:
+        for reason in PURGE_COLUMNS:
+            if dry_run:
+                report.purged[reason] = await count_purgeable(db, reason, cutoff)
+                continue
+
+            report.purged[reason] = 0
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                start = time.perf_counter()
+                deleted = await purge_batch(db, reason, cutoff, batch_size)
+                record_session_retention_batch(reason, deleted, time.perf_counter() - start)
+                batches += 1
+                report.purged[reason] += deleted
+                if deleted < batch_size:
+                    break
+                await asyncio.sleep(pause_seconds)
+            report.batches += batches
+
+        report.lag_seconds = await retention_lag(db, cutoff)
+
+    SESSION_RETENTION_LAG.set(report.lag_seconds)
+    logger.info(
+        "session_retention_completed",
+        purged=report.purged,
+        batches=report.batches,
+        lag_seconds=round(report.lag_seconds, 1),
+        dry_run=dry_run,
+    )
+    return report
+
+
+async def _reaper_loop(session_factory) -> None:
+    while True:
+        await asyncio.sleep(settings.session_retention_interval_seconds)
+        try:
+            await run_retention(session_factory)
+        except Exception as e:
+            logger.error("session_retention_failed", error=str(e))
+
+
+def start(session_factory=None) -> None:
+    """Arranca el reaper periódico (no-op si el intervalo es 0 o el store no es SQL)."""
+    global _reaper_task
+    if _reaper_task is not None or settings.session_retention_interval_seconds <= 0:
+        return
+    if settings.session_store != "sql":
+        # Redis expira las sesiones solo; el store en memoria es efímero
+        return
+    _reaper_task = asyncio.create_task(_reaper_loop(session_factory))
+
+
+async def stop() -> None:
+    """Detiene el reaper periódico."""
+    global _reaper_task
+    if _reaper_task is None:
+        return
+    _reaper_task.cancel()
+    try:
+        await _reaper_task
+    except asyncio.CancelledError:
+        pass
+    _reaper_task = None
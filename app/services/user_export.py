@@ -0,0 +1,116 @@
+"""
+Servicio de Exportación de Usuarios - Volcado completo en streaming.
+
+Recorre la tabla con un cursor del lado del servidor
+(`user_queries.stream_user_rows`) y codifica cada lote apenas llega, en
+NDJSON (un objeto por línea) o CSV. La memoria es la de un lote,
+independientemente del tamaño de la tabla, y toda la exportación usa una
+sola conexión del pool.
+
+Si el cliente se desconecta, el generador deja de leer y cierra el cursor.
+"""
+import csv
+import io
+import time
+from contextlib import aclosing
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services import user_queries
+
+logger = get_logger(__name__)
+
+# Formato -> media type
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+CSV_COLUMNS = [column.key for column in user_queries.USER_ROW_COLUMNS]
+
+# Prefijos que una planilla interpreta como fórmula (CSV injection)
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def escape_csv_formula(text: str) -> str:
+    """
+    Antepone `'` a una celda que una planilla ejecutaría como fórmula.
+
+    También a las que ya empiezan con `'` seguidas de un prefijo de fórmula,
+    así `unescape_csv_formula` recupera siempre el valor original.
+    """
+    return "'" + text if text.lstrip("'").startswith(_FORMULA_PREFIXES) else text
+
+
+def unescape_csv_formula(text: str) -> str:
+    """Inverso de `escape_csv_formula` (la importación lo aplica a cada celda CSV)."""
+    if text.startswith("'") and text.lstrip("'").startswith(_FORMULA_PREFIXES):
+        return text[1:]
+    return text
+
+
+def encode_ndjson(rows: list[dict]) -> bytes:
+    """Un objeto JSON por fila, terminado en salto de línea."""
+    return b"".join(orjson.dumps(row, option=orjson.OPT_UTC_Z) + b"\n" for row in rows)
+
+
+def _csv_cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return escape_csv_formula(str(value))
+
+
+def encode_csv(rows: list[dict], header: bool = False) -> bytes:
+    """Filas CSV (RFC 4180) con las columnas de `CSV_COLUMNS`."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\r\n")
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    writer.writerows([_csv_cell(row[column]) for column in CSV_COLUMNS] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def export_users(
+    db: AsyncSession,
+    fmt: str,
+    batch_size: Optional[int] = None,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Genera la exportación de todos los usuarios, un chunk por lote.
+
+    Args:
+        db: Sesión de BD (debe seguir abierta mientras se consume el generador)
+        fmt: "ndjson" o "csv"
+        batch_size: Filas por lote (default: EXPORT_BATCH_SIZE)
+        is_disconnected: Callback que indica si el cliente se fue (p. ej.
+            `request.is_disconnected`); se consulta antes de cada lote
+    """
+    batch_size = batch_size or settings.export_batch_size
+    start = time.perf_counter()
+    exported = 0
+
+    if fmt == "csv":
+        yield encode_csv([], header=True)
+
+    async with aclosing(user_queries.stream_user_rows(db, batch_size)) as batches:
+        async for rows in batches:
+            if is_disconnected is not None and await is_disconnected():
+                logger.warning("users_export_aborted", format=fmt, rows=exported)
+                return
+            yield encode_ndjson(rows) if fmt == "ndjson" else encode_csv(rows)
+            exported += len(rows)
+
+    logger.info(
+        "users_export_completed",
+        format=fmt,
+        rows=exported,
+        duration_seconds=round(time.perf_counter() - start, 3),
+    )
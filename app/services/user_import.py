@@ -0,0 +1,316 @@
+"""
+Servicio de Importación de Usuarios - Alta masiva en lotes.
+
+Lee un flujo NDJSON o CSV (mismas columnas que la exportación) sin cargarlo
+entero en memoria y procesa cada lote de IMPORT_BATCH_SIZE filas en tres
+pasos:
+
+1. Validación con `UserImport` (reglas de `UserCreate`; acepta `password` o
+   un `password_hash` bcrypt ya calculado). Los emails ya registrados se
+   descartan con un solo SELECT antes de gastar CPU en hashearlos.
+2. Hashing de las contraseñas en claro repartido entre los workers del pool
+   de importación (procesos por defecto), con el hasher actual.
+3. INSERT multi-fila con ON CONFLICT (email) DO NOTHING RETURNING email; en
+   PostgreSQL con asyncpg, COPY a una tabla temporal y un INSERT ... SELECT.
+   Un commit por lote: lo ya importado sobrevive a un corte, y reintentar el
+   mismo archivo solo crea lo que falta.
+
+El resultado es un reporte con el motivo de cada fila rechazada.
+"""
+import asyncio
+import csv
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator, Optional
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import counts
+from app.core.config import settings
+from app.core.hashing import get_hasher, hash_many, import_hashing_executor
+from app.core.logging import get_logger
+from app.core.metrics import record_user_import
+from app.models.user import User
+from app.schemas.user import UserImport
+from app.services.user_export import EXPORT_FORMATS, unescape_csv_formula
+from app.services.user_service import insert_users_ignoring_duplicates
+
+logger = get_logger(__name__)
+
+# Formato -> media type (los mismos que produce la exportación)
+IMPORT_FORMATS = EXPORT_FORMATS
+
+# Una línea más larga que esto se rechaza sin acumularla en memoria
+MAX_LINE_BYTES = 64 * 1024
+
+_COLUMNS = ("email", "password", "name", "lastname")
+
+
+@dataclass
+class RowError:
+    """Fila rechazada (número de línea del archivo, 1-based)."""
+    line: int
+    email: Optional[str]
+    error: str
+
+
+@dataclass
+class ImportReport:
+    """Resultado de una importación (ver `UserImportReport`)."""
+    received: int = 0
+    created: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: list[RowError] = field(default_factory=list)
+    errors_truncated: bool = False
+    last_committed_line: int = 0
+
+    def add_errors(self, errors: list[RowError]) -> None:
+        room = settings.import_max_errors - len(self.errors)
+        self.errors.extend(errors[:max(room, 0)])
+        self.errors_truncated = self.errors_truncated or len(errors) > room
+
+
+async def _iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[tuple[int, Optional[bytes]]]:
+    """(número de línea, contenido) de un flujo de bytes; None si la línea era demasiado larga."""
+    line_no = 0
+    buffer = b""
+    oversized = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, None if oversized else line.rstrip(b"\r")
+            oversized = False
+        if len(buffer) > MAX_LINE_BYTES:
+            oversized, buffer = True, b""
+    if buffer or oversized:
+        yield line_no + 1, None if oversized else buffer.rstrip(b"\r")
+
+
+async def iter_records(
+    chunks: AsyncIterable[bytes], fmt: str
+) -> AsyncIterator[tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Decodifica el flujo en registros: (línea, dict, None) o (línea, None, error).
+
+    NDJSON: un objeto por línea. CSV: encabezado con los nombres de columna y
+    un registro por línea; las celdas vacías cuentan como ausentes y se quita
+    la `'` que la exportación antepone a las que parecen fórmulas. Las
+    líneas en blanco se ignoran.
+    """
+    header: Optional[list[str]] = None
+    async for line_no, line in _iter_lines(chunks):
+        if line is None:
+            yield line_no, None, f"Línea de más de {MAX_LINE_BYTES} bytes"
+            continue
+        if not line.strip():
+            continue
+        if fmt == "ndjson":
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                yield line_no, None, "JSON inválido"
+                continue
+            if isinstance(record, dict):
+                yield line_no, record, None
+            else:
+                yield line_no, None, "Se esperaba un objeto JSON"
+            continue
+
+        try:
+            values = next(csv.reader([line.decode("utf-8-sig" if header is None else "utf-8")]))
+        except UnicodeDecodeError:
+            yield line_no, None, "Texto UTF-8 inválido"
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+        elif len(values) != len(header):
+            yield line_no, None, "Cantidad de columnas distinta al encabezado"
+        else:
+            yield line_no, {k: unescape_csv_formula(v) for k, v in zip(header, values) if v != ""}, None
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'fila'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+async def hash_passwords(passwords: list[str]) -> list[str]:
+    """Hashea en paralelo, una tanda por worker del pool de importación."""
+    if not passwords:
+        return []
+    workers = min(import_hashing_executor.workers, len(passwords))
+    size = -(-len(passwords) // workers)
+    groups = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    hasher = get_hasher()
+    # Con otras importaciones en curso se espera un cupo del pool, nunca 503
+    results = await asyncio.gather(*(
+        import_hashing_executor.run_queued("import", hash_many, group, hasher) for group in groups
+    ))
+    return [hashed for result in results for hashed in result]
+
+
+async def _copy_users(db: AsyncSession, rows: list[dict]) -> set[str]:
+    """COPY a una tabla temporal y INSERT ... SELECT ... ON CONFLICT (asyncpg)."""
+    await db.execute(text(
+        "CREATE TEMP TABLE IF NOT EXISTS users_import "
+        "(email text, password text, name text, lastname text) ON COMMIT DELETE ROWS"
+    ))
+    connection = await (await db.connection()).get_raw_connection()
+    await connection.driver_connection.copy_records_to_table(
+        "users_import",
+        records=[tuple(row[column] for column in _COLUMNS) for row in rows],
+        columns=list(_COLUMNS),
+    )
+    result = await db.execute(text(
+        "INSERT INTO users (email, password, name, lastname) "
+        "SELECT email, password, name, lastname FROM users_import "
+        "ON CONFLICT (email) DO NOTHING RETURNING email"
+    ))
+    return set(result.scalars())
+
+
+async def insert_users(db: AsyncSession, rows: list[dict]) -> set[str]:
+    """
+    Inserta las filas ignorando emails ya registrados (sin commit).
+
+    Returns:
+        Emails efectivamente insertados
+    """
+    if not rows:
+        return set()
+    dialect = (await db.connection()).dialect
+    if dialect.name == "postgresql" and dialect.driver == "asyncpg":
+        return await _copy_users(db, rows)
+    stmt = insert_users_ignoring_duplicates(dialect).returning(User.__table__.c.email)
+    # executemany + RETURNING: SQLAlchemy lo envía como INSERT multi-fila (insertmanyvalues)
+    result = await db.execute(stmt, rows)
+    return set(result.scalars())
+
+
+async def _import_batch(
+    db: AsyncSession, batch: list[tuple[int, Optional[dict], Optional[str]]],
+    seen: set[str], report: ImportReport,
+) -> None:
+    errors: list[RowError] = []
+    valid: list[tuple[int, UserImport]] = []
+    for line_no, record, error in batch:
+        if error is None:
+            try:
+                valid.append((line_no, UserImport.model_validate(record)))
+                continue
+            except ValidationError as exc:
+                error = _format_validation_error(exc)
+        email = record.get("email") if isinstance(record, dict) else None
+        errors.append(RowError(line_no, email if isinstance(email, str) else None, error))
+    report.invalid += len(errors)
+
+    # Repetidos en el archivo o ya registrados: no se hashean
+    existing = set((await db.execute(
+        select(User.email).where(User.email.in_([user.email for _, user in valid]))
+    )).scalars()) if valid else set()
+    pending: list[tuple[int, UserImport]] = []
+    for line_no, user in valid:
+        if user.email in seen or user.email in existing:
+            reason = "Email repetido en el archivo" if user.email in seen else "El email ya está registrado"
+            errors.append(RowError(line_no, user.email, reason))
+            report.duplicates += 1
+        else:
+            pending.append((line_no, user))
+        seen.add(user.email)
+
+    hashes = iter(await hash_passwords(
+        [user.password for _, user in pending if user.password_hash is None]
+    ))
+    inserted = await insert_users(db, [
+        {
+            "email": user.email,
+            "password": user.password_hash or next(hashes),
+            "name": user.name,
+            "lastname": user.lastname,
+        }
+        for _, user in pending
+    ])
+    await db.commit()
+    report.last_committed_line = batch[-1][0]
+
+    for line_no, user in pending:
+        if user.email in inserted:
+            report.created += 1
+        else:
+            # Alta concurrente entre el SELECT y el INSERT
+            errors.append(RowError(line_no, user.email, "El email ya está registrado"))
+            report.duplicates += 1
+    report.add_errors(sorted(errors, key=lambda e: e.line))
+
+
+async def import_users(
+    db: AsyncSession,
+    chunks: AsyncIterable[bytes],
+    fmt: str,
+    batch_size: Optional[int] = None,
+) -> ImportReport:
+    """
+    Importa usuarios desde un flujo NDJSON o CSV.
+
+    Args:
+        db: Sesión de BD (se hace commit por lote)
+        chunks: Contenido del archivo en trozos (p. ej. `request.stream()`)
+        fmt: "ndjson" o "csv"
+        batch_size: Filas por lote (default: IMPORT_BATCH_SIZE)
+
+    Returns:
+        Reporte con los totales y el detalle de las filas rechazadas
+
+    Si algo falla a mitad de camino, los lotes ya confirmados quedan
+    aplicados: se registra `users_import_aborted` con la última línea
+    confirmada y reimportar el mismo archivo solo crea lo que falta.
+    """
+    batch_size = batch_size or settings.import_batch_size
+    start = time.perf_counter()
+    report = ImportReport()
+    seen: set[str] = set()
+    batch: list[tuple[int, Optional[dict], Optional[str]]] = []
+
+    try:
+        async for item in iter_records(chunks, fmt):
+            report.received += 1
+            batch.append(item)
+            if len(batch) >= batch_size:
+                await _import_batch(db, batch, seen, report)
+                batch = []
+        if batch:
+            await _import_batch(db, batch, seen, report)
+    except Exception as e:
+        await db.rollback()
+        if report.created:
+            counts.invalidate(User.__table__)
+        logger.warning(
+            "users_import_aborted",
+            format=fmt,
+            created=report.created,
+            last_committed_line=report.last_committed_line,
+            error=str(e),
+        )
+        raise
+
+    if report.created:
+        counts.invalidate(User.__table__)
+    record_user_import(report.created, report.duplicates, report.invalid)
+    logger.info(
+        "users_import_completed",
+        format=fmt,
+        received=report.received,
+        created=report.created,
+        duplicates=report.duplicates,
+        invalid=report.invalid,
+        duration_seconds=round(time.perf_counter() - start, 3),
+    )
+    return report
@@ -0,0 +1,164 @@
+"""
+Servicio de Purga de Usuarios - Borrado diferido de cuentas dadas de baja.
+
+`user_service.delete_user` solo marca `deleted_at` y sube el epoch; el acceso
+ya está cortado. Este purgador encuentra las bajas pendientes por el índice
+parcial `ix_users_pending_purge` y, por cada usuario, borra sus sesiones en
+lotes de USER_PURGE_BATCH_SIZE (cada uno en su propia transacción, con una
+pausa entre lotes) y al final la fila del usuario. Un usuario con miles de
+sesiones nunca retiene locks más de un lote.
+
+Todas las operaciones son idempotentes: si dos workers purgan el mismo
+usuario, o la pasada se corta a la mitad, la siguiente completa el trabajo.
+
+Se ejecuta periódicamente desde el `lifespan` o a mano con
+`python -m app.cli purge-users`.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import record_user_purge
+from app.core.session_store import SqlSessionStore, get_session_store
+from app.models.session import Session as SessionModel
+from app.models.user import User
+
+logger = get_logger(__name__)
+
+_purger_task: Optional[asyncio.Task] = None
+
+
+@dataclass
+class PurgeReport:
+    """Resultado de una pasada del purgador."""
+    users: int = 0
+    sessions: int = 0
+
+
+async def pending_user_ids(db: AsyncSession, limit: int) -> list[int]:
+    """Usuarios dados de baja pendientes de purga, los más antiguos primero."""
+    result = await db.execute(
+        select(User.id)
+        .where(User.deleted_at.is_not(None))
+        .order_by(User.deleted_at)
+        .limit(limit)
+    )
+    return list(result.scalars())
+
+
+async def purge_user(
+    db: AsyncSession, user_id: int, batch_size: int, pause_seconds: float
+) -> int:
+    """
+    Borra las sesiones de un usuario dado de baja en lotes y después el usuario.
+
+    Returns:
+        Sesiones borradas
+    """
+    deleted = 0
+    while True:
+        ids = (
+            select(SessionModel.id)
+            .where(SessionModel.user_id == user_id)
+            .limit(batch_size)
+        )
+        result = await db.execute(
+            delete(SessionModel)
+            .where(SessionModel.id.in_(ids.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            break
+        await asyncio.sleep(pause_seconds)
+
+    store = get_session_store()
+    if not isinstance(store, SqlSessionStore):
+        await store.delete_for_user(db, user_id)
+
+    # Solo si sigue dado de baja
+    await db.execute(
+        delete(User)
+        .where(User.id == user_id, User.deleted_at.is_not(None))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return deleted
+
+
+async def run_purge(
+    session_factory=None,
+    batch_size: Optional[int] = None,
+    pause_seconds: Optional[float] = None,
+    max_users: Optional[int] = None,
+) -> PurgeReport:
+    """
+    Ejecuta una pasada del purgador.
+
+    Args:
+        session_factory: Fábrica de sesiones de BD (por defecto la de la app)
+        batch_size: Sesiones por lote (por defecto USER_PURGE_BATCH_SIZE)
+        pause_seconds: Pausa entre lotes (por defecto USER_PURGE_BATCH_PAUSE_SECONDS)
+        max_users: Límite de usuarios en esta pasada (None = hasta vaciar)
+
+    Returns:
+        PurgeReport con usuarios y sesiones borrados
+    """
+    if session_factory is None:
+        from app.core.database import AsyncSessionLocal
+        session_factory = AsyncSessionLocal
+    batch_size = batch_size or settings.user_purge_batch_size
+    if pause_seconds is None:
+        pause_seconds = settings.user_purge_batch_pause_seconds
+
+    report = PurgeReport()
+    async with session_factory() as db:
+        while max_users is None or report.users < max_users:
+            limit = batch_size if max_users is None else min(batch_size, max_users - report.users)
+            user_ids = await pending_user_ids(db, limit)
+            for user_id in user_ids:
+                report.sessions += await purge_user(db, user_id, batch_size, pause_seconds)
+                report.users += 1
+            if len(user_ids) < limit:
+                break
+
+    record_user_purge(report.users, report.sessions)
+    if report.users:
+        logger.info("user_purge_completed", users=report.users, sessions=report.sessions)
+    return report
+
+
+async def _purger_loop(session_factory) -> None:
+    while True:
+        await asyncio.sleep(settings.user_purge_interval_seconds)
+        try:
+            await run_purge(session_factory)
+        except Exception as e:
+            logger.error("user_purge_failed", error=str(e))
+
+
+def start(session_factory=None) -> None:
+    """Arranca el purgador periódico (no-op si el intervalo es 0)."""
+    global _purger_task
+    if _purger_task is not None or settings.user_purge_interval_seconds <= 0:
+        return
+    _purger_task = asyncio.create_task(_purger_loop(session_factory))
+
+
+async def stop() -> None:
+    """Detiene el purgador periódico."""
+    global _purger_task
+    if _purger_task is None:
+        return
+    _purger_task.cancel()
+    try:
+        await _purger_task
+    except asyncio.CancelledError:
+        pass
+    _purger_task = None
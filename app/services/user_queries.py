@@ -0,0 +1,98 @@
+"""
+Consultas de lectura de usuarios - Proyecciones sin ORM.
+
+Los endpoints de lectura no necesitan instancias `User`: seleccionan solo las
+columnas de `UserResponse` (con `roles.name` por LEFT JOIN) como filas Core y
+las devuelven como dicts listos para serializar. Sin identity map, sin
+instrumentación de atributos y sin construir un `UserResponse` por fila.
+
+Las escrituras y la autenticación siguen usando el ORM (`user_service`).
+"""
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import KeysetPage, decode_cursor, paginate_keyset
+from app.models.role import Role
+from app.models.user import User
+from app.services.user_service import ACTIVE_USER, USER_SORT_KEYS, user_order, users_keyset_scope
+
+# Columnas de UserResponse, con sus mismos nombres
+USER_ROW_COLUMNS = (
+    User.id,
+    User.email,
+    User.name,
+    User.lastname,
+    Role.name.label("role"),
+    User.created_at,
+    User.updated_at,
+)
+
+
+def select_user_rows() -> Select:
+    """SELECT base de la proyección de usuarios activos (sin orden)."""
+    return (
+        select(*USER_ROW_COLUMNS)
+        .select_from(User)
+        .outerjoin(Role, Role.id == User.role_id)
+        .where(ACTIVE_USER)
+    )
+
+
+async def list_user_rows(
+    db: AsyncSession, skip: int = 0, limit: int = 100, sort: str = "id", descending: bool = False
+) -> list[dict]:
+    """Página de usuarios por OFFSET, como dicts (Async)."""
+    result = await db.execute(
+        select_user_rows().order_by(*user_order(sort, descending)).offset(skip).limit(limit)
+    )
+    return [row._asdict() for row in result]
+
+
+async def list_user_rows_keyset(
+    db: AsyncSession,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    descending: bool = False,
+) -> KeysetPage:
+    """
+    Página de usuarios por cursor, con los items como dicts (Async).
+
+    Acepta los mismos cursores que `user_service.get_users_keyset`.
+
+    Raises:
+        InvalidCursorException: Si el cursor no es válido para este orden
+    """
+    keys = USER_SORT_KEYS[sort]
+    scope = users_keyset_scope(sort, descending)
+    position = decode_cursor(cursor, scope, keys) if cursor else None
+    return await paginate_keyset(
+        db, select_user_rows(), keys, limit, scope,
+        cursor=position, descending=descending, rows=True,
+    )
+
+
+async def get_user_row(db: AsyncSession, user_id: int) -> Optional[dict]:
+    """Un usuario como dict, o None si no existe (Async)."""
+    result = await db.execute(select_user_rows().where(User.id == user_id))
+    row = result.one_or_none()
+    return row._asdict() if row is not None else None
+
+
+async def stream_user_rows(db: AsyncSession, batch_size: int = 1000) -> AsyncIterator[list[dict]]:
+    """
+    Recorre todos los usuarios en lotes de `batch_size` dicts, ordenados por id (Async).
+
+    Usa un cursor del lado del servidor (`yield_per`): la memoria no depende
+    del tamaño de la tabla y la consulta ocupa una sola conexión.
+    """
+    result = await db.stream(
+        select_user_rows().order_by(User.id).execution_options(yield_per=batch_size)
+    )
+    try:
+        async for partition in result.partitions():
+            yield [row._asdict() for row in partition]
+    finally:
+        await result.close()
@@ -1,131 +1,395 @@
 """
 Servicio de Usuario - Lógica de negocio asíncrona para operaciones de usuarios.
 """
-from typing import Optional, List
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional, List, Sequence
 
-from sqlalchemy import select, func
+from sqlalchemy import func, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Dialect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload, selectinload
 from sqlalchemy.exc import IntegrityError
 
+from app.models.role import Role
 from app.models.user import User
-from app.models.session import Session as SessionModel
 from app.schemas.user import UserCreate, UserUpdate
 from app.core.security import (
-    async_get_password_hash, async_verify_password,
-    get_password_hash, verify_password,
+    async_get_password_hash, async_verify_password, async_verify_dummy_password,
+    get_password_hash, verify_password, current_token_epoch,
 )
+from app.core import counts, session_cache
+from app.core.config import settings
+from app.core.cache import TTLCache
+from app.core.counts import RowCount
+from app.core.session_store import SessionRecord, get_session_store
+from app.core.database import AsyncSessionLocal
+from app.core.hashing import needs_rehash
 from app.core.exceptions import UserNotFoundException, UserAlreadyExistsException
+from app.core.pagination import KeysetPage, decode_cursor, paginate_keyset
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Carga de los usuarios que se serializan: el rol en la misma query (JOIN) sin
+# sus permisos. User.sessions ya es lazy="raise"; se pide con selectinload
+USER_LOAD_OPTIONS = (joinedload(User.role).raiseload(Role.permissions),)
 
-async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
-    """Obtiene un usuario por su ID (Async)."""
-    result = await db.execute(select(User).filter(User.id == user_id))
+# Usuarios no dados de baja. Toda lectura de user_service lo aplica: por PK o
+# email es un filtro sobre una sola fila; los listados por fecha usan el índice
+# parcial ix_users_active_created_at_id
+ACTIVE_USER = User.deleted_at.is_(None)
+
+# Órdenes de listado -> clave de keyset (única, terminada en la PK, con índice)
+USER_SORT_KEYS = {
+    "id": (User.id,),
+    "created_at": (User.created_at, User.id),
+}
+
+# Columnas de UserResponse para RETURNING de las escrituras y lecturas por id.
+# El rol va como subconsulta escalar porque RETURNING no admite JOIN; sus columnas se
+# nombran calificadas a mano porque SQLAlchemy las emite sin tabla dentro de
+# RETURNING en SQLite, donde `id` resolvería a roles.id
+_users = User.__table__
+USER_COLUMNS = (
+    _users.c.id,
+    _users.c.email,
+    _users.c.name,
+    _users.c.lastname,
+    select(Role.name)
+    .where(literal_column("roles.id") == literal_column("users.role_id"))
+    .scalar_subquery().label("role"),
+    _users.c.created_at,
+    _users.c.updated_at,
+)
+
+# INSERT ... ON CONFLICT DO NOTHING por dialecto (misma sintaxis en ambos)
+_DIALECT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+# Caché de lectura por id de las filas de UserResponse (get_users_by_ids). Las
+# escrituras del proceso la invalidan; otros workers ven el cambio al vencer el TTL
+_user_rows: TTLCache[dict] = TTLCache("user_row", maxsize=settings.user_cache_size)
+
+# Referencias a tareas en segundo plano (evita que el GC las cancele)
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def get_user_by_id(
+    db: AsyncSession, user_id: int, with_sessions: bool = False
+) -> Optional[User]:
+    """
+    Obtiene un usuario por su ID (Async).
+
+    El rol llega en la misma query. `User.sessions` no se carga salvo con
+    `with_sessions=True` (un SELECT ... IN adicional).
+    """
+    query = select(User).options(*USER_LOAD_OPTIONS).filter(User.id == user_id, ACTIVE_USER)
+    if with_sessions:
+        query = query.options(selectinload(User.sessions))
+    result = await db.execute(query)
     return result.scalar_one_or_none()
 
 
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Obtiene un usuario por su email (Async)."""
-    result = await db.execute(select(User).filter(User.email == email))
+    result = await db.execute(
+        select(User).options(*USER_LOAD_OPTIONS).filter(User.email == email, ACTIVE_USER)
+    )
     return result.scalar_one_or_none()
 
 
-async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
-    """Obtiene una lista de usuarios con paginación (Async)."""
-    result = await db.execute(select(User).offset(skip).limit(limit))
+def user_order(sort: str, descending: bool) -> list:
+    """ORDER BY de un listado de usuarios (la clave de keyset de `sort`)."""
+    return [k.desc() if descending else k.asc() for k in USER_SORT_KEYS[sort]]
+
+
+async def get_users(
+    db: AsyncSession, skip: int = 0, limit: int = 100, sort: str = "id", descending: bool = False
+) -> List[User]:
+    """Obtiene una lista de usuarios con paginación por OFFSET (Async)."""
+    result = await db.execute(
+        select(User)
+        .options(*USER_LOAD_OPTIONS)
+        .where(ACTIVE_USER)
+        .order_by(*user_order(sort, descending))
+        .offset(skip)
+        .limit(limit)
+    )
     return result.scalars().all()
 
 
-async def count_users(db: AsyncSession) -> int:
-    """Cuenta el total de usuarios (Async)."""
-    result = await db.execute(select(func.count(User.id)))
-    return result.scalar() or 0
+def users_keyset_scope(sort: str, descending: bool) -> str:
+    """Scope de los cursores de usuarios (un cursor solo vale para su orden)."""
+    return f"users:{sort}:{'desc' if descending else 'asc'}"
+
+
+async def get_users_keyset(
+    db: AsyncSession,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    descending: bool = False,
+) -> KeysetPage:
+    """
+    Obtiene una página de usuarios por cursor (Async).
+
+    El costo no depende de la profundidad: usa la PK para `sort="id"` e
+    `ix_users_active_created_at_id` para `sort="created_at"`.
+
+    Raises:
+        InvalidCursorException: Si el cursor no es válido para este orden
+    """
+    keys = USER_SORT_KEYS[sort]
+    scope = users_keyset_scope(sort, descending)
+    position = decode_cursor(cursor, scope, keys) if cursor else None
+    return await paginate_keyset(
+        db, select(User).options(*USER_LOAD_OPTIONS).where(ACTIVE_USER), keys, limit, scope,
+        cursor=position, descending=descending,
+    )
+
+
+async def get_users_by_ids(db: AsyncSession, ids: Sequence[int]) -> list[Optional[dict]]:
+    """
+    Obtiene varios usuarios por id, como dicts con la forma de UserResponse (Async).
+
+    Los ids repetidos se buscan una sola vez; los que no están en la caché se
+    leen con un único `WHERE id IN (...)`. El resultado sigue el orden de
+    `ids` (con repetidos) y tiene None donde el usuario no existe o está dado
+    de baja. Los faltantes no se cachean.
+    """
+    found: dict[int, dict] = {}
+    missing = []
+    for user_id in dict.fromkeys(ids):
+        row = _user_rows.get(user_id)
+        if row is None:
+            missing.append(user_id)
+        else:
+            found[user_id] = row
+
+    if missing:
+        result = await db.execute(
+            select(*USER_COLUMNS).where(_users.c.id.in_(missing), ACTIVE_USER)
+        )
+        for row in result.mappings():
+            found[row["id"]] = user = dict(row)
+            _user_rows.set(row["id"], user, ttl=settings.user_cache_ttl_seconds)
+
+    return [found.get(user_id) for user_id in ids]
+
+
+def invalidate_user_row(user_id: int) -> None:
+    """Descarta la fila cacheada de un usuario (llamar tras modificarlo)."""
+    _user_rows.pop(user_id)
+
+
+def clear_user_rows() -> None:
+    """Vacía la caché de filas de usuarios."""
+    _user_rows.clear()
+
+
+async def count_users(db: AsyncSession, strategy: Optional[str] = None) -> RowCount:
+    """Cuenta los usuarios activos según la estrategia (default: COUNT_STRATEGY) (Async)."""
+    return await counts.count_rows(db, User.__table__, strategy, where=ACTIVE_USER)
+
+
+def insert_users_ignoring_duplicates(dialect: Dialect):
+    """INSERT en users que omite los emails ya registrados (ON CONFLICT (email) DO NOTHING)."""
+    return _DIALECT_INSERTS[dialect.name](_users).on_conflict_do_nothing(
+        index_elements=[_users.c.email]
+    )
+
+
+async def create_user(db: AsyncSession, user_data: UserCreate) -> dict:
+    """
+    Crea un nuevo usuario con mitigación de timing attacks (Async).
 
+    Una sola sentencia: INSERT ... ON CONFLICT (email) DO NOTHING RETURNING.
+    Sin fila devuelta, el email ya existía.
 
-async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
-    """Crea un nuevo usuario con mitigación de timing attacks (Async)."""
+    Returns:
+        Dict con la forma de UserResponse
+    """
     # SIEMPRE hashear para timing consistency (bcrypt ~200ms, en thread pool)
     hashed_password = await async_get_password_hash(user_data.password)
 
-    existing_user = await get_user_by_email(db, user_data.email)
-    if existing_user:
-        logger.warning("user_creation_duplicate_email", email=user_data.email)
-        raise UserAlreadyExistsException()
-
-    user = User(
+    dialect = (await db.connection()).dialect
+    stmt = insert_users_ignoring_duplicates(dialect).values(
         email=user_data.email,
         password=hashed_password,
         name=user_data.name,
         lastname=user_data.lastname
-    )
+    ).returning(*USER_COLUMNS)
 
     try:
-        db.add(user)
+        user = (await db.execute(stmt)).mappings().one_or_none()
         await db.commit()
-        await db.refresh(user)
-        logger.info("user_created", user_id=user.id, email=user.email)
-        return user
     except IntegrityError:
         await db.rollback()
         raise UserAlreadyExistsException()
+    if user is None:
+        logger.warning("user_creation_duplicate_email", email=user_data.email)
+        raise UserAlreadyExistsException()
 
+    counts.invalidate(User.__table__)
+    logger.info("user_created", user_id=user["id"], email=user["email"])
+    return dict(user)
 
-async def update_user(db: AsyncSession, user_id: int, user_data: UserUpdate) -> User:
-    """Actualiza un usuario existente (Async)."""
-    user = await get_user_by_id(db, user_id)
-    if not user:
-        raise UserNotFoundException()
 
+async def update_user(db: AsyncSession, user_id: int, user_data: UserUpdate) -> dict:
+    """
+    Actualiza un usuario existente (Async).
+
+    Una sola sentencia: UPDATE ... RETURNING. Un cambio de contraseña
+    incrementa `token_epoch` en el mismo UPDATE, lo que cierra todas las
+    sesiones del usuario.
+
+    Returns:
+        Dict con la forma de UserResponse
+    """
     update_data = user_data.model_dump(exclude_unset=True)
 
-    if "password" in update_data:
+    password_changed = "password" in update_data
+    if password_changed:
         update_data["password"] = await async_get_password_hash(update_data["password"])
+        update_data["token_epoch"] = _users.c.token_epoch + 1
 
-    for field, value in update_data.items():
-        setattr(user, field, value)
+    if update_data:
+        stmt = update(_users).where(_users.c.id == user_id, ACTIVE_USER).values(**update_data)
+        stmt = stmt.returning(*USER_COLUMNS, _users.c.token_epoch)
+    else:
+        # Nada que cambiar: no tocar updated_at
+        stmt = select(*USER_COLUMNS, _users.c.token_epoch).where(_users.c.id == user_id, ACTIVE_USER)
 
-    await db.commit()
-    await db.refresh(user)
+    try:
+        row = (await db.execute(stmt)).mappings().one_or_none()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise UserAlreadyExistsException()
+    if row is None:
+        raise UserNotFoundException()
+
+    user = dict(row)
+    token_epoch = user.pop("token_epoch")
+    invalidate_user_row(user_id)
+    if password_changed:
+        await session_cache.bump_epoch(user_id, token_epoch)
     logger.info("user_updated", user_id=user_id)
     return user
 
 
 async def delete_user(db: AsyncSession, user_id: int) -> bool:
-    """Elimina un usuario (Async)."""
+    """
+    Da de baja un usuario (Async).
+
+    Con USER_SOFT_DELETE (default) es un único UPDATE que marca `deleted_at`
+    y sube `token_epoch`: el acceso se corta de inmediato y el usuario
+    desaparece de las lecturas, sin tocar sus sesiones dentro de la request.
+    `user_purge` borra después el usuario y sus sesiones en lotes. Sin
+    soft delete, la fila se borra en la request (ON DELETE CASCADE).
+    """
+    if settings.user_soft_delete:
+        result = await db.execute(
+            update(_users)
+            .where(_users.c.id == user_id, ACTIVE_USER)
+            .values(deleted_at=func.now(), token_epoch=_users.c.token_epoch + 1)
+            .returning(_users.c.token_epoch)
+        )
+        token_epoch = result.scalar_one_or_none()
+        await db.commit()
+        if token_epoch is None:
+            raise UserNotFoundException()
+        counts.invalidate(User.__table__)
+        invalidate_user_row(user_id)
+        await session_cache.bump_epoch(user_id, token_epoch)
+        logger.info("user_soft_deleted", user_id=user_id)
+        return True
+
     user = await get_user_by_id(db, user_id)
     if not user:
         raise UserNotFoundException()
 
     await db.delete(user)
     await db.commit()
+    counts.invalidate(User.__table__)
+    invalidate_user_row(user_id)
+    await get_session_store().delete_for_user(db, user_id)
+    await session_cache.invalidate_user(user_id)
     logger.info("user_deleted", user_id=user_id)
     return True
 
 
 async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
-    """Autentica un usuario (Async). Usa thread pool para bcrypt."""
-    user = await get_user_by_email(db, email)
+    """
+    Autentica un usuario (Async).
+
+    Todos los caminos (éxito, contraseña incorrecta, email inexistente) cuestan
+    exactamente una verificación bcrypt en el executor de hashing.
+    """
+    # Sin relaciones (ni el JOIN del rol): el camino "usuario existe" cuesta una sola query
+    result = await db.execute(
+        select(User).options(raiseload("*")).filter(User.email == email, ACTIVE_USER)
+    )
+    user = result.scalar_one_or_none()
     if not user:
-        # Timing attack mitigation: hash+verify dummy en thread pool
-        dummy_hash = await async_get_password_hash("dummy_password")
-        await async_verify_password("dummy_password", dummy_hash)
+        # Timing attack mitigation: una sola verificación contra un hash señuelo
+        await async_verify_dummy_password(password)
         logger.warning("auth_failed_user_not_found", email=email)
         return None
     if not await async_verify_password(password, user.password):
         logger.warning("auth_failed_wrong_password", user_id=user.id)
         return None
     logger.info("auth_success", user_id=user.id)
+    if needs_rehash(user.password):
+        schedule_password_rehash(user.id, password, user.password)
     return user
 
 
+async def rehash_password(
+    user_id: int, password: str, old_hash: str, session_factory=None
+) -> bool:
+    """
+    Re-hashea la contraseña con el hasher actual (Async).
+
+    Usa su propia sesión de BD y solo escribe si el hash no cambió mientras
+    tanto (por ejemplo, por un cambio de contraseña concurrente).
+    """
+    try:
+        new_hash = await async_get_password_hash(password)
+    except Exception as e:
+        logger.warning("password_rehash_skipped", user_id=user_id, error=str(e))
+        return False
+
+    async with (session_factory or AsyncSessionLocal)() as db:
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id, User.password == old_hash)
+            .values(password=new_hash)
+        )
+        await db.commit()
+    updated = result.rowcount == 1
+    if updated:
+        logger.info("password_rehashed", user_id=user_id)
+    return updated
+
+
+def schedule_password_rehash(user_id: int, password: str, old_hash: str) -> None:
+    """Programa el re-hash en segundo plano, sin demorar la respuesta del login."""
+    task = asyncio.create_task(rehash_password(user_id, password, old_hash))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
 async def get_user_sessions(
     db: AsyncSession, user_id: int, active_only: bool = True
-) -> List[SessionModel]:
-    """Obtiene las sesiones de un usuario."""
-    query = select(SessionModel).filter(SessionModel.user_id == user_id)
+) -> List[SessionRecord]:
+    """Obtiene las sesiones de un usuario (solo las del epoch vigente si `active_only`)."""
+    sessions = await get_session_store().list_for_user(
+        db, user_id, datetime.now(timezone.utc), active_only=active_only
+    )
     if active_only:
-        query = query.filter(SessionModel.is_revoked == False)
-    result = await db.execute(query)
-    return result.scalars().all()
+        epoch = await current_token_epoch(db, user_id)
+        sessions = [s for s in sessions if s.token_epoch == epoch]
+    return sessions
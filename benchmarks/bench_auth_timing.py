@@ -0,0 +1,104 @@
+"""
+Benchmark de timing del login.
+
+Mide `user_service.authenticate_user` en los tres caminos (éxito, contraseña
+incorrecta, email inexistente) y compara las distribuciones de a pares con el
+test de Kolmogorov-Smirnov de dos muestras. Con p-valores altos no hay
+evidencia de que un atacante pueda distinguir los caminos por tiempo.
+
+Uso:
+    python -m benchmarks.bench_auth_timing --samples 200 --rounds 10
+"""
+import argparse
+import asyncio
+import math
+import statistics
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.database import Base
+from app.core.hashing import configure_hasher
+from app.core.security import get_password_hash
+from app.models.user import User
+from app.services import user_service
+
+EMAIL = "bench@example.com"
+PASSWORD = "BenchPass123!@#"
+
+
+def ks_two_sample(a: list[float], b: list[float]) -> tuple[float, float]:
+    """Estadístico D de Kolmogorov-Smirnov y p-valor asintótico."""
+    a, b = sorted(a), sorted(b)
+    n, m = len(a), len(b)
+    i = j = 0
+    d = 0.0
+    while i < n and j < m:
+        x = min(a[i], b[j])
+        while i < n and a[i] <= x:
+            i += 1
+        while j < m and b[j] <= x:
+            j += 1
+        d = max(d, abs(i / n - j / m))
+    en = math.sqrt(n * m / (n + m))
+    lam = (en + 0.12 + 0.11 / en) * d
+    p = 2 * sum((-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam) for k in range(1, 101))
+    return d, min(max(p, 0.0), 1.0)
+
+
+async def main(samples: int) -> None:
+    # El hasher se construye al importar: reconstruirlo con los settings actuales
+    # (--rounds); también regenera el hash señuelo con ese coste
+    hasher = configure_hasher()
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:", poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_factory() as db:
+        db.add(User(email=EMAIL, password=get_password_hash(PASSWORD), name="Bench", lastname="User"))
+        await db.commit()
+
+    cases = {
+        "success": (EMAIL, PASSWORD),
+        "wrong_password": (EMAIL, "WrongPass123!@#"),
+        "unknown_user": ("nobody@example.com", PASSWORD),
+    }
+    timings: dict[str, list[float]] = {name: [] for name in cases}
+
+    async with session_factory() as db:
+        # Intercalar los casos para que el ruido del sistema afecte a todos por igual
+        for _ in range(samples):
+            for name, (email, password) in cases.items():
+                start = time.perf_counter()
+                await user_service.authenticate_user(db, email, password)
+                timings[name].append(time.perf_counter() - start)
+    await engine.dispose()
+
+    print(f"hasher={hasher!r} samples={samples}")
+    for name, values in timings.items():
+        print(
+            f"{name:>15}: median={statistics.median(values) * 1000:.2f}ms "
+            f"stdev={statistics.stdev(values) * 1000:.2f}ms"
+        )
+    names = list(cases)
+    for x in range(len(names)):
+        for y in range(x + 1, len(names)):
+            d, p = ks_two_sample(timings[names[x]], timings[names[y]])
+            print(f"KS {names[x]} vs {names[y]}: D={d:.3f} p={p:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=None, help="Sobrescribe BCRYPT_ROUNDS")
+    args = parser.parse_args()
+    if args.rounds:
+        settings.bcrypt_rounds = args.rounds
+        settings.hash_time_budget_ms = 0
+    asyncio.run(main(args.samples))
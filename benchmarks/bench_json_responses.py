@@ -0,0 +1,101 @@
+"""
+Benchmark por endpoint de FAST_JSON_RESPONSES.
+
+Levanta la app en proceso (httpx + ASGITransport) sobre una base con
+`--users` usuarios y mide el tiempo de CPU por request de cada endpoint con
+el camino estándar de FastAPI (validar contra `response_model` + `json`) y
+con el modo rápido (orjson, sin revalidar las proyecciones).
+
+La autenticación se reemplaza por un `Principal` fijo para medir solo el
+endpoint; sin rate limiting.
+
+Uso (por defecto SQLite en memoria; --database-url para PostgreSQL):
+    python -m benchmarks.bench_json_responses --users 1000 --iterations 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.deps import Principal, get_current_principal, get_db
+from app.core.config import settings
+from app.core.database import Base
+from app.main import app
+from app.models.role import Role
+from app.models.user import User
+
+ENDPOINTS = [
+    "/api/v1/users?per_page=1000&count=exact",
+    "/api/v1/users?per_page=1000&cursor=",
+    "/api/v1/users?per_page=100&cursor=",
+    "/api/v1/users/1",
+    "/api/v1/me",
+]
+
+
+async def _time(client: AsyncClient, url: str, iterations: int) -> tuple[float, int]:
+    await client.get(url)  # calentamiento
+    timings = []
+    for _ in range(iterations):
+        start = time.process_time()
+        response = await client.get(url)
+        timings.append((time.process_time() - start) * 1000)
+    response.raise_for_status()
+    return statistics.median(timings), len(response.content)
+
+
+async def run(database_url: str, users: int, iterations: int) -> None:
+    engine = create_async_engine(database_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        role_id = (await conn.execute(insert(Role).values(name="editor").returning(Role.id))).scalar()
+        await conn.execute(insert(User), [
+            {
+                "email": f"bench{i}@example.com", "password": "x", "name": "Bench",
+                "lastname": f"User{i}", "role_id": role_id if i % 2 else None,
+            }
+            for i in range(users)
+        ])
+
+    async def bench_db():
+        async with session_factory() as db:
+            yield db
+
+    principal = Principal(
+        id=1, email="bench0@example.com", name="Bench", lastname="User0",
+        role=None, permissions=frozenset(),
+    )
+    app.dependency_overrides[get_db] = bench_db
+    app.dependency_overrides[get_current_principal] = lambda: principal
+    app.state.limiter.enabled = False
+
+    print(f"database={engine.dialect.name} users={users} iterations={iterations} (CPU ms p50 por request)")
+    print(f"{'endpoint':<42} {'standard':>9} {'fast':>9} {'speedup':>8} {'bytes':>8}")
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            for url in ENDPOINTS:
+                settings.fast_json_responses = False
+                standard, size = await _time(client, url, iterations)
+                settings.fast_json_responses = True
+                fast, _ = await _time(client, url, iterations)
+                print(f"{url:<42} {standard:>9.2f} {fast:>9.2f} {standard / fast:>7.1f}x {size:>8}")
+    finally:
+        app.dependency_overrides.clear()
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///:memory:")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.database_url, args.users, args.iterations))
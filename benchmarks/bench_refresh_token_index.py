@@ -0,0 +1,113 @@
+"""
+Benchmark del índice de refresh tokens (PostgreSQL).
+
+Crea dos tablas UNLOGGED con N filas, una con el token en claro
+(`varchar(100)`, 64 caracteres url-safe) y otra con su SHA-256 (`bytea`, 32
+bytes), ambas con índice único. Reporta el tamaño de cada índice y la latencia
+de búsqueda por token (el digest se calcula en Python, como en la app).
+
+Uso (requiere DATABASE_URL apuntando a PostgreSQL):
+    python -m benchmarks.bench_refresh_token_index --rows 10000000 --lookups 5000
+"""
+import argparse
+import asyncio
+import hashlib
+import statistics
+import time
+
+import asyncpg
+
+from app.core.config import settings
+
+SETUP = [
+    "DROP TABLE IF EXISTS bench_tokens_text",
+    "DROP TABLE IF EXISTS bench_tokens_digest",
+    "CREATE UNLOGGED TABLE bench_tokens_text (id bigserial PRIMARY KEY, refresh_token varchar(100) NOT NULL)",
+    # 48 bytes pseudoaleatorios -> 64 caracteres base64 url-safe, como secrets.token_urlsafe(48)
+    """
+    INSERT INTO bench_tokens_text (refresh_token)
+    SELECT translate(
+        encode(sha256(i::text::bytea) || substring(sha256((-i)::text::bytea) FROM 1 FOR 16), 'base64'),
+        '+/', '-_'
+    )
+    FROM generate_series(1, $1::bigint) AS i
+    """,
+    "CREATE UNIQUE INDEX bench_ix_text ON bench_tokens_text (refresh_token)",
+    """
+    CREATE UNLOGGED TABLE bench_tokens_digest AS
+    SELECT id, sha256(convert_to(refresh_token, 'UTF8')) AS refresh_token_hash FROM bench_tokens_text
+    """,
+    "CREATE UNIQUE INDEX bench_ix_digest ON bench_tokens_digest (refresh_token_hash)",
+    "ANALYZE bench_tokens_text",
+    "ANALYZE bench_tokens_digest",
+]
+
+
+def _dsn() -> str:
+    return settings.database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+async def _time_lookups(conn, query: str, tokens: list[str], to_param=lambda t: t) -> list[float]:
+    statement = await conn.prepare(query)
+    timings = []
+    for token in tokens:
+        start = time.perf_counter()
+        await statement.fetchval(to_param(token))
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _report(name: str, size: int, timings: list[float]) -> None:
+    timings.sort()
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(
+        f"{name:>7}: index={size / 1024 / 1024:,.1f} MiB "
+        f"p50={statistics.median(timings):.3f}ms p99={p99:.3f}ms"
+    )
+
+
+async def main(rows: int, lookups: int, keep: bool) -> None:
+    conn = await asyncpg.connect(_dsn())
+    try:
+        print(f"Cargando {rows:,} filas...")
+        for statement in SETUP:
+            if "$1" in statement:
+                await conn.execute(statement, rows)
+            else:
+                await conn.execute(statement)
+
+        tokens = [
+            r["refresh_token"] for r in await conn.fetch(
+                "SELECT refresh_token FROM bench_tokens_text TABLESAMPLE SYSTEM (1) LIMIT $1", lookups
+            )
+        ]
+        text_size = await conn.fetchval("SELECT pg_relation_size('bench_ix_text')")
+        digest_size = await conn.fetchval("SELECT pg_relation_size('bench_ix_digest')")
+
+        text_timings = await _time_lookups(
+            conn, "SELECT id FROM bench_tokens_text WHERE refresh_token = $1", tokens
+        )
+        digest_timings = await _time_lookups(
+            conn,
+            "SELECT id FROM bench_tokens_digest WHERE refresh_token_hash = $1",
+            tokens,
+            lambda token: hashlib.sha256(token.encode("utf-8")).digest(),
+        )
+
+        print(f"rows={rows:,} lookups={len(tokens):,}")
+        _report("text", text_size, text_timings)
+        _report("sha256", digest_size, digest_timings)
+    finally:
+        if not keep:
+            await conn.execute("DROP TABLE IF EXISTS bench_tokens_text")
+            await conn.execute("DROP TABLE IF EXISTS bench_tokens_digest")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--keep", action="store_true", help="No borrar las tablas al terminar")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.lookups, args.keep))
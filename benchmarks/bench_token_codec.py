@@ -0,0 +1,38 @@
+"""
+Micro-benchmark de codecs de access tokens.
+
+Compara `JoseTokenCodec` (python-jose) con `FastHMACCodec` en throughput de
+encode/decode y tamaño del token. Sin caché: mide el costo real de cada
+operación.
+
+Uso:
+    python -m benchmarks.bench_token_codec --iterations 20000
+"""
+import argparse
+import time
+import timeit
+
+from app.core.config import settings
+from app.core.security import FastHMACCodec, JoseTokenCodec
+
+
+def run(iterations: int) -> None:
+    claims = {"user_id": 123456, "session_id": 987654, "exp": int(time.time()) + 900}
+    codecs = [JoseTokenCodec(), FastHMACCodec(settings.secret_key, settings.algorithm)]
+
+    print(f"algorithm={settings.algorithm} iterations={iterations}")
+    print(f"{'codec':>6} {'encode ops/s':>14} {'decode ops/s':>14} {'bytes':>6}")
+    for codec in codecs:
+        token = codec.encode(claims)
+        encode = timeit.timeit(lambda: codec.encode(claims), number=iterations)
+        decode = timeit.timeit(lambda: codec.decode(token), number=iterations)
+        print(
+            f"{codec.name:>6} {iterations / encode:>14,.0f} "
+            f"{iterations / decode:>14,.0f} {len(token):>6}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    run(parser.parse_args().iterations)
@@ -0,0 +1,111 @@
+"""
+Benchmark de throughput de la importación masiva de usuarios.
+
+Compara filas/segundo (tiempo de reloj) de:
+
+- one_by_one: `user_service.create_user` por fila, lo que hace POST /users
+  (hash en el pool de login, SELECT, INSERT y commit por usuario)
+- import_plain: `user_import.import_users` con contraseñas en claro (hash
+  repartido en el pool de importación)
+- import_prehashed: `user_import.import_users` con `password_hash` bcrypt
+  (solo parseo, validación e INSERT por lotes; COPY en PostgreSQL)
+
+bcrypt usa `--rounds` (default 4) para que el benchmark termine rápido; con
+el coste de producción el hashing domina y la ganancia de `import_plain` es
+~número de workers.
+
+Uso (por defecto SQLite en memoria; --database-url para PostgreSQL):
+    python -m benchmarks.bench_user_import --rows 10000 --baseline-rows 500
+"""
+import argparse
+import asyncio
+import time
+
+import orjson
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core import hashing
+from app.core.config import settings
+from app.core.database import Base
+from app.core.security import get_password_hash
+from app.models.user import User
+from app.schemas.user import UserCreate
+from app.services import user_import, user_service
+
+PASSWORD = "Bench123!@#xyz"
+
+
+async def _chunks(body: bytes, size: int = 64 * 1024):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def _body(rows: int, password_hash: str | None) -> bytes:
+    secret = {"password_hash": password_hash} if password_hash else {"password": PASSWORD}
+    return b"".join(
+        orjson.dumps({"email": f"bench{i}@example.com", "name": "Bench", "lastname": f"User{i}", **secret}) + b"\n"
+        for i in range(rows)
+    )
+
+
+async def _one_by_one(session_factory, rows: int) -> None:
+    async with session_factory() as db:
+        for i in range(rows):
+            await user_service.create_user(db, UserCreate(
+                email=f"bench{i}@example.com", name="Bench", lastname=f"User{i}", password=PASSWORD
+            ))
+
+
+async def _import(session_factory, body: bytes, batch_size: int) -> None:
+    async with session_factory() as db:
+        report = await user_import.import_users(db, _chunks(body), "ndjson", batch_size=batch_size)
+    assert report.invalid == 0 and report.duplicates == 0, report
+
+
+async def run(database_url: str, rows: int, baseline_rows: int, batch_size: int, rounds: int) -> None:
+    settings.bcrypt_rounds = rounds
+    hashing.configure_hasher()
+    engine = create_async_engine(database_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    cases = [
+        ("one_by_one", baseline_rows, lambda: _one_by_one(session_factory, baseline_rows)),
+        ("import_plain", rows, lambda: _import(session_factory, _body(rows, None), batch_size)),
+        ("import_prehashed", rows, lambda: _import(
+            session_factory, _body(rows, get_password_hash(PASSWORD)), batch_size
+        )),
+    ]
+    print(
+        f"database={engine.dialect.name} bcrypt_rounds={rounds} batch_size={batch_size} "
+        f"import_workers={hashing.import_hashing_executor.workers} ({hashing.import_hashing_executor.kind})"
+    )
+    print(f"{'case':>18} {'rows':>8} {'seconds':>9} {'rows/s':>10}")
+    try:
+        for name, count, case in cases:
+            start = time.perf_counter()
+            await case()
+            elapsed = time.perf_counter() - start
+            print(f"{name:>18} {count:>8} {elapsed:>9.2f} {count / elapsed:>10.0f}")
+            async with engine.begin() as conn:
+                await conn.execute(delete(User))
+    finally:
+        hashing.hashing_executor.shutdown()
+        hashing.import_hashing_executor.shutdown()
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///:memory:")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--baseline-rows", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(run(args.database_url, args.rows, args.baseline_rows, args.batch_size, args.rounds))
@@ -0,0 +1,118 @@
+"""
+Benchmark del listado de usuarios: ORM vs proyección.
+
+Para una página de `--per-page` usuarios (la mitad con rol) mide el tiempo de
+CPU y el pico de memoria de dos fases, como las recorre el endpoint:
+
+- build: consulta y materialización de la página
+    - orm: `select(User)` + `UserResponse.from_user` por fila + `PaginatedResponse`
+    - projection: `user_queries.list_user_rows` (filas Core -> dicts)
+- serialize: validación contra `response_model` y volcado a tipos JSON, lo
+  que FastAPI hace con el valor devuelto. En `orm` las filas ya se validaron
+  en `from_user`; en `projection` se validan acá por única vez.
+
+Sin red ni HTTP.
+
+Uso (por defecto SQLite en memoria; --database-url para PostgreSQL):
+    python -m benchmarks.bench_user_listing --per-page 1000 --iterations 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.models.role import Role
+from app.models.user import User
+from app.schemas.pagination import PaginatedResponse
+from app.schemas.user import UserResponse
+from app.services import user_queries, user_service
+
+_adapter = TypeAdapter(PaginatedResponse[UserResponse])
+
+
+def _serialize(payload) -> dict:
+    return _adapter.dump_python(_adapter.validate_python(payload, from_attributes=True), mode="json")
+
+
+async def _orm_page(db, per_page: int):
+    users = await user_service.get_users(db, limit=per_page)
+    page = PaginatedResponse(
+        items=[UserResponse.from_user(u) for u in users],
+        total=len(users), page=1, per_page=per_page, total_pages=1,
+    )
+    db.expunge_all()
+    return page
+
+
+async def _projection_page(db, per_page: int):
+    users = await user_queries.list_user_rows(db, limit=per_page)
+    return {"items": users, "total": len(users), "page": 1, "per_page": per_page, "total_pages": 1}
+
+
+def _p50_p99(values: list[float]) -> tuple[float, float]:
+    p99 = statistics.quantiles(values, n=100)[98] if len(values) > 1 else values[0]
+    return statistics.median(values), p99
+
+
+async def _measure(session_factory, build, per_page: int, iterations: int) -> dict:
+    build_ms, serialize_ms = [], []
+    async with session_factory() as db:
+        _serialize(await build(db, per_page))  # calentamiento
+        for _ in range(iterations):
+            start = time.process_time()
+            payload = await build(db, per_page)
+            built = time.process_time()
+            _serialize(payload)
+            build_ms.append((built - start) * 1000)
+            serialize_ms.append((time.process_time() - built) * 1000)
+
+        tracemalloc.start()
+        payload = await build(db, per_page)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"build": _p50_p99(build_ms), "serialize": _p50_p99(serialize_ms), "peak": peak}
+
+
+async def run(database_url: str, per_page: int, iterations: int) -> None:
+    engine = create_async_engine(database_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        role_id = (await conn.execute(insert(Role).values(name="editor").returning(Role.id))).scalar()
+        await conn.execute(insert(User), [
+            {
+                "email": f"bench{i}@example.com", "password": "x", "name": "Bench",
+                "lastname": f"User{i}", "role_id": role_id if i % 2 else None,
+            }
+            for i in range(per_page)
+        ])
+
+    print(f"database={engine.dialect.name} per_page={per_page} iterations={iterations} (CPU ms p50/p99)")
+    print(f"{'path':>10} {'build':>15} {'serialize':>15} {'build peak KiB':>15}")
+    try:
+        for name, build in (("orm", _orm_page), ("projection", _projection_page)):
+            result = await _measure(session_factory, build, per_page, iterations)
+            print(
+                f"{name:>10} {'%.1f / %.1f' % result['build']:>15} "
+                f"{'%.1f / %.1f' % result['serialize']:>15} {result['peak'] / 1024:>15.0f}"
+            )
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///:memory:")
+    parser.add_argument("--per-page", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.database_url, args.per_page, args.iterations))
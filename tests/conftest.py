@@ -2,6 +2,7 @@
 Fixtures de prueba asíncronas para la API de recetario.
 """
 import asyncio
+from collections import Counter
 import pytest
 import pytest_asyncio
 from typing import AsyncGenerator, Dict
@@ -14,8 +15,10 @@ from sqlalchemy import event
 from app.main import app
 from app.core.database import Base
 from app.api.deps import get_db
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash, clear_token_cache
+from app.core import counts, session_activity, session_cache
 from app.models.user import User
+from app.services import user_service
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.inmemory import InMemoryBackend
 
@@ -55,6 +58,12 @@ async def setup_database():
     """Crea y elimina tablas para cada test (Async)."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # Las cachés en proceso no deben sobrevivir entre tests (los IDs se reutilizan)
+    clear_token_cache()
+    session_cache.clear()
+    session_activity.clear()
+    counts.clear()
+    user_service.clear_user_rows()
     yield
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
@@ -79,6 +88,46 @@ async def db() -> AsyncGenerator:
             await db.close()
 
 
+class QueryCounter:
+    """Registra las sentencias SQL ejecutadas y las filas ORM cargadas por modelo."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+        self.loaded: Counter[str] = Counter()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def on_load(self, instance, context) -> None:
+        self.loaded[type(instance).__name__] += 1
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self.loaded.clear()
+
+
+@pytest.fixture
+def local_session_cache(monkeypatch):
+    """Activa la caché de validez de sesiones sin Redis (un único proceso)."""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "session_cache_local_only", True)
+
+
+@pytest.fixture
+def query_counter():
+    """Cuenta las queries ejecutadas y las instancias ORM cargadas durante el test."""
+    counter = QueryCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    event.listen(Base, "load", counter.on_load, propagate=True)
+    yield counter
+    event.remove(Base, "load", counter.on_load)
+    event.remove(engine.sync_engine, "before_cursor_execute", counter)
+
+
 @pytest_asyncio.fixture(scope="function")
 async def client() -> AsyncGenerator:
     """Crea un cliente HTTP asíncrono."""
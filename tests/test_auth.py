@@ -99,3 +99,415 @@ class TestAuth:
             json={"refresh_token": tokens["refresh_token"]}
         )
         assert refresh_res.status_code == 401
+
+
+@pytest.mark.asyncio
+class TestConstantCostAuthentication:
+    """Cada camino de login cuesta exactamente una verificación bcrypt."""
+
+    @pytest.fixture
+    def hash_ops(self, monkeypatch):
+        from app.core.hashing import hashing_executor
+
+        ops = []
+        original = hashing_executor.run
+
+        async def counting_run(operation, fn, *args):
+            ops.append(operation)
+            return await original(operation, fn, *args)
+
+        monkeypatch.setattr(hashing_executor, "run", counting_run)
+        return ops
+
+    async def test_unknown_user_single_verify(self, db: AsyncSession, hash_ops):
+        """Email inexistente: una verificación contra el hash señuelo."""
+        from app.services.user_service import authenticate_user
+
+        assert await authenticate_user(db, "nobody@example.com", "Whatever123!@#") is None
+        assert hash_ops == ["verify"]
+
+    async def test_dummy_hash_follows_reconfigured_cost(
+        self, db: AsyncSession, monkeypatch, hash_ops
+    ):
+        """Tras reconfigurar el hasher el señuelo usa el nuevo coste, sin hashear en el login."""
+        from app.core import hashing
+        from app.core.config import settings
+        from app.services.user_service import authenticate_user
+
+        verified, hashed = [], []
+        original_verify, original_hash = hashing.BcryptHasher.verify, hashing.BcryptHasher.hash
+
+        def spy_verify(self, password, stored):
+            verified.append(stored)
+            return original_verify(self, password, stored)
+
+        def spy_hash(self, password):
+            hashed.append(self.rounds)
+            return original_hash(self, password)
+
+        monkeypatch.setattr(hashing.BcryptHasher, "verify", spy_verify)
+        monkeypatch.setattr(hashing.BcryptHasher, "hash", spy_hash)
+        monkeypatch.setattr(hashing, "_current_hasher", hashing.get_hasher())
+        monkeypatch.setattr(hashing, "_dummies", dict(hashing._dummies))
+        monkeypatch.setattr(settings, "bcrypt_rounds", 5)
+        hashing.configure_hasher()
+        assert hashing.get_dummy_hash().startswith("$2b$05$")
+        hashed.clear()
+
+        assert await authenticate_user(db, "nobody@example.com", "Whatever123!@#") is None
+        assert verified[0].startswith("$2b$05$")
+        assert hash_ops == ["verify"]
+        assert hashed == []
+
+    async def test_dummy_hashes_precomputed_per_configured_hasher(self, monkeypatch):
+        """configure_hasher precalcula un señuelo por algoritmo y coste configurados."""
+        from app.core import hashing
+        from app.core.config import settings
+
+        monkeypatch.setattr(hashing, "_current_hasher", hashing.get_hasher())
+        monkeypatch.setattr(hashing, "_dummies", {})
+        monkeypatch.setattr(settings, "bcrypt_rounds", 4)
+        monkeypatch.setattr(settings, "argon2_time_cost", 1)
+        monkeypatch.setattr(settings, "argon2_memory_cost", 8)
+        monkeypatch.setattr(settings, "hash_time_budget_ms", 0)
+        hashing.configure_hasher()
+
+        assert hashing.get_dummy_hash(hashing.BcryptHasher(4)).startswith("$2b$04$")
+        assert hashing.get_dummy_hash(hashing.Argon2Hasher(1, 8, 1)).startswith("$argon2id$")
+        assert hashing.get_dummy_hash() == hashing.get_dummy_hash(hashing.BcryptHasher(4))
+
+    async def test_wrong_password_single_verify(self, db: AsyncSession, test_user, hash_ops):
+        """Contraseña incorrecta: una verificación."""
+        from app.services.user_service import authenticate_user
+
+        assert await authenticate_user(db, test_user.email, "WrongPass123!@#") is None
+        assert hash_ops == ["verify"]
+
+    async def test_success_single_verify(self, db: AsyncSession, test_user, hash_ops):
+        """Login correcto: una verificación."""
+        from app.services.user_service import authenticate_user
+
+        assert await authenticate_user(db, test_user.email, "TestPass123!@#") is not None
+        assert hash_ops == ["verify"]
+
+    async def test_password_longer_than_72_bytes(self, client: AsyncClient, test_user):
+        """Contraseñas de más de 72 bytes no provocan error de bcrypt."""
+        response = await client.post(
+            "/api/v1/auth/token",
+            data={"username": "test@example.com", "password": "A1!" + "x" * 100}
+        )
+        assert response.status_code == 401
+
+
+class TestPasswordHashers:
+    """Tests del registro de hashers y el re-hash transparente."""
+
+    def test_bcrypt_needs_rehash_on_cost_change(self):
+        """Un hash con otro factor de coste requiere re-hash."""
+        from app.core.hashing import BcryptHasher
+
+        old = BcryptHasher(4).hash("Secret123!@#")
+        assert BcryptHasher(4).needs_rehash(old) is False
+        assert BcryptHasher(5).needs_rehash(old) is True
+
+    def test_neighbouring_cost_within_tolerance(self, monkeypatch):
+        """Un hash a un paso del coste vigente no se re-hashea (workers calibrados distinto)."""
+        from app.core import hashing
+        from app.core.config import settings
+
+        hashed = hashing.BcryptHasher(5).hash("Secret123!@#")
+        assert hashing.BcryptHasher(4).needs_rehash(hashed, tolerance=1) is False
+        assert hashing.BcryptHasher(6).needs_rehash(hashed, tolerance=1) is False
+        assert hashing.BcryptHasher(7).needs_rehash(hashed, tolerance=1) is True
+
+        monkeypatch.setattr(hashing, "_current_hasher", hashing.BcryptHasher(6))
+        monkeypatch.setattr(settings, "hash_rehash_tolerance", 1)
+        assert hashing.needs_rehash(hashed) is False
+        monkeypatch.setattr(settings, "hash_rehash_tolerance", 0)
+        assert hashing.needs_rehash(hashed) is True
+
+    def test_argon2_time_cost_tolerance(self):
+        """argon2id tolera time_cost vecino pero no otra memoria."""
+        pytest.importorskip("argon2")
+        from app.core.hashing import Argon2Hasher
+
+        hashed = Argon2Hasher(time_cost=2, memory_cost=1024).hash("Secret123!@#")
+        assert Argon2Hasher(time_cost=3, memory_cost=1024).needs_rehash(hashed, tolerance=1) is False
+        assert Argon2Hasher(time_cost=3, memory_cost=1024).needs_rehash(hashed) is True
+        assert Argon2Hasher(time_cost=2, memory_cost=2048).needs_rehash(hashed, tolerance=1) is True
+
+    def test_argon2_roundtrip(self):
+        """argon2id genera y verifica hashes."""
+        pytest.importorskip("argon2")
+        from app.core.hashing import Argon2Hasher
+
+        hasher = Argon2Hasher(time_cost=1, memory_cost=1024)
+        hashed = hasher.hash("Secret123!@#")
+        assert hasher.identify(hashed) is True
+        assert hasher.verify("Secret123!@#", hashed) is True
+        assert hasher.verify("Wrong123!@#", hashed) is False
+
+    def test_verify_detects_algorithm(self):
+        """verify_password acepta hashes de cualquier algoritmo registrado."""
+        pytest.importorskip("argon2")
+        from app.core.hashing import Argon2Hasher
+        from app.core.security import verify_password
+
+        hashed = Argon2Hasher(time_cost=1, memory_cost=1024).hash("Secret123!@#")
+        assert verify_password("Secret123!@#", hashed) is True
+
+    def test_calibration_respects_budget(self):
+        """La calibración de bcrypt no baja del mínimo ni excede el máximo."""
+        from app.core.hashing import BcryptHasher
+
+        assert BcryptHasher().calibrate(1).rounds == BcryptHasher.MIN_ROUNDS
+        assert BcryptHasher().calibrate(10 ** 9).rounds == BcryptHasher.MAX_ROUNDS
+
+    def test_calibrate_once_for_the_environment(self, monkeypatch):
+        """calibrate_hasher devuelve parámetros listos para fijar en el entorno."""
+        from app.core import hashing
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "password_hasher", "bcrypt")
+        hasher = hashing.calibrate_hasher(1, samples=3)
+        assert hasher.as_settings() == {
+            "password_hasher": "bcrypt", "bcrypt_rounds": hashing.BcryptHasher.MIN_ROUNDS,
+        }
+
+    async def test_login_rehashes_outdated_hash(self, client: AsyncClient, db: AsyncSession, monkeypatch):
+        """Tras un login correcto, un hash desactualizado se re-hashea en segundo plano."""
+        import asyncio
+        from app.core.hashing import BcryptHasher
+        from app.models.user import User
+        from app.services import user_service
+        from tests.conftest import TestingSessionLocal
+
+        monkeypatch.setattr(user_service, "AsyncSessionLocal", TestingSessionLocal)
+        old_hash = BcryptHasher(4).hash("TestPass123!@#")
+        user = User(email="old@example.com", password=old_hash, name="Old", lastname="Hash")
+        db.add(user)
+        await db.commit()
+
+        response = await client.post(
+            "/api/v1/auth/token",
+            data={"username": "old@example.com", "password": "TestPass123!@#"}
+        )
+        assert response.status_code == 200
+        await asyncio.gather(*user_service._background_tasks)
+
+        await db.refresh(user)
+        assert user.password != old_hash
+        assert BcryptHasher(4).needs_rehash(user.password) is True
+        assert user_service.verify_password("TestPass123!@#", user.password) is True
+
+
+class TestAsymmetricTokens:
+    """Tests de firma asimétrica con kid y JWKS."""
+
+    @staticmethod
+    def _write_rsa_key(path) -> str:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        path.write_bytes(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ))
+        public = path.with_suffix(".pub")
+        public.write_bytes(key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        ))
+        return str(public)
+
+    @pytest.fixture
+    def rsa_settings(self, tmp_path, monkeypatch):
+        from app.core import keys
+        from app.core.config import settings
+
+        self._write_rsa_key(tmp_path / "active.pem")
+        monkeypatch.setattr(settings, "algorithm", "RS256")
+        monkeypatch.setattr(settings, "jwt_private_key_path", str(tmp_path / "active.pem"))
+        keys.reset_key_ring()
+        yield tmp_path
+        keys.reset_key_ring()
+
+    @pytest.mark.parametrize("algorithm", ["PS256", "EdDSA", "none"])
+    def test_unsupported_algorithm_rejected_at_config(self, algorithm):
+        """Los algoritmos que python-jose no firma se rechazan al cargar la configuración."""
+        from pydantic import ValidationError
+        from app.core.config import Settings
+
+        with pytest.raises(ValidationError, match="Algoritmo JWT no soportado"):
+            Settings(algorithm=algorithm)
+
+    def test_token_has_kid_and_verifies(self, rsa_settings):
+        """El token lleva el kid de la clave activa y se verifica localmente."""
+        from jose import jwt
+        from app.core import keys
+        from app.core.security import decode_token
+
+        token = create_access_token({"user_id": 1, "session_id": 2})
+        header = jwt.get_unverified_header(token)
+
+        assert header["alg"] == "RS256"
+        assert header["kid"] == keys.get_key_ring().signing_kid
+        assert decode_token(token)["user_id"] == 1
+
+    def test_unknown_kid_rejected(self, rsa_settings, monkeypatch):
+        """Un token firmado con una clave ya no aceptada es rechazado."""
+        from app.core import keys
+        from app.core.config import settings
+        from app.core.security import decode_token
+
+        token = create_access_token({"user_id": 1})
+        assert decode_token(token)["user_id"] == 1
+        self._write_rsa_key(rsa_settings / "new.pem")
+        monkeypatch.setattr(settings, "jwt_private_key_path", str(rsa_settings / "new.pem"))
+        keys.reset_key_ring()
+
+        # El payload ya cacheado no sobrevive a la recarga de claves
+        assert decode_token(token) is None
+
+    def test_rotation_keeps_previous_key(self, rsa_settings, monkeypatch):
+        """Tras rotar, los tokens firmados con la clave anterior siguen siendo válidos."""
+        from app.core import keys
+        from app.core.config import settings
+        from app.core.security import decode_token
+
+        token = create_access_token({"user_id": 1})
+        self._write_rsa_key(rsa_settings / "new.pem")
+        monkeypatch.setattr(settings, "jwt_private_key_path", str(rsa_settings / "new.pem"))
+        monkeypatch.setattr(settings, "jwt_public_key_paths", str(rsa_settings / "active.pub"))
+        keys.reset_key_ring()
+
+        assert decode_token(token)["user_id"] == 1
+        assert len(keys.get_key_ring().jwks()["keys"]) == 2
+
+    async def test_jwks_endpoint(self, client: AsyncClient, rsa_settings):
+        """/.well-known/jwks.json publica la clave pública con su kid."""
+        from app.core import keys
+
+        response = await client.get("/.well-known/jwks.json")
+        assert response.status_code == 200
+        assert "max-age" in response.headers["cache-control"]
+        jwk = response.json()["keys"][0]
+        assert jwk["kid"] == keys.get_key_ring().signing_kid
+        assert jwk["kty"] == "RSA"
+        assert "d" not in jwk
+
+    async def test_jwks_empty_for_hmac(self, client: AsyncClient):
+        """Con HS256 no se publica ninguna clave."""
+        response = await client.get("/.well-known/jwks.json")
+        assert response.json() == {"keys": []}
+
+
+class TestTokenCodecs:
+    """Tests del codec HMAC optimizado."""
+
+    SECRET = "k" * 40
+
+    def test_fast_roundtrip_with_compact_claims(self):
+        """Los claims se compactan en el token y se expanden al decodificar."""
+        import time
+        from jose import jwt
+        from app.core.security import FastHMACCodec
+
+        codec = FastHMACCodec(self.SECRET)
+        exp = int(time.time()) + 60
+        token = codec.encode({"user_id": 1, "session_id": 2, "exp": exp})
+
+        assert jwt.get_unverified_claims(token) == {"uid": 1, "sid": 2, "exp": exp}
+        assert codec.decode(token) == {"user_id": 1, "session_id": 2, "exp": exp}
+
+    def test_fast_token_is_valid_jwt(self):
+        """El token es un JWT HS256 estándar verificable con jose."""
+        import time
+        from jose import jwt
+        from app.core.security import FastHMACCodec
+
+        token = FastHMACCodec(self.SECRET).encode({"user_id": 1, "exp": int(time.time()) + 60})
+        assert jwt.decode(token, self.SECRET, algorithms=["HS256"])["uid"] == 1
+
+    def test_fast_accepts_jose_tokens(self):
+        """Tokens emitidos por jose con la misma clave siguen siendo válidos."""
+        import time
+        from jose import jwt
+        from app.core.security import FastHMACCodec
+
+        token = jwt.encode({"user_id": 1, "exp": int(time.time()) + 60}, self.SECRET, algorithm="HS256")
+        assert FastHMACCodec(self.SECRET).decode(token)["user_id"] == 1
+
+    def test_fast_is_smaller(self):
+        """El codec compacto produce tokens más cortos que jose."""
+        import time
+        from jose import jwt
+        from app.core.security import FastHMACCodec
+
+        claims = {"user_id": 123, "session_id": 456, "exp": int(time.time()) + 60}
+        fast = FastHMACCodec(self.SECRET).encode(claims)
+        assert len(fast) < len(jwt.encode(claims, self.SECRET, algorithm="HS256"))
+
+    @pytest.mark.parametrize("mutate", [
+        lambda t: t[:-2] + ("AA" if not t.endswith("AA") else "BB"),
+        lambda t: "eyJhbGciOiJub25lIn0." + t.split(".", 1)[1],
+        lambda t: "no-es-un-token",
+    ])
+    def test_fast_rejects_tampered(self, mutate):
+        """Firma alterada, alg distinto o formato inválido se rechazan."""
+        import time
+        from jose import JWTError
+        from app.core.security import FastHMACCodec
+
+        codec = FastHMACCodec(self.SECRET)
+        token = codec.encode({"user_id": 1, "exp": int(time.time()) + 60})
+        with pytest.raises(JWTError):
+            codec.decode(mutate(token))
+
+    def test_fast_rejects_expired(self):
+        """Un token expirado se rechaza."""
+        import time
+        from jose import JWTError
+        from app.core.security import FastHMACCodec
+
+        codec = FastHMACCodec(self.SECRET)
+        with pytest.raises(JWTError):
+            codec.decode(codec.encode({"user_id": 1, "exp": int(time.time()) - 1}))
+
+    def test_codec_reset_clears_token_cache(self, monkeypatch):
+        """Al rehacer el codec (p. ej. otra SECRET_KEY) no se sirven payloads cacheados."""
+        from app.core import security
+        from app.core.config import settings
+
+        token = create_access_token({"user_id": 1})
+        assert security.decode_token(token)["user_id"] == 1
+
+        monkeypatch.setattr(settings, "secret_key", "z" * 40)
+        security.reset_token_codec()
+        try:
+            assert security.decode_token(token) is None
+        finally:
+            monkeypatch.undo()
+            security.reset_token_codec()
+
+    async def test_login_with_fast_codec(self, client: AsyncClient, test_user, monkeypatch):
+        """El flujo completo funciona con TOKEN_CODEC=fast."""
+        from app.core import security
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "token_codec", "fast")
+        security.reset_token_codec()
+        try:
+            login = await client.post(
+                "/api/v1/auth/token",
+                data={"username": "test@example.com", "password": "TestPass123!@#"}
+            )
+            token = login.json()["access_token"]
+            assert isinstance(security.get_token_codec(), security.FastHMACCodec)
+
+            response = await client.get("/api/v1/me", headers={"Authorization": f"Bearer {token}"})
+            assert response.status_code == 200
+        finally:
+            security.reset_token_codec()
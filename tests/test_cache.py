@@ -0,0 +1,217 @@
+"""
+Tests de las cachés en proceso del hot path de autenticación.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from jose import jwt
+
+from app.core import security
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class TestTTLCache:
+    """Tests de la caché LRU con expiración por entrada."""
+
+    def test_get_set(self):
+        """Un valor guardado se recupera mientras esté vigente."""
+        cache: TTLCache[int] = TTLCache("test", maxsize=10, default_ttl=60)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+
+    def test_entry_expires_at_deadline(self):
+        """La entrada se descarta en su expiración absoluta."""
+        cache: TTLCache[int] = TTLCache("test", maxsize=10, default_ttl=60)
+        cache.set("a", 1, expires_at=time.time() + 0.05)
+        assert cache.get("a") == 1
+        time.sleep(0.06)
+        assert cache.get("a") is None
+
+    def test_already_expired_not_stored(self):
+        """Una expiración pasada no se guarda."""
+        cache: TTLCache[int] = TTLCache("test", maxsize=10, default_ttl=60)
+        cache.set("a", 1, expires_at=time.time() - 1)
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        """Al superar maxsize se expulsa la entrada menos usada."""
+        cache: TTLCache[int] = TTLCache("test", maxsize=2, default_ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+
+class TestTokenCache:
+    """Tests de la caché de JWT verificados."""
+
+    def test_decode_is_cached(self, monkeypatch):
+        """Un token repetido no vuelve a verificarse."""
+        token = security.create_access_token({"user_id": 1, "session_id": 1})
+        calls = []
+        original = jwt.decode
+
+        def counting_decode(*args, **kwargs):
+            calls.append(1)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(security.jwt, "decode", counting_decode)
+        first = security.decode_token(token)
+        second = security.decode_token(token)
+
+        assert first == second
+        assert first["user_id"] == 1
+        assert len(calls) == 1
+
+    def test_cached_payload_is_not_shared(self):
+        """Mutar el payload devuelto no altera la caché."""
+        token = security.create_access_token({"user_id": 1})
+        security.decode_token(token)["user_id"] = 999
+        assert security.decode_token(token)["user_id"] == 1
+
+    def test_expired_token_rejected(self):
+        """Un token expirado no se acepta ni se cachea."""
+        token = security.create_access_token({"user_id": 1}, timedelta(seconds=-1))
+        assert security.decode_token(token) is None
+
+    def test_invalid_token_rejected(self):
+        """Un token con firma inválida no se acepta."""
+        token = jwt.encode({"user_id": 1}, "otra-clave" * 4, algorithm=settings.algorithm)
+        assert security.decode_token(token) is None
+
+
+@pytest.mark.asyncio
+class TestSessionValidityCache:
+    """Tests de la caché de validez de sesiones."""
+
+    @pytest.fixture(autouse=True)
+    def _cache(self, local_session_cache):
+        pass
+
+    async def _create_session(self, db, user_id: int) -> int:
+        from sqlalchemy import select
+        from app.models.session import Session as SessionModel, hash_refresh_token
+
+        _, refresh = await security.create_session_with_tokens(db, user_id)
+        result = await db.execute(
+            select(SessionModel.id).filter(SessionModel.refresh_token_hash == hash_refresh_token(refresh))
+        )
+        return result.scalar_one()
+
+    async def test_valid_session_is_cached(self, db, test_user):
+        """Tras la primera validación no se vuelve a consultar la BD."""
+        from sqlalchemy import update
+        from app.models.session import Session as SessionModel
+
+        session_id = await self._create_session(db, test_user.id)
+        assert await security.validate_session(db, session_id, test_user.id) is True
+
+        # Cambio fuera de banda: la caché sigue respondiendo hasta su TTL
+        await db.execute(
+            update(SessionModel).filter(SessionModel.id == session_id).values(is_revoked=True)
+        )
+        await db.commit()
+        assert await security.validate_session(db, session_id, test_user.id) is True
+
+    async def test_revoke_session_invalidates(self, db, test_user):
+        """Revocar una sesión la descarta de la caché al instante."""
+        session_id = await self._create_session(db, test_user.id)
+        assert await security.validate_session(db, session_id, test_user.id) is True
+
+        await security.revoke_session(db, session_id, test_user.id)
+        assert await security.validate_session(db, session_id, test_user.id) is False
+
+    async def test_revoke_all_sessions_invalidates(self, db, test_user):
+        """Revocar todas las sesiones descarta todas las entradas del usuario."""
+        first = await self._create_session(db, test_user.id)
+        second = await self._create_session(db, test_user.id)
+        for session_id in (first, second):
+            assert await security.validate_session(db, session_id, test_user.id) is True
+
+        await security.revoke_all_sessions(db, test_user.id)
+        for session_id in (first, second):
+            assert await security.validate_session(db, session_id, test_user.id) is False
+
+    async def test_disabled_without_shared_invalidation(self, db, test_user, monkeypatch):
+        """Sin Redis (ni modo solo local) cada validación consulta el store."""
+        monkeypatch.setattr(settings, "session_cache_local_only", False)
+        from app.core import session_cache
+
+        session_id = await self._create_session(db, test_user.id)
+        assert await security.validate_session(db, session_id, test_user.id) is True
+        assert await session_cache.get(session_id, test_user.id) is False
+
+    async def test_inflight_validation_does_not_recache(self, db, test_user):
+        """Una validación que leyó antes de la revocación no deja la sesión cacheada."""
+        from app.core import session_cache
+
+        session_id = await self._create_session(db, test_user.id)
+        since = session_cache.snapshot()
+        # La revocación llega mientras la validación espera a la BD
+        await security.revoke_session(db, session_id, test_user.id)
+        await session_cache.set_valid(
+            session_id, test_user.id, datetime.now(timezone.utc) + timedelta(hours=1), since
+        )
+        await session_cache.set_epoch(test_user.id, 0, since)
+
+        assert await session_cache.get(session_id, test_user.id) is False
+        assert await security.validate_session(db, session_id, test_user.id) is False
+
+    async def test_redis_tombstone_blocks_other_workers(self, monkeypatch):
+        """En Redis, la marca de invalidación bloquea escrituras de validaciones en curso."""
+        fakeredis = pytest.importorskip("fakeredis")
+        from app.core import session_cache
+
+        monkeypatch.setattr(settings, "session_cache_local_only", False)
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await session_cache.init(redis)
+        try:
+            expires = datetime.now(timezone.utc) + timedelta(hours=1)
+            await session_cache.set_valid(1, 7, expires)
+            assert await redis.hexists("session-valid:{7}", "1")
+
+            await session_cache.invalidate_session(1, 7)
+            # Otro worker (sin la marca local) termina una validación vieja
+            session_cache.clear()
+            await session_cache.set_valid(1, 7, expires)
+            assert not await redis.hexists("session-valid:{7}", "1")
+        finally:
+            await session_cache.close()
+            await redis.flushall()
+
+    async def test_invalidation_message(self):
+        """Los mensajes Pub/Sub de otros workers vacían la entrada local."""
+        from datetime import datetime, timezone
+        from app.core import session_cache
+
+        expires = datetime.now(timezone.utc) + timedelta(hours=1)
+        await session_cache.set_valid(1, 7, expires)
+        await session_cache.set_valid(2, 7, expires)
+        await session_cache.set_valid(3, 8, expires)
+
+        session_cache.handle_invalidation_message("s:7:1")
+        assert await session_cache.get(1, 7) is False
+        assert await session_cache.get(2, 7) is True
+
+        session_cache.handle_invalidation_message("u:7")
+        assert await session_cache.get(2, 7) is False
+        assert await session_cache.get(3, 8) is True
+
+    async def test_epoch_message_updates_cached_epoch(self):
+        """Un bump de epoch en otro worker actualiza el epoch local y descarta sesiones."""
+        from datetime import datetime, timezone
+        from app.core import session_cache
+
+        await session_cache.set_epoch(7, 0)
+        await session_cache.set_valid(1, 7, datetime.now(timezone.utc) + timedelta(hours=1))
+
+        session_cache.handle_invalidation_message("e:7:1")
+
+        assert await session_cache.get_epoch(7) == 1
+        assert await session_cache.get(1, 7) is False
@@ -5,6 +5,7 @@ import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.models.role import Role
 from app.models.user import User
 
 
@@ -54,6 +55,40 @@ class TestMe:
         assert data["name"] == "OnlyName"
         assert data["lastname"] == test_user.lastname
 
+    async def test_update_me_is_single_update(
+        self, client: AsyncClient, db: AsyncSession, auth_headers, test_user, query_counter
+    ):
+        """La actualización es un UPDATE ... RETURNING, sin SELECT ni refresh."""
+        db.add(Role(name="viewer"))  # ids de rol y de usuario distintos
+        await db.flush()
+        test_user.role = Role(name="editor")
+        await db.commit()
+        await client.get("/api/v1/me", headers=auth_headers)
+        query_counter.reset()
+        response = await client.put("/api/v1/me", headers=auth_headers, json={"name": "Updated"})
+
+        assert response.status_code == 200
+        assert response.json()["name"] == "Updated"
+        assert response.json()["role"] == "editor"
+        assert response.json()["updated_at"] is not None
+        # La consulta de autenticación + el UPDATE
+        assert query_counter.count == 2
+        assert query_counter.statements[1].startswith("UPDATE users")
+        assert "RETURNING" in query_counter.statements[1]
+
+    async def test_update_me_duplicate_email(
+        self, client: AsyncClient, db: AsyncSession, auth_headers
+    ):
+        """Cambiar a un email ya registrado devuelve 400, no un error interno."""
+        db.add(User(email="other@example.com", password="x", name="Other", lastname="User"))
+        await db.commit()
+        response = await client.put(
+            "/api/v1/me", headers=auth_headers, json={"email": "other@example.com"}
+        )
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "El email ya está registrado"
+
     async def test_update_me_password(self, client: AsyncClient, auth_headers):
         """Test updating password via PUT /me."""
         response = await client.put(
@@ -90,3 +125,188 @@ class TestMe:
 
         response = await client.get("/api/v1/me", headers=auth_headers)
         assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+class TestSoftDelete:
+    """Baja lógica de cuentas y purga diferida."""
+
+    async def test_soft_delete_is_single_update(
+        self, client: AsyncClient, db: AsyncSession, auth_headers, test_user, query_counter
+    ):
+        """DELETE /me es un UPDATE: las sesiones quedan hasta la purga pero ya no sirven."""
+        from sqlalchemy import func, select
+        from app.models.session import Session as SessionModel
+
+        query_counter.reset()
+        response = await client.delete("/api/v1/me", headers=auth_headers)
+
+        assert response.status_code == 204
+        writes = [s for s in query_counter.statements if not s.startswith("SELECT")]
+        assert len(writes) == 1 and writes[0].startswith("UPDATE users")
+        await db.refresh(test_user)
+        assert test_user.deleted_at is not None
+        sessions = await db.execute(
+            select(func.count()).select_from(SessionModel).where(SessionModel.user_id == test_user.id)
+        )
+        assert sessions.scalar() == 1
+
+        assert (await client.get("/api/v1/me", headers=auth_headers)).status_code == 401
+        login = await client.post(
+            "/api/v1/auth/token",
+            data={"username": "test@example.com", "password": "TestPass123!@#"}
+        )
+        assert login.status_code == 401
+
+    async def test_deleted_users_hidden_from_reads(
+        self, client: AsyncClient, db: AsyncSession, auth_headers, test_user
+    ):
+        """Las lecturas de user_service y las proyecciones excluyen las bajas."""
+        from app.services import user_queries, user_service
+
+        other = User(email="other@example.com", password="x", name="Other", lastname="User")
+        db.add(other)
+        await db.commit()
+        await user_service.delete_user(db, other.id)
+
+        assert await user_service.get_user_by_id(db, other.id) is None
+        assert await user_service.get_user_by_email(db, "other@example.com") is None
+        assert await user_queries.get_user_row(db, other.id) is None
+        page = (await client.get("/api/v1/users?count=exact", headers=auth_headers)).json()
+        assert [u["id"] for u in page["items"]] == [test_user.id]
+        assert page["total"] == 1
+
+    async def test_purge_deletes_user_and_sessions_in_batches(
+        self, db: AsyncSession, test_user: User
+    ):
+        """El purgador borra sesiones en lotes y después al usuario."""
+        from sqlalchemy import func, select
+        from app.core.security import create_session_with_tokens
+        from app.models.session import Session as SessionModel
+        from app.services import user_service
+        from app.services.user_purge import run_purge
+        from tests.conftest import TestingSessionLocal
+
+        for _ in range(5):
+            await create_session_with_tokens(db, test_user.id)
+        await user_service.delete_user(db, test_user.id)
+
+        report = await run_purge(TestingSessionLocal, batch_size=2, pause_seconds=0)
+
+        assert (report.users, report.sessions) == (1, 5)
+        remaining = await db.execute(select(func.count()).select_from(SessionModel))
+        assert remaining.scalar() == 0
+        assert (await db.execute(select(User.id))).scalars().all() == []
+        # Nada pendiente: una segunda pasada no hace nada
+        assert (await run_purge(TestingSessionLocal)).users == 0
+
+
+@pytest.mark.asyncio
+class TestPrincipalDependency:
+    """Tests de la dependencia de autenticación en una sola consulta."""
+
+    async def test_get_me_single_query(self, client: AsyncClient, auth_headers, query_counter):
+        """GET /me resuelve sesión, usuario y rol con una sola consulta."""
+        query_counter.reset()
+        response = await client.get("/api/v1/me", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert query_counter.count == 1
+        assert "sessions" in query_counter.statements[0]
+
+    async def test_cached_session_skips_session_join(
+        self, client: AsyncClient, auth_headers, query_counter, local_session_cache
+    ):
+        """Con la sesión en caché la consulta no toca la tabla sessions."""
+        await client.get("/api/v1/me", headers=auth_headers)
+        query_counter.reset()
+        response = await client.get("/api/v1/me", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert query_counter.count == 1
+        assert "sessions" not in query_counter.statements[0]
+
+    async def test_revoked_session_rejected(self, client: AsyncClient, auth_headers):
+        """Un token cuya sesión fue revocada es rechazado."""
+        await client.delete("/api/v1/me/sessions", headers=auth_headers)
+
+        response = await client.get("/api/v1/me", headers=auth_headers)
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Sesión revocada o expirada"
+
+    async def test_principal_permissions(self, db: AsyncSession, test_user: User):
+        """El Principal expone rol y permisos resueltos en la consulta."""
+        from app.api.deps import get_current_principal
+        from app.core.security import create_session_with_tokens
+        from app.models.role import Role, Permission
+
+        perms = [Permission(name="read_recipe"), Permission(name="write_recipe")]
+        role = Role(name="editor", permissions=perms)
+        db.add(role)
+        await db.commit()
+        test_user.role_id = role.id
+        await db.commit()
+
+        access, _ = await create_session_with_tokens(db, test_user.id)
+        principal = await get_current_principal(access, db)
+
+        assert principal.id == test_user.id
+        assert principal.role == "editor"
+        assert principal.permissions == {"read_recipe", "write_recipe"}
+        assert principal.has_permission("write_recipe") is True
+        assert principal.has_permission("delete_recipe") is False
+
+
+@pytest.mark.asyncio
+class TestTokenEpoch:
+    """Tests del epoch de tokens por usuario (logout global en O(1))."""
+
+    async def test_revoke_all_writes_only_users(
+        self, client: AsyncClient, auth_headers, query_counter
+    ):
+        """Revocar todas las sesiones es un único UPDATE sobre users."""
+        await client.get("/api/v1/me", headers=auth_headers)
+        query_counter.reset()
+
+        response = await client.delete("/api/v1/me/sessions", headers=auth_headers)
+
+        assert response.status_code == 204
+        writes = [s for s in query_counter.statements if s.lstrip().upper().startswith("UPDATE")]
+        assert len(writes) == 1
+        assert writes[0].lstrip().startswith("UPDATE users")
+
+    async def test_stale_epoch_rejected_from_cache(
+        self, client: AsyncClient, auth_headers, query_counter, local_session_cache
+    ):
+        """Tras el logout global el token viejo se rechaza sin ir a la base de datos."""
+        await client.delete("/api/v1/me/sessions", headers=auth_headers)
+        query_counter.reset()
+
+        response = await client.get("/api/v1/me", headers=auth_headers)
+
+        assert response.status_code == 401
+        assert query_counter.count == 0
+
+    async def test_password_change_invalidates_tokens(
+        self, client: AsyncClient, auth_headers, db: AsyncSession, test_user: User
+    ):
+        """Cambiar la contraseña invalida access y refresh tokens previos."""
+        from app.core.security import create_session_with_tokens
+
+        _, refresh = await create_session_with_tokens(db, test_user.id)
+        response = await client.put(
+            "/api/v1/me", headers=auth_headers, json={"password": "OtraClave456!@#"}
+        )
+        assert response.status_code == 200
+
+        assert (await client.get("/api/v1/me", headers=auth_headers)).status_code == 401
+        refreshed = await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh})
+        assert refreshed.status_code == 401
+
+        login = await client.post(
+            "/api/v1/auth/token",
+            data={"username": "test@example.com", "password": "OtraClave456!@#"},
+        )
+        token = login.json()["access_token"]
+        me = await client.get("/api/v1/me", headers={"Authorization": f"Bearer {token}"})
+        assert me.status_code == 200
@@ -41,3 +41,127 @@ class TestRateLimit:
                 break
 
         assert last_status == 429, "Rate limiter debería bloquear después de 5 intentos"
+
+
+@pytest.mark.asyncio
+class TestHashingBackpressure:
+    """Tests del executor de hashing acotado."""
+
+    async def test_executor_runs_job(self):
+        """El executor ejecuta la función y libera el cupo."""
+        from app.core.hashing import HashingExecutor
+
+        executor = HashingExecutor(kind="thread", workers=1, max_queue=0)
+        try:
+            assert await executor.run("hash", pow, 2, 10) == 1024
+            assert executor.pending == 0
+        finally:
+            executor.shutdown()
+
+    async def test_executor_rejects_when_full(self):
+        """Con la cola llena se rechaza de inmediato con 503."""
+        import asyncio
+        import threading
+        from app.core.exceptions import ServiceOverloadedException
+        from app.core.hashing import HashingExecutor
+
+        executor = HashingExecutor(kind="thread", workers=1, max_queue=0)
+        release = threading.Event()
+        try:
+            busy = asyncio.create_task(executor.run("hash", release.wait))
+            await asyncio.sleep(0.01)
+            with pytest.raises(ServiceOverloadedException) as exc:
+                await executor.run("hash", pow, 2, 10)
+            assert exc.value.status_code == 503
+            assert "Retry-After" in exc.value.headers
+            release.set()
+            await busy
+        finally:
+            release.set()
+            executor.shutdown()
+
+    async def test_cancelled_caller_keeps_slot_until_job_ends(self):
+        """Cancelar la espera no libera el cupo mientras el hash siga en ejecución."""
+        import asyncio
+        import threading
+        from app.core.exceptions import ServiceOverloadedException
+        from app.core.hashing import HashingExecutor
+
+        executor = HashingExecutor(kind="thread", workers=1, max_queue=1)
+        release = threading.Event()
+        try:
+            running = asyncio.create_task(executor.run("hash", release.wait))
+            queued = asyncio.create_task(executor.run("hash", pow, 2, 10))
+            await asyncio.sleep(0.01)
+            running.cancel()
+            queued.cancel()
+            await asyncio.gather(running, queued, return_exceptions=True)
+
+            # El trabajo en cola se retiró; el que corre sigue ocupando su cupo
+            assert executor.pending == 1
+            waiting = asyncio.create_task(executor.run("hash", pow, 2, 3))
+            await asyncio.sleep(0.01)
+            with pytest.raises(ServiceOverloadedException):
+                await executor.run("hash", pow, 2, 10)
+
+            release.set()
+            assert await waiting == 8
+            assert executor.pending == 0
+        finally:
+            release.set()
+            executor.shutdown()
+
+    async def test_run_queued_waits_for_a_slot(self):
+        """run_queued espera un cupo en lugar de rechazar; cancelarlo no deja rastro."""
+        import asyncio
+        import threading
+        from app.core.hashing import HashingExecutor
+
+        executor = HashingExecutor(kind="thread", workers=1, max_queue=0)
+        release = threading.Event()
+        try:
+            busy = asyncio.create_task(executor.run("hash", release.wait))
+            await asyncio.sleep(0.01)
+            waiting = asyncio.create_task(executor.run_queued("import", pow, 2, 10))
+            abandoned = asyncio.create_task(executor.run_queued("import", pow, 2, 3))
+            await asyncio.sleep(0.01)
+            assert not waiting.done()
+            abandoned.cancel()
+            await asyncio.gather(abandoned, return_exceptions=True)
+
+            release.set()
+            assert await waiting == 1024
+            await busy
+            assert executor.pending == 0
+            assert executor._waiters == []
+        finally:
+            release.set()
+            executor.shutdown()
+
+    async def test_login_returns_503_when_saturated(
+        self, client: AsyncClient, test_user, monkeypatch
+    ):
+        """/auth/token responde 503 con Retry-After si la cola está saturada."""
+        from app.core.hashing import hashing_executor
+
+        monkeypatch.setattr(hashing_executor, "_pending", hashing_executor.capacity)
+        response = await client.post(
+            "/api/v1/auth/token",
+            data={"username": "test@example.com", "password": "TestPass123!@#"}
+        )
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+
+    async def test_create_user_returns_503_when_saturated(
+        self, client: AsyncClient, monkeypatch
+    ):
+        """POST /users responde 503 si la cola de hashing está saturada."""
+        from app.core.hashing import hashing_executor
+
+        monkeypatch.setattr(hashing_executor, "_pending", hashing_executor.capacity)
+        response = await client.post("/api/v1/users", json={
+            "email": "busy@example.com",
+            "password": "StrongPass123!@#",
+            "name": "Busy", "lastname": "User"
+        })
+        assert response.status_code == 503
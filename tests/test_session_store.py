@@ -0,0 +1,327 @@
+"""
+Tests de contrato de SessionStore (SQL, Redis, memoria).
+
+La misma batería corre contra cada implementación; Redis usa fakeredis.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.session_store import (
+    MemorySessionStore, RedisSessionStore, SqlSessionStore, set_session_store,
+)
+from app.models.session import generate_refresh_token, hash_refresh_token
+from app.models.user import User
+
+
+def _token() -> bytes:
+    return hash_refresh_token(generate_refresh_token())
+
+
+@pytest_asyncio.fixture(params=["sql", "memory", "redis"])
+async def store(request):
+    """Cada implementación de SessionStore."""
+    if request.param == "sql":
+        yield SqlSessionStore()
+    elif request.param == "memory":
+        yield MemorySessionStore()
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        redis_store = RedisSessionStore(redis)
+        yield redis_store
+        await redis.flushall()
+        await redis_store.close()
+
+
+@pytest.mark.asyncio
+class TestSessionStoreContract:
+    """Comportamiento común a todos los stores."""
+
+    async def _create(self, store, db, user_id, token=None, **kwargs):
+        kwargs.setdefault("expires_at", datetime.now(timezone.utc) + timedelta(days=7))
+        kwargs.setdefault("token_epoch", 0)
+        return await store.create(db, user_id=user_id, refresh_token_hash=token or _token(), **kwargs)
+
+    async def test_create_and_get_valid(self, store, db: AsyncSession, test_user: User):
+        """Una sesión creada es válida solo para su usuario."""
+        now = datetime.now(timezone.utc)
+        record = await self._create(
+            store, db, test_user.id, token_epoch=3, device_info="Phone", ip_address="10.0.0.1"
+        )
+
+        found = await store.get_valid(db, record.id, test_user.id, now)
+        assert found.id == record.id
+        assert (found.user_id, found.token_epoch) == (test_user.id, 3)
+        assert (found.device_info, found.ip_address) == ("Phone", "10.0.0.1")
+        assert await store.get_valid(db, record.id, test_user.id + 1, now) is None
+
+    async def test_rotate_single_winner(self, store, db: AsyncSession, test_user: User):
+        """Un token rota una sola vez; el nuevo reemplaza al anterior."""
+        now = datetime.now(timezone.utc)
+        old, new, other = _token(), _token(), _token()
+        record = await self._create(store, db, test_user.id, token=old)
+
+        rotated = await store.rotate(db, old, new, now)
+        assert rotated.id == record.id
+        assert await store.rotate(db, old, other, now) is None
+        assert (await store.find_by_token(db, new, now)).id == record.id
+        assert await store.find_by_token(db, old, now) is None
+
+    async def test_concurrent_rotation(self, store, db: AsyncSession, test_user: User):
+        """Con rotaciones concurrentes del mismo token gana exactamente una."""
+        if isinstance(store, SqlSessionStore):
+            pytest.skip("Cubierto en test_sessions con sesiones de BD independientes")
+        now = datetime.now(timezone.utc)
+        old = _token()
+        await self._create(store, db, test_user.id, token=old)
+
+        results = await asyncio.gather(*(store.rotate(db, old, _token(), now) for _ in range(5)))
+        assert sum(r is not None for r in results) == 1
+
+    async def test_concurrent_rotation_losers_find_winner(
+        self, store, db: AsyncSession, test_user: User
+    ):
+        """Quien pierde la carrera encuentra la rotación del ganador y nada se revoca."""
+        if isinstance(store, SqlSessionStore):
+            pytest.skip("Cubierto en test_sessions con sesiones de BD independientes")
+        now = datetime.now(timezone.utc)
+        old, new = _token(), _token()
+        record = await self._create(store, db, test_user.id, token=old, family="fam")
+
+        async def refresh():
+            rotated = await store.rotate(db, old, new, now, "fam")
+            if rotated is not None:
+                return rotated
+            return await store.find_recent_rotation(db, old, new, now - timedelta(seconds=10), now)
+
+        results = await asyncio.gather(*(refresh() for _ in range(5)))
+        assert [r.id if r else None for r in results] == [record.id] * 5
+        assert await store.get_valid(db, record.id, test_user.id, now) is not None
+
+    async def test_revoke_reused_token(self, store, db: AsyncSession, test_user: User):
+        """Presentar el token rotado revoca la sesión una sola vez."""
+        now = datetime.now(timezone.utc)
+        old, new = _token(), _token()
+        record = await self._create(store, db, test_user.id, token=old)
+        await store.rotate(db, old, new, now)
+
+        revoked = await store.revoke_reused(db, old, None, now)
+        assert revoked.id == record.id
+        assert await store.revoke_reused(db, old, None, now) is None
+        assert await store.get_valid(db, record.id, test_user.id, now) is None
+        assert await store.rotate(db, new, _token(), now) is None
+
+    async def test_unknown_token_is_not_reuse(self, store, db: AsyncSession, test_user: User):
+        """Un token que nunca existió no revoca nada."""
+        record = await self._create(store, db, test_user.id)
+        now = datetime.now(timezone.utc)
+
+        assert await store.revoke_reused(db, _token(), None, now) is None
+        assert await store.revoke_reused(db, _token(), "otra-familia", now) is None
+        assert await store.get_valid(db, record.id, test_user.id, now) is not None
+
+    async def test_revoke_reused_by_family(self, store, db: AsyncSession, test_user: User):
+        """Cualquier token viejo de la familia revoca la sesión; el vigente no."""
+        now = datetime.now(timezone.utc)
+        first, second, third = _token(), _token(), _token()
+        record = await self._create(store, db, test_user.id, token=first, family="fam")
+        await store.rotate(db, first, second, now)
+        await store.rotate(db, second, third, now)
+
+        assert await store.revoke_reused(db, third, "fam", now) is None
+        revoked = await store.revoke_reused(db, first, "fam", now)
+        assert revoked.id == record.id
+        assert await store.get_valid(db, record.id, test_user.id, now) is None
+
+    async def test_find_recent_rotation(self, store, db: AsyncSession, test_user: User):
+        """Solo el último par (anterior, nuevo) rotado dentro de la ventana."""
+        now = datetime.now(timezone.utc)
+        old, new, newer = _token(), _token(), _token()
+        record = await self._create(store, db, test_user.id, token=old)
+        await store.rotate(db, old, new, now)
+
+        found = await store.find_recent_rotation(db, old, new, now - timedelta(seconds=10), now)
+        assert found.id == record.id
+        assert await store.find_recent_rotation(db, old, new, now + timedelta(seconds=1), now) is None
+        assert await store.find_recent_rotation(db, old, _token(), now - timedelta(seconds=10), now) is None
+
+        await store.rotate(db, new, newer, now)
+        assert await store.find_recent_rotation(db, old, new, now - timedelta(seconds=10), now) is None
+
+    async def test_expired_session_is_invalid(self, store, db: AsyncSession, test_user: User):
+        """Una sesión expirada no valida ni rota."""
+        now = datetime.now(timezone.utc)
+        token = _token()
+        record = await self._create(
+            store, db, test_user.id, token=token, expires_at=now - timedelta(seconds=1)
+        )
+
+        assert await store.get_valid(db, record.id, test_user.id, now) is None
+        assert await store.find_by_token(db, token, now) is None
+        assert await store.rotate(db, token, _token(), now) is None
+
+    async def test_revoke_and_list(self, store, db: AsyncSession, test_user: User):
+        """Revocar saca la sesión del listado de activas, no del histórico."""
+        now = datetime.now(timezone.utc)
+        first = await self._create(store, db, test_user.id)
+        second = await self._create(store, db, test_user.id)
+
+        assert await store.revoke(db, first.id, test_user.id + 1, now) is False
+        assert await store.revoke(db, first.id, test_user.id, now) is True
+
+        active = await store.list_for_user(db, test_user.id, now)
+        assert [s.id for s in active] == [second.id]
+        history = await store.list_for_user(db, test_user.id, now, active_only=False)
+        assert {s.id for s in history} == {first.id, second.id}
+        assert next(s for s in history if s.id == first.id).revoked_at is not None
+
+    async def test_touch_updates_last_used_at(self, store, db: AsyncSession, test_user: User):
+        """touch registra el último uso (el store SQL lo persiste en lote)."""
+        from app.core import session_activity
+        from tests.conftest import TestingSessionLocal
+
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        record = await self._create(store, db, test_user.id)
+
+        await store.touch(db, record.id, now)
+        await session_activity.flush(TestingSessionLocal)
+
+        found = await store.get_valid(db, record.id, test_user.id, now)
+        assert found.last_used_at == now
+
+    async def test_evict_lru_keeps_most_recent(self, store, db: AsyncSession, test_user: User):
+        """Se desalojan primero las de epoch viejo y luego las de uso más antiguo."""
+        from app.core import session_activity
+        from tests.conftest import TestingSessionLocal
+
+        now = datetime.now(timezone.utc)
+        stale = await self._create(store, db, test_user.id, token_epoch=0)
+        used, idle, newest = [await self._create(store, db, test_user.id, token_epoch=1) for _ in range(3)]
+        await store.touch(db, used.id, now + timedelta(seconds=1))
+        await session_activity.flush(TestingSessionLocal)
+
+        assert await store.evict_lru(db, test_user.id, 2, now) == sorted([stale.id, idle.id])
+        await db.commit()
+
+        active = await store.list_for_user(db, test_user.id, now)
+        assert {s.id for s in active} == {used.id, newest.id}
+        assert await store.evict_lru(db, test_user.id, 2, now) == []
+
+    async def test_delete_for_user(self, store, db: AsyncSession, test_user: User):
+        """Al borrar el usuario no quedan sesiones suyas."""
+        now = datetime.now(timezone.utc)
+        await self._create(store, db, test_user.id)
+
+        await db.execute(delete(User).where(User.id == test_user.id))
+        await db.commit()
+        await store.delete_for_user(db, test_user.id)
+
+        assert await store.list_for_user(db, test_user.id, now, active_only=False) == []
+
+
+@pytest.mark.asyncio
+class TestNonSqlStoreEndToEnd:
+    """El flujo de la API funciona con sesiones fuera de la base de datos."""
+
+    @pytest_asyncio.fixture
+    async def memory_store(self, monkeypatch):
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "session_store", "memory")
+        store = MemorySessionStore()
+        set_session_store(store)
+        yield store
+        set_session_store(None)
+
+    async def test_login_refresh_logout(
+        self, client: AsyncClient, test_user: User, memory_store, query_counter
+    ):
+        """Login, refresh y logout global sin tocar la tabla sessions."""
+        query_counter.reset()
+        login = await client.post(
+            "/api/v1/auth/token",
+            data={"username": "test@example.com", "password": "TestPass123!@#"},
+        )
+        assert login.status_code == 200
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        assert (await client.get("/api/v1/me", headers=headers)).status_code == 200
+        sessions = await client.get("/api/v1/me/sessions", headers=headers)
+        assert len(sessions.json()) == 1
+
+        refreshed = await client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": login.json()["refresh_token"]}
+        )
+        assert refreshed.status_code == 200
+        assert all("sessions" not in statement for statement in query_counter.statements)
+
+        assert (await client.post("/api/v1/auth/logout", headers=headers)).status_code == 204
+        assert (await client.get("/api/v1/me", headers=headers)).status_code == 401
+
+
+@pytest.mark.asyncio
+class TestRedisSessionStore:
+    """Detalles propios del store Redis."""
+
+    async def test_stale_token_index_is_ignored(self, db: AsyncSession, test_user: User):
+        """Un índice por token desactualizado no resuelve la sesión."""
+        fakeredis = pytest.importorskip("fakeredis")
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        store = RedisSessionStore(redis)
+        try:
+            now = datetime.now(timezone.utc)
+            old, new = _token(), _token()
+            record = await store.create(
+                db, user_id=test_user.id, refresh_token_hash=old,
+                expires_at=now + timedelta(days=1), token_epoch=0,
+            )
+            await store.rotate(db, old, new, now)
+            # Índice del token viejo restaurado (p. ej. desde un snapshot anterior)
+            await redis.set(store._token_key(old), record.id)
+
+            assert await store.find_by_token(db, old, now) is None
+            assert await store.rotate(db, old, _token(), now) is None
+            assert (await store.find_by_token(db, new, now)).id == record.id
+        finally:
+            await redis.flushall()
+            await store.close()
+
+    async def test_rotation_indexes_are_visible_when_script_returns(
+        self, db: AsyncSession, test_user: User
+    ):
+        """Un refresh que llega justo después del script del ganador ve la rotación completa."""
+        fakeredis = pytest.importorskip("fakeredis")
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        store = RedisSessionStore(redis)
+        try:
+            now = datetime.now(timezone.utc)
+            since = now - timedelta(seconds=10)
+            old, new = _token(), _token()
+            record = await store.create(
+                db, user_id=test_user.id, refresh_token_hash=old,
+                expires_at=now + timedelta(days=1), token_epoch=0, family="fam",
+            )
+            script, seen = store._rotate, {}
+
+            async def rotate_then_race(**kwargs):
+                result = await script(**kwargs)
+                store._rotate = script
+                # El perdedor corre antes de que el ganador siga
+                seen["rotate"] = await store.rotate(db, old, new, now, "fam")
+                seen["grace"] = await store.find_recent_rotation(db, old, new, since, now)
+                return result
+
+            store._rotate = rotate_then_race
+            assert (await store.rotate(db, old, new, now, "fam")).id == record.id
+            assert seen["rotate"] is None
+            assert seen["grace"].id == record.id
+            assert await store.get_valid(db, record.id, test_user.id, now) is not None
+        finally:
+            await redis.flushall()
+            await store.close()
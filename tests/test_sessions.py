@@ -2,11 +2,12 @@
 Tests para gestión de sesiones y refresh tokens (Async).
 """
 import pytest
+import pytest_asyncio
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.models.session import Session as SessionModel
+from app.models.session import Session as SessionModel, hash_refresh_token
 from app.core.security import create_session_with_tokens
 from app.models.user import User
 
@@ -25,7 +26,7 @@ class TestSessionModel:
         session = result.scalar_one_or_none()
 
         assert session is not None
-        assert session.refresh_token == refresh
+        assert session.refresh_token_hash == hash_refresh_token(refresh)
         assert session.device_info == "TestDevice"
         assert session.ip_address == "127.0.0.1"
         assert session.is_valid() is True
@@ -34,7 +35,7 @@ class TestSessionModel:
         """Verifica validación de sesión revocada (Async)."""
         _, refresh = await create_session_with_tokens(db, test_user.id)
 
-        result = await db.execute(select(SessionModel).filter(SessionModel.refresh_token == refresh))
+        result = await db.execute(select(SessionModel).filter(SessionModel.refresh_token_hash == hash_refresh_token(refresh)))
         session = result.scalar_one_or_none()
 
         session.is_revoked = True
@@ -72,7 +73,7 @@ class TestRefreshEndpoint:
         _, refresh = await create_session_with_tokens(db, test_user.id)
 
         # Revocar la sesión
-        result = await db.execute(select(SessionModel).filter(SessionModel.refresh_token == refresh))
+        result = await db.execute(select(SessionModel).filter(SessionModel.refresh_token_hash == hash_refresh_token(refresh)))
         session = result.scalar_one_or_none()
         session.is_revoked = True
         await db.commit()
@@ -83,16 +84,203 @@ class TestRefreshEndpoint:
         )
         assert response.status_code == 401
 
-    async def test_double_refresh_same_token(self, client: AsyncClient, db: AsyncSession, test_user: User):
-        """Doble refresh con el mismo token funciona (token no cambia)."""
+    async def test_refresh_rotates_token(self, client: AsyncClient, db: AsyncSession, test_user: User):
+        """Cada refresh emite un refresh token nuevo que sirve para el siguiente."""
         _, refresh = await create_session_with_tokens(db, test_user.id)
 
         res1 = await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh})
         assert res1.status_code == 200
+        rotated = res1.json()["refresh_token"]
+        assert rotated != refresh
 
-        res2 = await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh})
+        res2 = await client.post("/api/v1/auth/refresh", json={"refresh_token": rotated})
         assert res2.status_code == 200
 
+    async def test_reused_token_revokes_family(
+        self, client: AsyncClient, db: AsyncSession, test_user: User, monkeypatch
+    ):
+        """Reutilizar un token rotado (fuera de la ventana de gracia) revoca la sesión completa."""
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "refresh_token_reuse_grace_seconds", 0)
+        _, refresh = await create_session_with_tokens(db, test_user.id)
+
+        res1 = await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh})
+        rotated = res1.json()["refresh_token"]
+
+        reuse = await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh})
+        assert reuse.status_code == 401
+
+        # El token legítimo más reciente también quedó revocado
+        res2 = await client.post("/api/v1/auth/refresh", json={"refresh_token": rotated})
+        assert res2.status_code == 401
+
+        result = await db.execute(select(SessionModel).filter(SessionModel.user_id == test_user.id))
+        assert result.scalar_one().is_revoked is True
+
+    async def test_retry_within_grace_gets_same_token(
+        self, client: AsyncClient, db: AsyncSession, test_user: User
+    ):
+        """Reintentar con el token recién rotado devuelve el mismo token nuevo, sin revocar."""
+        _, refresh = await create_session_with_tokens(db, test_user.id)
+
+        first = await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh})
+        retry = await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh})
+        assert retry.status_code == 200
+        assert retry.json()["refresh_token"] == first.json()["refresh_token"]
+
+        following = await client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": first.json()["refresh_token"]}
+        )
+        assert following.status_code == 200
+
+    @pytest_asyncio.fixture(params=["sql", "memory", "redis"])
+    async def any_session_store(self, request, monkeypatch):
+        """Cada backend de sesiones instalado como store activo."""
+        from app.core.config import settings
+        from app.core.session_store import (
+            MemorySessionStore, RedisSessionStore, get_session_store, set_session_store,
+        )
+
+        redis = None
+        if request.param == "memory":
+            store = MemorySessionStore()
+        elif request.param == "redis":
+            fakeredis = pytest.importorskip("fakeredis")
+            redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+            store = RedisSessionStore(redis)
+        if request.param != "sql":
+            monkeypatch.setattr(settings, "session_store", request.param)
+            set_session_store(store)
+        yield get_session_store()
+        set_session_store(None)
+        if redis is not None:
+            await redis.flushall()
+            await redis.close()
+
+    async def test_concurrent_refresh_same_result(
+        self, db: AsyncSession, test_user: User, local_session_cache, any_session_store
+    ):
+        """Refreshes concurrentes del mismo token: uno rota y todos reciben el mismo token nuevo."""
+        # Epoch en caché: la conexión SQLite compartida no admite la lectura intercalada
+        import asyncio
+        from datetime import datetime, timezone
+        from app.core.security import refresh_access_token
+        from tests.conftest import TestingSessionLocal
+
+        _, refresh = await create_session_with_tokens(db, test_user.id)
+
+        async def attempt():
+            async with TestingSessionLocal() as session:
+                return await refresh_access_token(session, refresh)
+
+        results = await asyncio.gather(*(attempt() for _ in range(3)))
+        assert all(r is not None for r in results)
+        assert len({new_refresh for _, new_refresh in results}) == 1
+
+        active = await any_session_store.list_for_user(db, test_user.id, datetime.now(timezone.utc))
+        assert len(active) == 1
+
+    async def test_stale_token_from_older_generation_revokes(
+        self, client: AsyncClient, db: AsyncSession, test_user: User
+    ):
+        """Un token de dos o más rotaciones atrás se detecta como reutilización."""
+        _, refresh = await create_session_with_tokens(db, test_user.id)
+        first = (await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh})).json()
+        second = (await client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": first["refresh_token"]}
+        )).json()
+
+        reuse = await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh})
+        assert reuse.status_code == 401
+        latest = await client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": second["refresh_token"]}
+        )
+        assert latest.status_code == 401
+
+    async def test_forged_family_token_does_not_revoke(
+        self, client: AsyncClient, db: AsyncSession, test_user: User
+    ):
+        """Un token inventado con el prefijo de familia de otro es 401 y no revoca la sesión."""
+        _, refresh = await create_session_with_tokens(db, test_user.id)
+        family, secret, _ = refresh.split(".")
+
+        for forged in (f"{family}.x", f"{family}.x.y", f"{family}.{secret}.AAAAAAAAAAAAAAAAAAAAAA"):
+            response = await client.post("/api/v1/auth/refresh", json={"refresh_token": forged})
+            assert response.status_code == 401
+
+        result = await db.execute(select(SessionModel).filter(SessionModel.user_id == test_user.id))
+        assert result.scalar_one().is_revoked is False
+        res = await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh})
+        assert res.status_code == 200
+
+
+@pytest.mark.asyncio
+class TestSessionActivityBuffer:
+    """Tests del buffer write-behind de last_used_at."""
+
+    async def _last_used_at(self, session_id: int):
+        from tests.conftest import TestingSessionLocal
+        async with TestingSessionLocal() as session:
+            result = await session.execute(
+                select(SessionModel.last_used_at).filter(SessionModel.id == session_id)
+            )
+            return result.scalar_one()
+
+    async def test_touch_coalesces_per_session(self):
+        """Varios usos de la misma sesión dejan una sola entrada, la más reciente."""
+        from datetime import datetime, timedelta, timezone
+        from app.core import session_activity
+
+        now = datetime.now(timezone.utc)
+        session_activity.touch(1, now)
+        session_activity.touch(1, now - timedelta(seconds=5))
+        session_activity.touch(2, now)
+
+        assert session_activity.pending() == {1: now, 2: now}
+
+    async def test_flush_persists_and_never_goes_back(self, db: AsyncSession, test_user: User):
+        """El flush escribe en lote y no retrocede last_used_at."""
+        from datetime import datetime, timedelta, timezone
+        from app.core import session_activity
+        from tests.conftest import TestingSessionLocal
+
+        await create_session_with_tokens(db, test_user.id)
+        session_id = (await db.execute(select(SessionModel.id))).scalar_one()
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+
+        session_activity.touch(session_id, now)
+        assert await session_activity.flush(TestingSessionLocal) == 1
+        assert session_activity.pending() == {}
+        assert (await self._last_used_at(session_id)).replace(tzinfo=None) == now.replace(tzinfo=None)
+
+        session_activity.touch(session_id, now - timedelta(hours=1))
+        await session_activity.flush(TestingSessionLocal)
+        assert (await self._last_used_at(session_id)).replace(tzinfo=None) == now.replace(tzinfo=None)
+
+    async def test_refresh_without_rotation_is_read_only(
+        self, client: AsyncClient, db: AsyncSession, test_user: User, monkeypatch
+    ):
+        """Sin rotación el refresh no escribe: last_used_at llega con el flush."""
+        from app.core import session_activity
+        from app.core.config import settings
+        from tests.conftest import TestingSessionLocal
+
+        monkeypatch.setattr(settings, "refresh_token_rotation", False)
+        _, refresh = await create_session_with_tokens(db, test_user.id)
+        session_id = (await db.execute(select(SessionModel.id))).scalar_one()
+
+        for _ in range(3):
+            response = await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh})
+            assert response.status_code == 200
+            assert response.json()["refresh_token"] == refresh
+
+        assert list(session_activity.pending()) == [session_id]
+        assert await self._last_used_at(session_id) is None
+
+        await session_activity.stop(TestingSessionLocal)
+        assert await self._last_used_at(session_id) is not None
+
 
 @pytest.mark.asyncio
 class TestSessionManagement:
@@ -111,7 +299,7 @@ class TestSessionManagement:
         """Revocar una sesión específica (Async)."""
         _, refresh = await create_session_with_tokens(db, test_user.id)
 
-        result = await db.execute(select(SessionModel).filter(SessionModel.refresh_token == refresh))
+        result = await db.execute(select(SessionModel).filter(SessionModel.refresh_token_hash == hash_refresh_token(refresh)))
         session = result.scalar_one_or_none()
 
         response = await client.delete(f"/api/v1/me/sessions/{session.id}", headers=auth_headers)
@@ -130,6 +318,34 @@ class TestSessionManagement:
         response = await client.delete("/api/v1/me/sessions/0", headers=auth_headers)
         assert response.status_code == 422
 
+    async def test_login_evicts_least_recently_used(
+        self, client: AsyncClient, db: AsyncSession, test_user: User, monkeypatch
+    ):
+        """Al superar MAX_SESSIONS_PER_USER se revoca la sesión de uso más antiguo."""
+        from app.core.config import settings
+        from app.core.metrics import SESSIONS_EVICTED
+
+        monkeypatch.setattr(settings, "max_sessions_per_user", 2)
+        evicted_before = SESSIONS_EVICTED.labels(store="sql")._value.get()
+
+        _, first = await create_session_with_tokens(db, test_user.id, "First")
+        _, second = await create_session_with_tokens(db, test_user.id, "Second")
+        refreshed = await client.post("/api/v1/auth/refresh", json={"refresh_token": first})
+        assert refreshed.status_code == 200
+
+        await create_session_with_tokens(db, test_user.id, "Third")
+
+        result = await db.execute(
+            select(SessionModel.device_info, SessionModel.is_revoked)
+            .where(SessionModel.user_id == test_user.id)
+            .order_by(SessionModel.id)
+        )
+        assert result.all() == [("First", False), ("Second", True), ("Third", False)]
+        assert SESSIONS_EVICTED.labels(store="sql")._value.get() == evicted_before + 1
+
+        response = await client.post("/api/v1/auth/refresh", json={"refresh_token": second})
+        assert response.status_code == 401
+
     async def test_revoke_all_sessions(self, client: AsyncClient, auth_headers: dict, db: AsyncSession, test_user: User):
         """Revocar todas las sesiones (Async)."""
         await create_session_with_tokens(db, test_user.id, "Device2")
@@ -137,3 +353,91 @@ class TestSessionManagement:
 
         response = await client.delete("/api/v1/me/sessions", headers=auth_headers)
         assert response.status_code == 204
+
+
+@pytest.mark.asyncio
+class TestSessionRetention:
+    """Tests del reaper de retención de sesiones."""
+
+    async def _add_sessions(self, db: AsyncSession, user_id: int, count: int, **values):
+        from datetime import datetime, timedelta, timezone
+        from app.models.session import generate_refresh_token
+
+        defaults = {"expires_at": datetime.now(timezone.utc) + timedelta(days=7)}
+        defaults.update(values)
+        for _ in range(count):
+            db.add(SessionModel(
+                user_id=user_id,
+                refresh_token_hash=hash_refresh_token(generate_refresh_token()),
+                **defaults,
+            ))
+        await db.commit()
+
+    async def _remaining(self, db: AsyncSession) -> int:
+        from sqlalchemy import func
+        return (await db.execute(select(func.count(SessionModel.id)))).scalar()
+
+    async def test_purges_only_past_grace_period(self, db: AsyncSession, test_user: User):
+        """Se borran expiradas y revocadas fuera del período de gracia; el resto queda."""
+        from datetime import datetime, timedelta, timezone
+        from app.services.session_retention import run_retention
+        from tests.conftest import TestingSessionLocal
+
+        now = datetime.now(timezone.utc)
+        await self._add_sessions(db, test_user.id, 1)  # activa
+        await self._add_sessions(db, test_user.id, 1, expires_at=now - timedelta(days=1))  # en gracia
+        await self._add_sessions(db, test_user.id, 2, expires_at=now - timedelta(days=40))
+        await self._add_sessions(
+            db, test_user.id, 1, is_revoked=True, revoked_at=now - timedelta(days=31)
+        )
+
+        report = await run_retention(TestingSessionLocal, grace_days=30, pause_seconds=0)
+
+        assert report.purged == {"expired": 2, "revoked": 1}
+        assert report.lag_seconds == 0
+        assert await self._remaining(db) == 2
+
+    async def test_deletes_in_bounded_batches(self, db: AsyncSession, test_user: User):
+        """Los lotes respetan batch_size y max_batches deja lag pendiente."""
+        from datetime import datetime, timedelta, timezone
+        from app.services.session_retention import run_retention
+        from tests.conftest import TestingSessionLocal
+
+        expired = datetime.now(timezone.utc) - timedelta(days=10)
+        await self._add_sessions(db, test_user.id, 5, expires_at=expired)
+
+        partial = await run_retention(
+            TestingSessionLocal, grace_days=1, batch_size=2, pause_seconds=0, max_batches=1
+        )
+        assert partial.purged["expired"] == 2
+        assert partial.lag_seconds > 0
+
+        rest = await run_retention(TestingSessionLocal, grace_days=1, batch_size=2, pause_seconds=0)
+        assert rest.purged["expired"] == 3
+        assert await self._remaining(db) == 0
+
+    async def test_dry_run_only_counts(self, db: AsyncSession, test_user: User):
+        """--dry-run informa las sesiones purgables sin borrarlas."""
+        from datetime import datetime, timedelta, timezone
+        from app.services.session_retention import run_retention
+        from tests.conftest import TestingSessionLocal
+
+        await self._add_sessions(
+            db, test_user.id, 3, expires_at=datetime.now(timezone.utc) - timedelta(days=60)
+        )
+
+        report = await run_retention(TestingSessionLocal, grace_days=30, dry_run=True)
+
+        assert report.purged["expired"] == 3
+        assert await self._remaining(db) == 3
+
+    async def test_revoke_records_revoked_at(self, db: AsyncSession, test_user: User):
+        """Revocar una sesión guarda cuándo, base del período de gracia."""
+        from app.core.security import revoke_session
+
+        await create_session_with_tokens(db, test_user.id)
+        session_id = (await db.execute(select(SessionModel.id))).scalar_one()
+        await revoke_session(db, session_id, test_user.id)
+
+        session = (await db.execute(select(SessionModel))).scalar_one()
+        assert session.revoked_at is not None
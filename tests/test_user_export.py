@@ -0,0 +1,100 @@
+"""
+Tests de la exportación de usuarios en streaming (NDJSON/CSV).
+"""
+import csv
+import io
+
+import orjson
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import get_password_hash
+from app.models.role import Role
+from app.models.user import User
+from app.services import user_export
+
+
+@pytest_asyncio.fixture
+async def admin_headers(client: AsyncClient, db: AsyncSession, test_user: User) -> dict:
+    """Admin autenticado más tres usuarios comunes (uno con un nombre tipo fórmula)."""
+    db.add_all([
+        User(
+            email="admin@example.com", password=get_password_hash("AdminPass123!@#"),
+            name="Admin", lastname="User", role=Role(name="admin"),
+        ),
+        User(email="formula@example.com", password="x", name="=HYPERLINK(1)", lastname="Csv"),
+        User(email="plain@example.com", password="x", name="Plain", lastname="Pérez, Jr."),
+    ])
+    await db.commit()
+    response = await client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin@example.com", "password": "AdminPass123!@#"}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+class TestUserExport:
+    """GET /users/export."""
+
+    async def test_requires_admin(self, client: AsyncClient, auth_headers):
+        """Solo un admin puede exportar."""
+        assert (await client.get("/api/v1/users/export")).status_code == 401
+        response = await client.get("/api/v1/users/export", headers=auth_headers)
+        assert response.status_code == 403
+
+    async def test_ndjson_streams_every_user_in_one_query(
+        self, client: AsyncClient, admin_headers, monkeypatch, query_counter
+    ):
+        """NDJSON: un objeto por usuario, en lotes, con una sola consulta."""
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "export_batch_size", 2)
+        query_counter.reset()
+        response = await client.get("/api/v1/users/export", headers=admin_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert 'filename="users.ndjson"' in response.headers["content-disposition"]
+        rows = [orjson.loads(line) for line in response.content.splitlines()]
+        assert [r["id"] for r in rows] == [1, 2, 3, 4]
+        assert set(rows[0]) == set(user_export.CSV_COLUMNS)
+        assert rows[1]["role"] == "admin"
+        exports = [s for s in query_counter.statements if s.endswith("ORDER BY users.id")]
+        assert len(exports) == 1
+
+    async def test_csv_escapes_formulas(self, client: AsyncClient, admin_headers):
+        """CSV con encabezado, comillas RFC 4180 y celdas tipo fórmula neutralizadas."""
+        response = await client.get("/api/v1/users/export?format=csv", headers=admin_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "text/csv; charset=utf-8"
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert list(rows[0]) == user_export.CSV_COLUMNS
+        assert len(rows) == 4
+        by_email = {r["email"]: r for r in rows}
+        assert by_email["formula@example.com"]["name"] == "'=HYPERLINK(1)"
+        assert by_email["plain@example.com"]["lastname"] == "Pérez, Jr."
+        assert by_email["test@example.com"]["role"] == ""
+
+    async def test_stops_when_client_disconnects(self, db: AsyncSession, admin_headers):
+        """Si el cliente se desconecta no se leen más lotes y el cursor se cierra."""
+        checks = []
+
+        async def is_disconnected() -> bool:
+            checks.append(True)
+            return len(checks) > 1
+
+        chunks = [
+            chunk async for chunk in user_export.export_users(
+                db, "ndjson", batch_size=1, is_disconnected=is_disconnected
+            )
+        ]
+
+        assert len(chunks) == 1
+        assert orjson.loads(chunks[0])["id"] == 1
+        # La sesión queda utilizable: el cursor no quedó abierto
+        assert (await db.execute(select(User.id).where(User.id == 1))).scalar() == 1
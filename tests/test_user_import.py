@@ -0,0 +1,213 @@
+"""
+Tests de la importación masiva de usuarios (NDJSON/CSV).
+"""
+import orjson
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.hashing import HashingExecutor, hash_many
+from app.core.security import get_password_hash, verify_password
+from app.models.role import Role
+from app.models.user import User
+from app.services import user_import
+
+PREHASHED = get_password_hash("Imported123!@#")
+
+
+@pytest_asyncio.fixture
+async def admin_headers(client: AsyncClient, db: AsyncSession, test_user: User) -> dict:
+    """Headers de un admin (además del usuario de prueba)."""
+    db.add(User(
+        email="admin@example.com", password=get_password_hash("AdminPass123!@#"),
+        name="Admin", lastname="User", role=Role(name="admin"),
+    ))
+    await db.commit()
+    response = await client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin@example.com", "password": "AdminPass123!@#"}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(autouse=True)
+def thread_hashing(monkeypatch):
+    """Pool de threads en lugar de procesos para los tests."""
+    executor = HashingExecutor(kind="thread", workers=2, max_queue=2)
+    monkeypatch.setattr(user_import, "import_hashing_executor", executor)
+    yield executor
+    executor.shutdown()
+
+
+def ndjson(*rows) -> bytes:
+    return b"".join(
+        (row if isinstance(row, bytes) else orjson.dumps(row)) + b"\n" for row in rows
+    )
+
+
+@pytest.mark.asyncio
+class TestUserImport:
+    """POST /users/import."""
+
+    async def test_requires_admin(self, client: AsyncClient, auth_headers):
+        """Solo un admin puede importar."""
+        response = await client.post("/api/v1/users/import", content=b"", headers=auth_headers)
+        assert response.status_code == 403
+
+    async def test_ndjson_report_per_row(
+        self, client: AsyncClient, db: AsyncSession, admin_headers, monkeypatch, query_counter
+    ):
+        """Crea las filas válidas en lotes y detalla cada fila rechazada."""
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "import_batch_size", 2)
+        body = ndjson(
+            {"email": "plain@example.com", "name": "Plain", "lastname": "User", "password": "Plain123!@#xyz"},
+            {"email": "hashed@example.com", "name": "Hashed", "lastname": "User", "password_hash": PREHASHED},
+            {"email": "not-an-email", "name": "Bad", "lastname": "Email", "password": "Plain123!@#xyz"},
+            b"{roto",
+            {"email": "test@example.com", "name": "Test", "lastname": "User", "password_hash": PREHASHED},
+            {"email": "plain@example.com", "name": "Plain", "lastname": "Again", "password_hash": PREHASHED},
+            {"email": "both@example.com", "name": "Both", "lastname": "User"},
+        )
+        query_counter.reset()
+        response = await client.post("/api/v1/users/import", content=body, headers=admin_headers)
+
+        assert response.status_code == 200
+        report = response.json()
+        assert report["received"] == 7
+        assert (report["created"], report["duplicates"], report["invalid"]) == (2, 2, 3)
+        assert [(e["line"], e["email"]) for e in report["errors"]] == [
+            (3, "not-an-email"), (4, None), (5, "test@example.com"),
+            (6, "plain@example.com"), (7, "both@example.com"),
+        ]
+        assert "Email repetido en el archivo" == report["errors"][3]["error"]
+        # Un INSERT multi-fila por lote con filas nuevas
+        inserts = [s for s in query_counter.statements if s.startswith("INSERT INTO users")]
+        assert len(inserts) == 1
+
+        users = {u.email: u for u in (await db.execute(select(User))).scalars()}
+        assert users["hashed@example.com"].password == PREHASHED
+        assert verify_password("Plain123!@#xyz", users["plain@example.com"].password)
+
+    async def test_reimport_skips_existing_without_hashing(
+        self, client: AsyncClient, admin_headers, monkeypatch
+    ):
+        """Reintentar el mismo archivo no crea ni hashea de nuevo."""
+        hashed = []
+
+        def spy(passwords, hasher):
+            hashed.extend(passwords)
+            return hash_many(passwords, hasher)
+
+        monkeypatch.setattr(user_import, "hash_many", spy)
+        body = ndjson({"email": "plain@example.com", "name": "Plain", "lastname": "User", "password": "Plain123!@#xyz"})
+        first = await client.post("/api/v1/users/import", content=body, headers=admin_headers)
+        assert first.json()["created"] == 1
+
+        second = await client.post("/api/v1/users/import", content=body, headers=admin_headers)
+        assert second.json()["created"] == 0
+        assert hashed == ["Plain123!@#xyz"]
+        assert second.json()["errors"][0]["error"] == "El email ya está registrado"
+
+    async def test_csv_with_extra_columns(self, client: AsyncClient, admin_headers):
+        """CSV con encabezado; columnas extra (p. ej. de una exportación) se ignoran."""
+        body = (
+            "﻿id,email,name,lastname,role,password_hash\r\n"
+            f'7,csv@example.com,Csv,"Pérez, Jr.",admin,{PREHASHED}\r\n'
+            "8,short@example.com,Csv\r\n"
+        ).encode("utf-8")
+        response = await client.post(
+            "/api/v1/users/import?format=csv", content=body, headers=admin_headers
+        )
+
+        report = response.json()
+        assert (report["received"], report["created"], report["invalid"]) == (2, 1, 1)
+        assert report["errors"] == [{
+            "line": 3, "email": None, "error": "Cantidad de columnas distinta al encabezado",
+        }]
+        users = (await client.get("/api/v1/users", headers=admin_headers)).json()["items"]
+        imported = next(u for u in users if u["email"] == "csv@example.com")
+        assert imported["lastname"] == "Pérez, Jr."
+        assert imported["role"] is None
+
+    async def test_csv_export_roundtrip_keeps_formula_like_values(
+        self, client: AsyncClient, db: AsyncSession, admin_headers
+    ):
+        """Exportar e importar en CSV conserva los valores que empiezan con = + - @ o '."""
+        originals = {
+            "formula@example.com": ("=SUM(A1)", "+54 Pérez"),
+            "-dash@example.com": ("-Ana", "@home"),
+            "quote@example.com": ("'=literal", "'plain"),
+        }
+        db.add_all([
+            User(email=email, password=PREHASHED, name=name, lastname=lastname)
+            for email, (name, lastname) in originals.items()
+        ])
+        await db.commit()
+        exported = await client.get("/api/v1/users/export?format=csv", headers=admin_headers)
+        await db.execute(delete(User).where(User.email.in_(originals)))
+        await db.commit()
+
+        # La exportación no lleva contraseñas: se agrega una columna password_hash
+        header, *rows = exported.text.rstrip("\r\n").split("\r\n")
+        body = "\r\n".join([f"{header},password_hash", *(f"{row},{PREHASHED}" for row in rows)])
+        response = await client.post(
+            "/api/v1/users/import?format=csv", content=body.encode("utf-8"), headers=admin_headers
+        )
+
+        assert response.json()["created"] == 3
+        imported = (await db.execute(select(User).where(User.email.in_(originals)))).scalars()
+        assert {u.email: (u.name, u.lastname) for u in imported} == originals
+
+    async def test_concurrent_imports_wait_for_hashing_slots(self, thread_hashing, monkeypatch):
+        """Más tandas de hashing que cupos del pool: esperan en lugar de abortar con 503."""
+        import asyncio
+        import threading
+
+        release = threading.Event()
+
+        def slow_hash(passwords, hasher):
+            release.wait(5)
+            return [f"h:{password}" for password in passwords]
+
+        monkeypatch.setattr(user_import, "hash_many", slow_hash)
+        imports = [
+            asyncio.create_task(user_import.hash_passwords([f"p{i}a", f"p{i}b"])) for i in range(3)
+        ]
+        await asyncio.sleep(0.05)
+        assert thread_hashing.pending == thread_hashing.capacity
+        assert not any(task.done() for task in imports)
+
+        release.set()
+        assert await asyncio.gather(*imports) == [[f"h:p{i}a", f"h:p{i}b"] for i in range(3)]
+
+    async def test_report_tracks_last_committed_line(
+        self, client: AsyncClient, admin_headers, monkeypatch
+    ):
+        """El reporte indica la última línea cuyo lote quedó confirmado."""
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "import_batch_size", 1)
+        body = ndjson(
+            {"email": "one@example.com", "name": "One", "lastname": "User", "password_hash": PREHASHED},
+            {"email": "two@example.com", "name": "Two", "lastname": "User", "password_hash": PREHASHED},
+        )
+        response = await client.post("/api/v1/users/import", content=body, headers=admin_headers)
+        assert response.json()["last_committed_line"] == 2
+
+    async def test_errors_are_capped(self, client: AsyncClient, admin_headers, monkeypatch):
+        """El detalle se corta en IMPORT_MAX_ERRORS; los totales no."""
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "import_max_errors", 1)
+        response = await client.post(
+            "/api/v1/users/import", content=b"1\n2\n3\n", headers=admin_headers
+        )
+
+        report = response.json()
+        assert report["invalid"] == 3
+        assert len(report["errors"]) == 1
+        assert report["errors_truncated"] is True
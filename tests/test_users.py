@@ -1,8 +1,15 @@
 """
 Tests de Usuarios asíncronos.
 """
+from datetime import datetime, timedelta, timezone
+
 import pytest
+import pytest_asyncio
 from httpx import AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import User
 
 
 @pytest.mark.asyncio
@@ -38,6 +45,21 @@ class TestUsers:
         assert response.status_code == 400
         assert "registrado" in response.json()["detail"].lower()
 
+    async def test_create_user_is_single_statement(
+        self, client: AsyncClient, test_user, query_counter
+    ):
+        """Alta y email duplicado cuestan un único INSERT ... RETURNING."""
+        user_data = {"password": "StrongPassword123!", "name": "New", "lastname": "User"}
+        for email, expected in (("new@example.com", 201), ("test@example.com", 400)):
+            query_counter.reset()
+            response = await client.post("/api/v1/users", json={**user_data, "email": email})
+
+            assert response.status_code == expected
+            assert query_counter.count == 1
+            assert query_counter.statements[0].startswith("INSERT INTO users")
+            assert "RETURNING" in query_counter.statements[0]
+        assert response.json()["detail"] == "El email ya está registrado"
+
     async def test_list_users_authenticated(self, client: AsyncClient, auth_headers):
         """Prueba listar usuarios con autenticación."""
         response = await client.get("/api/v1/users", headers=auth_headers)
@@ -138,3 +160,377 @@ class TestUsers:
             "/api/v1/users?per_page=5000", headers=auth_headers
         )
         assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+class TestKeysetPagination:
+    """Paginación por cursor de GET /users."""
+
+    @pytest_asyncio.fixture
+    async def many_users(self, db: AsyncSession, test_user: User) -> list[User]:
+        """Siete usuarios más, con fechas de alta repetidas para probar el desempate por id."""
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        test_user.created_at = base
+        users = [
+            User(
+                email=f"user{i}@example.com", password="x", name="Page", lastname=f"User{i}",
+                created_at=base + timedelta(days=i // 2),
+            )
+            for i in range(7)
+        ]
+        db.add_all(users)
+        await db.commit()
+        return [test_user, *users]
+
+    async def _walk(self, client: AsyncClient, headers: dict, params: dict, key: str) -> list:
+        """Recorre todas las páginas siguiendo `key` y devuelve las respuestas."""
+        pages, cursor = [], params.pop("cursor", "")
+        while cursor is not None:
+            response = await client.get(
+                "/api/v1/users", params={**params, "cursor": cursor}, headers=headers
+            )
+            assert response.status_code == 200
+            pages.append(response.json())
+            cursor = pages[-1][key]
+        return pages
+
+    async def test_walks_forward_and_back(
+        self, client: AsyncClient, auth_headers, many_users, query_counter
+    ):
+        """Ida y vuelta por cursor visitan todos los usuarios con predicados de búsqueda."""
+        query_counter.reset()
+        pages = await self._walk(client, auth_headers, {"per_page": 3}, "next_cursor")
+
+        assert [len(p["items"]) for p in pages] == [3, 3, 2]
+        assert [p["has_more"] for p in pages] == [True, True, False]
+        assert pages[0]["prev_cursor"] is None
+        ids = [u["id"] for p in pages for u in p["items"]]
+        assert ids == sorted(u.id for u in many_users)
+        assert any("WHERE users.deleted_at IS NULL AND users.id > ?" in s for s in query_counter.statements)
+
+        back = await self._walk(
+            client, auth_headers, {"per_page": 3, "cursor": pages[-1]["prev_cursor"]}, "prev_cursor"
+        )
+        assert [[u["id"] for u in p["items"]] for p in back] == [
+            [u["id"] for u in p["items"]] for p in reversed(pages[:-1])
+        ]
+        assert back[-1]["has_more"] is False
+
+    async def test_created_at_desc_breaks_ties_by_id(
+        self, client: AsyncClient, auth_headers, many_users
+    ):
+        """El orden por fecha de alta es estable aunque haya fechas repetidas."""
+        pages = await self._walk(
+            client, auth_headers, {"per_page": 2, "sort": "created_at", "order": "desc"},
+            "next_cursor",
+        )
+
+        expected = sorted(many_users, key=lambda u: (u.created_at, u.id), reverse=True)
+        assert [u["id"] for p in pages for u in p["items"]] == [u.id for u in expected]
+
+    async def test_page_mode_still_available(self, client: AsyncClient, auth_headers, many_users):
+        """Sin cursor se mantiene la paginación por número de página."""
+        response = await client.get(
+            "/api/v1/users", params={"page": 2, "per_page": 3}, headers=auth_headers
+        )
+
+        data = response.json()
+        assert (data["total"], data["page"], data["total_pages"]) == (8, 2, 3)
+        assert [u["id"] for u in data["items"]] == sorted(u.id for u in many_users)[3:6]
+
+    async def test_invalid_cursor_rejected(self, client: AsyncClient, auth_headers, many_users):
+        """Un cursor corrupto o de otro orden devuelve 400."""
+        first = await client.get(
+            "/api/v1/users", params={"per_page": 2, "cursor": ""}, headers=auth_headers
+        )
+        cursor = first.json()["next_cursor"]
+
+        for params in (
+            {"cursor": "no-es-un-cursor"},
+            {"cursor": cursor, "sort": "created_at"},
+            {"cursor": cursor, "order": "desc"},
+        ):
+            response = await client.get("/api/v1/users", params=params, headers=auth_headers)
+            assert response.status_code == 400
+
+    async def test_created_at_from_server_default(
+        self, client: AsyncClient, auth_headers, db: AsyncSession, test_user: User
+    ):
+        """Filas con la misma fecha de alta del servidor no se saltean ni se repiten."""
+        # Un solo INSERT: todas comparten el mismo CURRENT_TIMESTAMP
+        await db.execute(insert(User).values([
+            {"email": f"bulk{i}@example.com", "password": "x", "name": "Bulk", "lastname": f"User{i}"}
+            for i in range(5)
+        ]))
+        await db.commit()
+
+        for order in ("asc", "desc"):
+            pages = await self._walk(
+                client, auth_headers, {"per_page": 2, "sort": "created_at", "order": order},
+                "next_cursor",
+            )
+            ids = [u["id"] for p in pages for u in p["items"]]
+            assert len(ids) == len(set(ids)) == 6
+
+            back = await self._walk(
+                client, auth_headers,
+                {"per_page": 2, "sort": "created_at", "order": order, "cursor": pages[-1]["prev_cursor"]},
+                "prev_cursor",
+            )
+            assert [u["id"] for p in reversed(back) for u in p["items"]] == ids[:-len(pages[-1]["items"])]
+
+
+@pytest.mark.asyncio
+class TestListingTotals:
+    """Estrategias de conteo del total en GET /users."""
+
+    async def _total(self, client: AsyncClient, headers: dict, **params) -> dict:
+        response = await client.get("/api/v1/users", params=params, headers=headers)
+        assert response.status_code == 200
+        return response.json()
+
+    async def _insert_directly(self, db: AsyncSession, email: str) -> None:
+        db.add(User(email=email, password="x", name="Count", lastname="User"))
+        await db.commit()
+
+    async def test_cached_total_invalidated_by_writes(
+        self, client: AsyncClient, auth_headers, db: AsyncSession, query_counter
+    ):
+        """El total cacheado no vuelve a contar hasta que una escritura lo invalida."""
+        assert (await self._total(client, auth_headers, count="cached"))["total"] == 1
+
+        await self._insert_directly(db, "bypass@example.com")
+        query_counter.reset()
+        assert (await self._total(client, auth_headers, count="cached"))["total"] == 1
+        assert not any("count(" in s.lower() for s in query_counter.statements)
+        assert (await self._total(client, auth_headers, count="exact"))["total"] == 2
+
+        created = await client.post("/api/v1/users", json={
+            "email": "counted@example.com", "password": "StrongPassword123!",
+            "name": "Counted", "lastname": "User",
+        })
+        assert created.status_code == 201
+        assert (await self._total(client, auth_headers, count="cached"))["total"] == 3
+
+    async def test_no_total(self, client: AsyncClient, auth_headers, query_counter):
+        """count=none omite el total y no consulta el conteo."""
+        query_counter.reset()
+        data = await self._total(client, auth_headers, count="none")
+
+        assert (data["total"], data["total_pages"]) == (None, None)
+        assert len(data["items"]) == 1
+        assert not any("count(" in s.lower() for s in query_counter.statements)
+
+    async def test_estimate_falls_back_outside_postgres(self, client: AsyncClient, auth_headers):
+        """Sin pg_class la estimación cae al total cacheado (exacto)."""
+        data = await self._total(client, auth_headers, count="estimate")
+
+        assert (data["total"], data["total_approximate"]) == (1, False)
+
+    async def test_unknown_strategy_rejected(self, client: AsyncClient, auth_headers):
+        """Una estrategia inexistente es rechazada por validación."""
+        response = await client.get("/api/v1/users?count=guess", headers=auth_headers)
+        assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+class TestLoaderStrategies:
+    """Queries y filas cargadas por endpoint: las sesiones nunca se cargan implícitamente."""
+
+    @pytest_asyncio.fixture
+    async def users_with_sessions(self, db: AsyncSession, test_user: User) -> list[User]:
+        """Cuatro usuarios con rol y cinco sesiones cada uno."""
+        from app.core.security import create_session_with_tokens
+        from app.models.role import Permission, Role
+
+        role = Role(name="editor", permissions=[Permission(name="edit_recipe")])
+        users = [
+            User(email=f"loaded{i}@example.com", password="x", name="Load", lastname="User", role=role)
+            for i in range(4)
+        ]
+        db.add_all(users)
+        await db.commit()
+        for user in [test_user, *users]:
+            for _ in range(5):
+                await create_session_with_tokens(db, user.id)
+        db.expunge_all()
+        return users
+
+    async def _warm_get(self, client: AsyncClient, headers: dict, url: str, query_counter):
+        """GET con la sesión ya validada en caché (solo cuenta las queries del endpoint)."""
+        await client.get("/api/v1/me", headers=headers)
+        query_counter.reset()
+        response = await client.get(url, headers=headers)
+        assert response.status_code == 200
+        return response.json()
+
+    async def test_list_users(self, client: AsyncClient, auth_headers, users_with_sessions, query_counter):
+        """Listar usuarios: principal + una proyección con el rol en JOIN; sin instancias ORM."""
+        for url in ("/api/v1/users?count=none", "/api/v1/users?cursor="):
+            data = await self._warm_get(client, auth_headers, url, query_counter)
+
+            assert [u["role"] for u in data["items"]] == [None] + ["editor"] * 4
+            assert query_counter.count == 2
+            assert "JOIN roles" in query_counter.statements[1]
+            assert "sessions" not in query_counter.statements[1]
+            assert not query_counter.loaded
+
+    async def test_get_user(self, client: AsyncClient, auth_headers, users_with_sessions, query_counter):
+        """Obtener un usuario no carga sus sesiones ni los permisos del rol."""
+        user = users_with_sessions[0]
+        data = await self._warm_get(client, auth_headers, f"/api/v1/users/{user.id}", query_counter)
+
+        assert data["role"] == "editor"
+        assert query_counter.count == 2
+        assert not query_counter.loaded
+
+    async def test_projection_matches_orm_response(self, db: AsyncSession, users_with_sessions):
+        """La proyección produce lo mismo que UserResponse.from_user."""
+        from app.schemas.user import UserResponse
+        from app.services import user_queries, user_service
+
+        orm_users = await user_service.get_users(db, limit=10)
+        rows = await user_queries.list_user_rows(db, limit=10)
+
+        assert [UserResponse.model_validate(r) for r in rows] == [
+            UserResponse.from_user(u) for u in orm_users
+        ]
+
+    async def test_delete_me_cascades_without_loading_sessions(
+        self, client: AsyncClient, auth_headers, db: AsyncSession, users_with_sessions,
+        test_user: User, query_counter, monkeypatch
+    ):
+        """Sin soft delete, borrar la cuenta elimina las sesiones en la BD (ON DELETE CASCADE) sin cargarlas."""
+        from sqlalchemy import func, select
+        from app.core.config import settings
+        from app.models.session import Session as SessionModel
+
+        monkeypatch.setattr(settings, "user_soft_delete", False)
+        query_counter.reset()
+        response = await client.delete("/api/v1/me", headers=auth_headers)
+
+        assert response.status_code == 204
+        assert query_counter.loaded["Session"] == 0
+        remaining = await db.execute(
+            select(func.count()).select_from(SessionModel).where(SessionModel.user_id == test_user.id)
+        )
+        assert remaining.scalar() == 0
+
+    async def test_sessions_load_only_on_request(self, db: AsyncSession, users_with_sessions):
+        """User.sessions lanza error si no se pidió; with_sessions lo carga en una query extra."""
+        from sqlalchemy.exc import InvalidRequestError
+        from app.services import user_service
+
+        user = await user_service.get_user_by_id(db, users_with_sessions[0].id)
+        with pytest.raises(InvalidRequestError):
+            user.sessions
+        db.expunge_all()
+
+        user = await user_service.get_user_by_id(db, users_with_sessions[0].id, with_sessions=True)
+        assert len(user.sessions) == 5
+
+
+@pytest.mark.asyncio
+class TestFastJSONResponses:
+    """FAST_JSON_RESPONSES produce exactamente el mismo JSON que el camino estándar."""
+
+    async def test_same_json_in_both_modes(
+        self, client: AsyncClient, auth_headers, db: AsyncSession, test_user: User, monkeypatch
+    ):
+        """Listados, detalle, /me y /me/sessions: mismo cuerpo con y sin modo rápido."""
+        from app.core.config import settings
+        from app.models.role import Role
+
+        db.add(User(
+            email="ñandú@example.com", password="x", name="Ñandú", lastname="Pérez",
+            role=Role(name="editor"), created_at=datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+        ))
+        await db.commit()
+        urls = [
+            "/api/v1/users?count=exact",
+            "/api/v1/users?cursor=&per_page=1",
+            f"/api/v1/users/{test_user.id}",
+            f"/api/v1/users/batch?ids={test_user.id},999",
+            "/api/v1/me",
+            "/api/v1/me/sessions",
+        ]
+
+        bodies = {}
+        for fast in (False, True):
+            monkeypatch.setattr(settings, "fast_json_responses", fast)
+            for url in urls:
+                response = await client.get(url, headers=auth_headers)
+                assert response.status_code == 200
+                assert response.headers["content-type"] == "application/json"
+                bodies[fast, url] = response.json()
+
+        for url in urls:
+            assert bodies[True, url] == bodies[False, url], url
+
+
+@pytest.mark.asyncio
+class TestBatchLookup:
+    """GET /users/batch."""
+
+    @pytest_asyncio.fixture
+    async def others(self, db: AsyncSession, test_user: User) -> list[User]:
+        """Dos usuarios más, uno con rol."""
+        from app.models.role import Role
+
+        users = [
+            User(email="a@example.com", password="x", name="Ana", lastname="Uno", role=Role(name="editor")),
+            User(email="b@example.com", password="x", name="Beto", lastname="Dos"),
+        ]
+        db.add_all(users)
+        await db.commit()
+        return users
+
+    async def _batch(self, client: AsyncClient, headers: dict, ids: str, query_counter):
+        await client.get("/api/v1/me", headers=headers)
+        query_counter.reset()
+        response = await client.get("/api/v1/users/batch", params={"ids": ids}, headers=headers)
+        assert response.status_code == 200
+        return response.json()
+
+    async def test_request_order_with_nulls(
+        self, client: AsyncClient, auth_headers, test_user, others, query_counter
+    ):
+        """Un elemento por id pedido, en orden, con null si no existe; una sola query IN."""
+        a, b = others
+        ids = f"{b.id},999,{a.id},{b.id},{test_user.id}"
+        data = await self._batch(client, auth_headers, ids, query_counter)
+
+        assert [u and u["id"] for u in data] == [b.id, None, a.id, b.id, test_user.id]
+        assert data[2]["role"] == "editor"
+        assert data[0]["role"] is None
+        # Principal + una consulta IN con los ids sin repetir
+        assert query_counter.count == 2
+        assert "users.id IN" in query_counter.statements[1]
+        assert not query_counter.loaded
+
+    async def test_read_through_cache(
+        self, client: AsyncClient, db: AsyncSession, auth_headers, test_user, others, query_counter
+    ):
+        """Los ids cacheados no se consultan; modificar o dar de baja un usuario lo invalida."""
+        from app.services import user_service
+
+        a, b = others
+        await self._batch(client, auth_headers, f"{a.id},{b.id}", query_counter)
+        data = await self._batch(client, auth_headers, f"{a.id},{b.id}", query_counter)
+        assert [u["name"] for u in data] == ["Ana", "Beto"]
+        assert query_counter.count == 1  # solo el principal
+
+        await client.put("/api/v1/me", headers=auth_headers, json={"name": "Renamed"})
+        await user_service.delete_user(db, b.id)
+        data = await self._batch(client, auth_headers, f"{test_user.id},{a.id},{b.id}", query_counter)
+
+        assert data[0]["name"] == "Renamed"
+        assert data[1]["name"] == "Ana"
+        assert data[2] is None
+        assert query_counter.count == 2
+
+    @pytest.mark.parametrize("ids", ["", "1,,2", "abc", "0", ",".join(["1"] * 101)])
+    async def test_invalid_ids(self, client: AsyncClient, auth_headers, ids):
+        """IDs no numéricos, vacíos o más de 100: 422."""
+        response = await client.get("/api/v1/users/batch", params={"ids": ids}, headers=auth_headers)
+        assert response.status_code == 422